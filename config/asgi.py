@@ -29,8 +29,10 @@ def _get_user(user_id: int):
 # ✅ NonceAuthMiddlewareStack으로 변경
 from .middleware import NonceAuthMiddlewareStack
 from . import routing
+from game.redis_pool import LifespanMiddleware
 
-application = ProtocolTypeRouter(
+# ✅ lifespan: 워커 시작/종료 시 게임 상태 Redis 연결 풀을 열고 닫음
+application = LifespanMiddleware(ProtocolTypeRouter(
     {
         "http": get_asgi_application(),
         "websocket": AllowedHostsOriginValidator(
@@ -39,4 +41,4 @@ application = ProtocolTypeRouter(
             )
         ),
     }
-)
\ No newline at end of file
+))
@@ -10,6 +10,84 @@ AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
 AZURE_OPENAI_VERSION = os.getenv("AZURE_OPENAI_VERSION")
 AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT")
 
+# LLM 게이트웨이 (배포별 동시 요청 수 / 429·5xx 재시도 횟수 / HTTP 커넥션 풀 크기)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_HTTP_POOL_SIZE = int(os.getenv("LLM_HTTP_POOL_SIZE", "32"))
+# 우선순위 클래스별 동시 요청 상한 (0 이면 기본값: background 는 전체의 1/2, bulk 는 1/4)
+LLM_BACKGROUND_MAX_CONCURRENCY = int(os.getenv("LLM_BACKGROUND_MAX_CONCURRENCY", "0"))
+LLM_BULK_MAX_CONCURRENCY = int(os.getenv("LLM_BULK_MAX_CONCURRENCY", "0"))
+# 채팅 라우팅 대상 (JSON 배열, 예: [{"name": "kr", "endpoint": "...", "api_key": "...", "deployment": "gpt-4o"}])
+# 빠진 값은 위 AZURE_OPENAI_* 기본값 사용, 비어 있으면 기본 배포 하나만 사용
+AZURE_OPENAI_DEPLOYMENTS = os.getenv("AZURE_OPENAI_DEPLOYMENTS", "")
+# 서킷 브레이커 (연속 실패 횟수 / 제외 시간(초))
+LLM_CIRCUIT_FAILURES = int(os.getenv("LLM_CIRCUIT_FAILURES", "5"))
+LLM_CIRCUIT_COOLOFF_SECONDS = float(os.getenv("LLM_CIRCUIT_COOLOFF_SECONDS", "30"))
+# 헤지 요청: 첫 토큰 대기 시간이 이 백분위를 넘으면 두 번째 배포에도 요청 (표본이 적을 때는 LLM_HEDGE_DELAY_MS)
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.9"))
+LLM_HEDGE_DELAY_MS = int(os.getenv("LLM_HEDGE_DELAY_MS", "2000"))
+# LLM 사용량 장부 (llm_usage 테이블에 모아서 기록: 배치 크기 / 최대 대기 시간(초) / 메모리에 쌓아 둘 최대 건수)
+LLM_LEDGER_ENABLED = os.getenv("LLM_LEDGER_ENABLED", "true").lower() == "true"
+LLM_LEDGER_BATCH_SIZE = int(os.getenv("LLM_LEDGER_BATCH_SIZE", "200"))
+LLM_LEDGER_FLUSH_SECONDS = float(os.getenv("LLM_LEDGER_FLUSH_SECONDS", "2"))
+LLM_LEDGER_MAX_PENDING = int(os.getenv("LLM_LEDGER_MAX_PENDING", "10000"))
+# 스트리밍 응답에 실제 토큰 사용량을 포함 요청 (api-version 2024-09-01-preview 이상, 아니면 추정치 기록)
+LLM_STREAM_INCLUDE_USAGE = os.getenv("LLM_STREAM_INCLUDE_USAGE", "false").lower() == "true"
+
+# GM 프롬프트 상태 다이제스트 (토큰 예산 / 그대로 유지할 최근 턴 수)
+GM_STATE_TOKEN_BUDGET = int(os.getenv("GM_STATE_TOKEN_BUDGET", "1500"))
+GM_STATE_KEEP_RECENT_TURNS = int(os.getenv("GM_STATE_KEEP_RECENT_TURNS", "4"))
+
+# GM 턴 판정 지연 SLO(초): 넘거나 실패하면 규칙 엔진(game/rules_engine.py)으로 판정
+GM_RESOLVE_SLO_SECONDS = float(os.getenv("GM_RESOLVE_SLO_SECONDS", "25"))
+# 턴 판정 내레이션을 스트리밍으로 먼저 보내고, 판정이 끝나면 다음 씬을 미리 생성할지 여부
+GAME_GM_PIPELINE = os.getenv("GAME_GM_PIPELINE", "true").lower() in ("true", "1", "yes")
+# LLM 없이 규칙 엔진으로만 판정할 방 난이도 (쉼표 구분, 예: "초급")
+GM_RULES_ONLY_DIFFICULTIES = [d.strip() for d in os.getenv("GM_RULES_ONLY_DIFFICULTIES", "").split(",") if d.strip()]
+
+# 씬 생성용 대화 기록 윈도우 (토큰 예산 / 줄거리 요약 최대 길이)
+GAME_HISTORY_WINDOW_TOKENS = int(os.getenv("GAME_HISTORY_WINDOW_TOKENS", "6000"))
+GAME_HISTORY_SUMMARY_MAX_CHARS = int(os.getenv("GAME_HISTORY_SUMMARY_MAX_CHARS", "1500"))
+
+# 게임 상태 Redis (GameState / 작업 큐 공용 연결 풀, 이벤트 루프당 하나)
+GAME_REDIS_URL = os.getenv("GAME_REDIS_URL", "redis://localhost:6379")
+GAME_REDIS_MAX_CONNECTIONS = int(os.getenv("GAME_REDIS_MAX_CONNECTIONS", "50"))
+# 방 상태 compare-and-set 충돌 시 재시도 횟수 (GameState.update)
+GAME_STATE_CAS_RETRIES = int(os.getenv("GAME_STATE_CAS_RETRIES", "8"))
+# Redis 에 저장하는 방 상태 값의 인코딩 (game/codec.py): 형식 json / msgpack, 압축 zstd / lz4 / none
+# msgpack / zstd / lz4 는 선택 패키지(msgpack / zstandard / lz4)를 모든 워커에 설치한 뒤에 켤 것
+GAME_STATE_CODEC = os.getenv("GAME_STATE_CODEC", "json")
+GAME_STATE_COMPRESSION = os.getenv("GAME_STATE_COMPRESSION", "none")
+GAME_STATE_COMPRESS_MIN_BYTES = int(os.getenv("GAME_STATE_COMPRESS_MIN_BYTES", "1024"))
+# 방 Redis 키(game:{room}:*) 수명: 쓰거나 활동이 있을 때마다 다시 연장되는 TTL(초)과, 같은 방의 활동 연장 최소 간격(초)
+GAME_ROOM_TTL_SECONDS = int(os.getenv("GAME_ROOM_TTL_SECONDS", str(6 * 3600)))
+GAME_ROOM_TOUCH_INTERVAL = int(os.getenv("GAME_ROOM_TOUCH_INTERVAL", "60"))
+
+# 씬 생성 시 토큰 스트리밍 + 완성된 필드(scene_partial) 선전송 여부
+GAME_SCENE_STREAMING = os.getenv("GAME_SCENE_STREAMING", "true").lower() in ("true", "1", "yes")
+
+# 씬을 압축 형식(game/scene_format.py)으로 생성할지 여부 (출력 토큰 절감)
+GAME_SCENE_COMPACT = os.getenv("GAME_SCENE_COMPACT", "true").lower() in ("true", "1", "yes")
+
+# 로비에서 방장이 선택을 확정하면 첫 씬을 미리 생성할지 여부
+GAME_SCENE_PREWARM = os.getenv("GAME_SCENE_PREWARM", "true").lower() in ("true", "1", "yes")
+
+# 씬 생성 single-flight (생성 락 유지 시간 / 완료된 결과를 중복 요청에 돌려줄 시간, 초)
+GAME_SCENE_FLIGHT_LOCK_TTL = int(os.getenv("GAME_SCENE_FLIGHT_LOCK_TTL", "180"))
+GAME_SCENE_FLIGHT_RESULT_TTL = int(os.getenv("GAME_SCENE_FLIGHT_RESULT_TTL", "30"))
+
+# 턴 판정 시 계산 중인 AI 동료 행동 계획을 기다리는 최대 시간(초), 넘으면 그 자리에서 계산
+GAME_AI_PLAN_WAIT_SECONDS = float(os.getenv("GAME_AI_PLAN_WAIT_SECONDS", "5"))
+
+# 저장 요약: 증분 요약 사이에 이만큼 기록이 쌓이면 전체 기록으로 다시 요약
+GAME_SAVE_SUMMARY_FULL_EVERY = int(os.getenv("GAME_SAVE_SUMMARY_FULL_EVERY", "20"))
+
+# 느린 LLM 작업을 작업 큐(game/jobs.py)로 보낼지 여부 (false 면 요청 처리 중에 바로 실행)
+GAME_JOBS_ENABLED = os.getenv("GAME_JOBS_ENABLED", "true").lower() in ("true", "1", "yes")
+# 게임 작업 큐 (워커 프로세스당 동시 실행 수 / 방 lease 유지 시간(초))
+GAME_JOB_WORKERS = int(os.getenv("GAME_JOB_WORKERS", "4"))
+GAME_JOB_LEASE_TTL = int(os.getenv("GAME_JOB_LEASE_TTL", "30"))
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -208,6 +286,16 @@ if AZURE_REDIS_CONNECTIONSTRING:
         }
     }
 
+# 스토리 모드 내레이션 캐시 (키당 보관할 변형 수 / 유지 시간(초))
+STORYMODE_NARRATION_VARIANTS = int(os.getenv("STORYMODE_NARRATION_VARIANTS", "3"))
+STORYMODE_NARRATION_CACHE_TTL = int(os.getenv("STORYMODE_NARRATION_CACHE_TTL", str(60 * 60 * 24 * 7)))
+# 스토리 모드: 사용자가 장면을 읽는 동안 다음 선택지 내레이션을 미리 생성 (사용자당 동시 예산 / 전체 스레드 수)
+STORYMODE_PREFETCH_ENABLED = os.getenv("STORYMODE_PREFETCH_ENABLED", "true").lower() == "true"
+STORYMODE_PREFETCH_BUDGET = int(os.getenv("STORYMODE_PREFETCH_BUDGET", "3"))
+STORYMODE_PREFETCH_WORKERS = int(os.getenv("STORYMODE_PREFETCH_WORKERS", "4"))
+# 선택 시점에 아직 생성 중인 선행 생성을 기다리는 최대 시간(초) — 새로 생성하는 시간보다 충분히 짧게, 넘기면 캐시/AI 경로로
+STORYMODE_PREFETCH_WAIT_TIMEOUT = float(os.getenv("STORYMODE_PREFETCH_WAIT_TIMEOUT", "2"))
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 DATABASE_USER = os.environ.get('DATABASE_USER')
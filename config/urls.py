@@ -25,4 +25,5 @@ urlpatterns = [
     path('auth/', include('accounts.urls')),
     path('game/', include('game.urls')),
     path('common/', include('common.urls')),
+    path('llm/', include('llm.urls')),
 ]
@@ -0,0 +1,85 @@
+# backend/game/ai_planner.py
+"""
+AI 동료 캐릭터의 행동 계획 (선택 + 주사위 판정).
+
+씬이 확정되는(current_scene 이 바뀌는) 즉시 AI 캐릭터들의 선택과 판정을 미리 계산해 두고,
+사람 플레이어들이 고민하는 동안 Redis 에 보관합니다 (game:{room}:scene:{index}:ai_plan).
+마지막 사람 플레이어가 결과를 보내면 턴 판정은 이 계획을 꺼내 바로 시작합니다.
+
+- 선택 방식은 chooser(character, choices, scene) 로 교체 가능 (기본은 무작위, 코루틴이어도 됨)
+  → LLM 으로 선택하게 바꿔도 사람 대기 시간과 겹쳐 실행되므로 판정 경로에 단계가 늘지 않음
+- 계획에 없는 캐릭터(사람이 빠져 AI 가 대신 맡게 된 경우 등)는 판정 시점에 바로 계산
+"""
+import inspect
+import random
+
+# 난이도별 목표값 (DC)
+DC_BY_DIFFICULTY = {"초급": 10, "중급": 13, "상급": 16}
+
+
+def get_dc(difficulty="초급"):
+    return DC_BY_DIFFICULTY.get(difficulty, 10)
+
+
+def stat_value(character, stat_kr):
+    if 'stats' in character and isinstance(character['stats'], dict):
+        return character['stats'].get(stat_kr, 0)
+    stats_dict = character.get('ability', {}).get('stats', {})
+    return stats_dict.get(stat_kr, 0)
+
+
+def random_chooser(character, choices, scene):
+    return random.choice(choices)
+
+
+def roll(character, choice, difficulty, role_id):
+    """고른 선택지로 d20 판정을 굴려 프론트엔드 결과 형식으로 반환"""
+    dice = random.randint(1, 20)
+    stat_kr = choice['appliedStat']
+    value = stat_value(character, stat_kr)
+    modifier = choice['modifier']
+    total = dice + value + modifier
+    grade = "F"
+    if dice == 20: grade = "SP"
+    elif dice == 1: grade = "SF"
+    elif total >= get_dc(difficulty): grade = "S"
+    return {
+        "role": role_id,
+        "choiceId": choice['id'],
+        "grade": grade,
+        "dice": dice,
+        "appliedStat": stat_kr,
+        "statValue": value,
+        "modifier": modifier,
+        "total": total,
+        "characterName": character['name'],
+        "characterId": character['id'],
+    }
+
+
+async def plan_character(character, role_id, scene, difficulty, chooser=None):
+    """
+    캐릭터 하나의 행동을 계획: {"role", "text", "result"}.
+    역할에 선택지가 없으면 result 는 None (판정 없이 상황을 지켜봄).
+    """
+    choices = scene.get('round', {}).get('choices', {}).get(role_id, [])
+    if not choices:
+        return {"role": role_id, "text": "상황을 지켜봄", "result": None}
+    choice = (chooser or random_chooser)(character, choices, scene)
+    if inspect.isawaitable(choice):
+        choice = await choice
+    return {"role": role_id, "text": choice['text'], "result": roll(character, choice, difficulty, role_id)}
+
+
+async def plan_scene(scene, ai_characters, difficulty, chooser=None):
+    """
+    씬의 AI 캐릭터 전원 계획. 역할은 씬의 roleMap(캐릭터 이름 → 역할 ID)으로 찾음.
+    반환: {"sceneIndex": n, "plans": {character_id: {"role", "text", "result"}}}
+    """
+    role_map = scene.get('roleMap', {})
+    plans = {}
+    for character in ai_characters:
+        role_id = role_map.get(character.get('name'))
+        if role_id:
+            plans[str(character['id'])] = await plan_character(character, role_id, scene, difficulty, chooser)
+    return {"sceneIndex": scene.get('index'), "plans": plans}
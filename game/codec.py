@@ -0,0 +1,159 @@
+# backend/game/codec.py
+"""
+Redis 에 저장하는 값(방 상태 필드, 대화 기록 메시지, 미리 만든 씬, AI 계획)의 인코딩.
+
+- 직렬화: 기본은 JSON (orjson 이 있으면 orjson, 없으면 json — 한글을 \\uXXXX 로 늘리지 않고 UTF-8 그대로),
+  GAME_STATE_CODEC="msgpack" 이면 MessagePack
+- 압축: 직렬화 결과가 GAME_STATE_COMPRESS_MIN_BYTES 이상이면 GAME_STATE_COMPRESSION(zstd / lz4)으로 압축,
+  압축해도 작아지지 않으면 압축하지 않음
+- 저장 형식
+    태그 없음           JSON 텍스트 그대로 (예전에 json.dumps 로 쓴 값과 같은 형식)
+    "~{형식}{압축}1:"   형식 j(JSON)/m(MessagePack), 압축 n(없음)/z(zstd)/l(lz4), 본문은 base64
+  → 설정을 바꾸거나 배포가 섞여 있어도 이미 쓴 값은 태그를 보고 계속 읽음 (JSON 은 '~' 로 시작하지 않음)
+- 공용 Redis 클라이언트가 decode_responses=True(문자열)라 바이너리 본문은 base64 로 담음
+
+orjson / msgpack / zstandard / lz4 는 선택 패키지(requirements.txt 에 없음): 없으면 경고를 한 번 출력하고
+json / 무압축으로 쓰며, 해당 패키지가 필요한 태그의 값을 읽을 때만 CodecError.
+→ 기본값은 json + 무압축. msgpack / zstd / lz4 는 Redis 를 함께 쓰는 모든 워커에 패키지를 설치한 뒤에 켤 것
+  (설치되지 않은 워커는 다른 워커가 쓴 태그 값을 읽지 못함).
+MessagePack 은 JSON 과 달리 정수 키가 문자열로 바뀌지 않으니 상태 dict 의 키는 문자열로 둘 것.
+"""
+import base64
+import json
+
+from django.conf import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+TAG_VERSION = "1"
+
+# 설정했지만 패키지가 없어 쓰지 못한 형식/압축 (경고는 한 번만)
+_warned = set()
+
+
+class CodecError(ValueError):
+    """태그를 알 수 없거나, 태그가 요구하는 패키지가 없어 값을 읽을 수 없음"""
+
+
+def _dumps_json(obj):
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # orjson 이 못 다루는 값(64비트 넘는 정수 등)은 json 으로
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _loads_json(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _warn_unavailable(setting, package):
+    if setting not in _warned:
+        _warned.add(setting)
+        print(f"⚠️ {setting} 를 쓰도록 설정했지만 {package} 패키지가 없어 사용하지 않습니다.")
+
+
+def _require(module, name):
+    if module is None:
+        raise CodecError(f"{name} 패키지가 없어 값을 읽을 수 없습니다.")
+    return module
+
+
+# 형식/압축 태그 문자 → (인코더, 디코더), 패키지가 없는 항목은 None
+def _formats():
+    return {
+        "j": (_dumps_json, _loads_json),
+        "m": (
+            lambda obj: msgpack.packb(obj, use_bin_type=True),
+            lambda data: msgpack.unpackb(data, raw=False, strict_map_key=False),
+        ) if msgpack is not None else None,
+    }
+
+
+def _compressors():
+    return {
+        "z": (
+            lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+            lambda data: zstandard.ZstdDecompressor().decompress(data),
+        ) if zstandard is not None else None,
+        "l": (lz4_frame.compress, lz4_frame.decompress) if lz4_frame is not None else None,
+    }
+
+
+FORMAT_TAGS = {"json": "j", "msgpack": "m"}
+COMPRESSION_TAGS = {"none": "n", "zstd": "z", "lz4": "l"}
+
+
+def available():
+    """이 환경에서 쓸 수 있는 (형식 이름 목록, 압축 이름 목록)"""
+    formats, compressors = _formats(), _compressors()
+    return (
+        [name for name, tag in FORMAT_TAGS.items() if formats[tag]],
+        ["none"] + [name for name, tag in COMPRESSION_TAGS.items() if tag != "n" and compressors[tag]],
+    )
+
+
+def encode(obj, codec=None, compression=None, min_bytes=None):
+    """obj → Redis 에 넣을 문자열 (인자를 생략하면 GAME_STATE_* 설정)"""
+    fmt = FORMAT_TAGS.get(codec or settings.GAME_STATE_CODEC, "j")
+    encoder = _formats()[fmt]
+    if encoder is None:
+        _warn_unavailable("msgpack", "msgpack")
+        fmt, encoder = "j", _formats()["j"]
+    body = encoder[0](obj)
+
+    comp = "n"
+    wanted = COMPRESSION_TAGS.get(compression or settings.GAME_STATE_COMPRESSION, "n")
+    compressor = _compressors().get(wanted)
+    if compressor is None and wanted != "n":
+        _warn_unavailable({"z": "zstd", "l": "lz4"}[wanted], {"z": "zstandard", "l": "lz4"}[wanted])
+    min_bytes = settings.GAME_STATE_COMPRESS_MIN_BYTES if min_bytes is None else min_bytes
+    if compressor is not None and len(body) >= min_bytes:
+        packed = compressor[0](body)
+        # 태그 없는 JSON 은 base64 를 거치지 않으므로 base64 로 늘어난 크기와 비교
+        if (len(packed) * 4 // 3 if fmt == "j" else len(packed)) < len(body):
+            body, comp = packed, wanted
+
+    if fmt == "j" and comp == "n":
+        return body.decode("utf-8")
+    return f"~{fmt}{comp}{TAG_VERSION}:" + base64.b64encode(body).decode("ascii")
+
+
+def decode(value):
+    """encode 가 만든 문자열(또는 예전 json.dumps 문자열) → obj, None 은 None"""
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode("utf-8")
+    if not value.startswith("~"):
+        return _loads_json(value)
+
+    tag, sep, payload = value.partition(":")
+    if not sep or len(tag) != 4 or tag[3] != TAG_VERSION:
+        raise CodecError(f"알 수 없는 인코딩 태그: {tag[:8]!r}")
+    fmt, comp = tag[1], tag[2]
+    if fmt not in _formats() or (comp != "n" and comp not in _compressors()):
+        raise CodecError(f"알 수 없는 인코딩 태그: {tag!r}")
+    body = base64.b64decode(payload)
+    if comp != "n":
+        body = _require(_compressors()[comp], {"z": "zstandard", "l": "lz4"}[comp])[1](body)
+    return _require(_formats()[fmt], "msgpack")[1](body)
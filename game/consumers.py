@@ -1,16 +1,21 @@
 # backend/game/consumers.py
+import asyncio
+import hashlib
 import json
 import re
 from uuid import UUID
 import random
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
 from django.core.cache import cache
+from django.db import transaction
 
-from openai import AsyncAzureOpenAI
 import os
 from dotenv import load_dotenv
 
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 
 from game.models import MultimodeSession, GameRoom, GameJoin, GameRoomSelectScenario, Scenario, Character, Difficulty, Mode, Genre
@@ -18,22 +23,41 @@ from game.serializers import GameJoinSerializer
 from .scenarios_turn import get_scene_template
 from .round import perform_turn_judgement
 from .state import GameState
+from .history import HistoryWindow
+from .singleflight import scene_flights
+from . import ai_planner, rules_engine
+from . import scene_format
+from . import jobs
 
-from asgiref.sync import sync_to_async
-from llm.multi_mode.gm_engine import AIGameMaster, apply_gm_result_to_state
+from llm import gateway, ledger
+from llm.json_stream import IncrementalJSONParser
+from llm.multi_mode.gm_engine import AsyncAIGameMaster, apply_gm_result_to_state
+from llm.multi_mode.state_digest import digest_state
 
 # .env 파일 로드
 load_dotenv()
 
-# LLM 클라이언트 초기화 (씬 생성/요약 등 기존 용도 유지)
-oai_client = AsyncAzureOpenAI(
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    api_version=os.getenv("AZURE_OPENAI_VERSION", "2025-01-01-preview"),
-)
-OAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT")
+FIRST_SCENE_MESSAGE = "모든 캐릭터가 참여하는 게임의 첫 번째 씬(sceneIndex: 0)을 생성해줘. 비극적인 사건 직후의 긴장감 있는 상황으로 시작해줘."
+
+# 이 프로세스에서 미리 생성 중인 씬: (room_id, scene_index) -> asyncio.Task
+_pending_scene_tasks = {}
+# 이 프로세스에서 계산 중인 AI 동료 행동 계획: (room_id, scene_index) -> asyncio.Task
+_ai_plan_tasks = {}
+# 이 프로세스에서 실행 중인 대화 기록 요약(overflow 접기): room_id -> asyncio.Task
+_history_summary_tasks = {}
+# 이 프로세스에서 실행 중인 저장 기록 요약: room_id -> asyncio.Task
+_save_summary_tasks = {}
+
+
+def _history_digest(history):
+    """선행 생성 당시와 확정 시점의 대화 기록이 같은지 비교하기 위한 해시"""
+    return hashlib.sha1(json.dumps(history, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
 
 
+@database_sync_to_async
+def _get_user(user_id):
+    return get_user_model().objects.filter(pk=user_id).first() or AnonymousUser()
+
 @database_sync_to_async
 def _get_character_from_db(character_id):
     try:
@@ -201,7 +225,7 @@ class RoomConsumer(AsyncJsonWebsocketConsumer):
             # ✅ 2. 방의 시나리오(토픽)를 기반으로 DB에서 모든 캐릭터 목록을 가져옵니다.
             try:
                 selected_options = await database_sync_to_async(
-                    GameRoomSelectScenario.objects.select_related('scenario').get
+                    GameRoomSelectScenario.objects.select_related('scenario', 'difficulty').get
                 )(gameroom_id=self.room_id)
                 
                 all_characters_qs = await database_sync_to_async(list)(
@@ -247,11 +271,10 @@ class RoomConsumer(AsyncJsonWebsocketConsumer):
             }
 
             # ✅ 5. "selections_confirmed" 이벤트를 모든 클라이언트에게 브로드캐스트합니다.
-            game_state = await GameState.get_game_state(self.room_id)
-            if game_state is None:
-                game_state = {}
-            game_state["character_setup"] = final_payload
-            await GameState.set_game_state(self.room_id, game_state)
+            setup_fields = {"character_setup": final_payload}
+            if selected_options.difficulty:
+                setup_fields["difficulty"] = selected_options.difficulty.name  # 판정 DC / 규칙 엔진 전용 방 구분
+            await GameState.update_state(self.room_id, fields=setup_fields)
 
             await self.channel_layer.group_send(
                 self.group_name,
@@ -261,6 +284,13 @@ class RoomConsumer(AsyncJsonWebsocketConsumer):
                 },
             )
 
+            # ✅ 6. 참가자들이 게임 화면으로 넘어가는 동안 첫 씬을 미리 생성
+            # 새 게임이므로 같은 방의 이전 게임에서 남은 첫 씬 single-flight 결과는 버림
+            await scene_flights.forget(self.room_id, 0)
+            if settings.GAME_SCENE_PREWARM:
+                with ledger.tags(room_id=self.room_id, user_id=user.id):
+                    DetachedGameConsumer(self.room_id).prewarm_first_scene(selected_options.scenario, all_characters_qs)
+
         elif action == "set_options":
             # 방장만 옵션을 변경할 수 있도록 권한을 확인합니다.
             try:
@@ -431,6 +461,8 @@ class RoomConsumer(AsyncJsonWebsocketConsumer):
             room.status = "waiting"
             await database_sync_to_async(room.save)(update_fields=["status"])
             await database_sync_to_async(cache.delete)(f"room_{self.room_id}_state")
+            await jobs.cancel_room(self.room_id)
+            await GameState.purge(self.room_id)
             await self._broadcast_state()
 
     async def _broadcast_state(self):
@@ -473,7 +505,10 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
         self.group_name = f"game_{self.room_id}"
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
-        self.gm = AIGameMaster()
+        self.gm = AsyncAIGameMaster()
+        self.history_window = HistoryWindow()
+        if settings.GAME_JOBS_ENABLED:
+            jobs.ensure_runner()
         print(f"✅ LLM GameConsumer connected for room: {self.room_id}")
 
     async def disconnect(self, code):
@@ -482,25 +517,30 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
     async def receive_json(self, content, **kwargs):
         msg_type = content.get("type")
         user = self.scope.get("user", AnonymousUser())
+        await GameState.touch(self.room_id)  # 활동 중인 방의 Redis 키 TTL 연장
 
         if msg_type == "request_initial_scene":
             scenario_title = content.get("topic")
             characters_data = content.get("characters", [])
             is_loaded_game = content.get("isLoadedGame", False) 
-            await self.handle_start_game_llm(user, scenario_title, characters_data, is_loaded_game)
+            await self.run_job("start_scene", {
+                "user_id": str(user.id) if user.is_authenticated else None,
+                "topic": scenario_title,
+                "characters": characters_data,
+                "is_loaded_game": is_loaded_game,
+            })
 
         elif msg_type == "submit_player_choice":
             player_result_data = content.get("player_result")
             all_characters = content.get("all_characters") # all_characters는 이제 참고용으로만 사용
             
-            # ✅ 1. 현재 플레이어의 결과를 Redis에 저장합니다.
-            await GameState.store_turn_result(self.room_id, str(user.id), player_result_data)
+            # ✅ 1. 현재 플레이어의 결과를 Redis에 저장하고, 제출된 결과를 같은 왕복에서 가져옵니다.
+            submitted_results = await GameState.submit_turn_result(self.room_id, str(user.id), player_result_data)
 
-            # ✅ 2. 현재 방의 모든 인간 플레이어와 제출된 결과를 가져옵니다.
+            # ✅ 2. 현재 방의 모든 인간 플레이어를 가져옵니다.
             active_participants = await self._get_active_participants()
             active_participant_ids = {str(p.user.id) for p in active_participants}
             
-            submitted_results = await GameState.get_all_turn_results(self.room_id)
             submitted_user_ids = set(submitted_results.keys())
 
             # ✅ 3. 아직 모든 플레이어가 제출하지 않았다면, '대기' 상태만 알립니다.
@@ -515,9 +555,12 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
             else:
                 print(f"[{self.room_id}] 모든 결과 수신 완료. 턴 처리 시작.")
                 human_player_results = list(submitted_results.values())
-                await self.handle_turn_resolution_with_ai(human_player_results, all_characters)
-                # 다음 턴을 위해 저장된 결과 초기화
+                # 다음 턴을 위해 저장된 결과 초기화 (판정은 작업 큐에서 진행)
                 await GameState.clear_turn_results(self.room_id)
+                await self.run_job("turn_resolution", {
+                    "human_player_results": human_player_results,
+                    "all_characters": all_characters,
+                })
 
         elif msg_type == "ready_for_next_scene":
             history_data = content.get("history")
@@ -529,58 +572,92 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
         elif msg_type == "save_game_state":
             save_data = content.get("data")
             if user.is_authenticated and save_data:
-                await self.handle_save_game_state(user, save_data)
+                await self.run_job("save", {"user_id": str(user.id), "data": save_data}, priority=jobs.BACKGROUND)
+
+    async def run_job(self, kind, payload, priority=jobs.INTERACTIVE):
+        """
+        느린 LLM 작업을 작업 큐에 넣습니다. receive_json 은 바로 반환되므로
+        준비/채팅 같은 다른 메시지는 생성이 진행되는 동안에도 계속 처리됩니다.
+        결과는 그룹 이벤트(game_broadcast) 또는 요청한 소켓으로의 job_reply 로 전달됩니다.
+        """
+        if settings.GAME_JOBS_ENABLED:
+            await jobs.enqueue(self.room_id, kind, payload, priority=priority, reply_channel=self.channel_name)
+        else:
+            await jobs.run_inline(self.room_id, kind, payload, reply_channel=self.channel_name)
+
+    async def job_reply(self, event):
+        """작업 큐에서 실행된 핸들러가 이 소켓에게만 보낸 메시지"""
+        await self.send_json(event["content"])
 
     def _get_dc(self, difficulty_str="초급"):
-        return {"초급": 10, "중급": 13, "상급": 16}.get(difficulty_str, 10)
+        return ai_planner.get_dc(difficulty_str)
 
     def _get_stat_value(self, character, stat_kr):
-        if 'stats' in character and isinstance(character['stats'], dict):
-            return character['stats'].get(stat_kr, 0)
-        stats_dict = character.get('ability', {}).get('stats', {})
-        return stats_dict.get(stat_kr, 0)
+        return ai_planner.stat_value(character, stat_kr)
 
     def _simulate_ai_turn_result(self, ai_character, choices_for_role, difficulty, role_id):
         """AI 캐릭터의 턴을 시뮬레이션하고 상세 판정 결과를 딕셔너리로 반환합니다."""
         if not choices_for_role:
             return None 
+        return ai_planner.roll(ai_character, random.choice(choices_for_role), difficulty, role_id)
 
-        ai_choice = random.choice(choices_for_role)
-        dice = random.randint(1, 20)
-        stat_kr = ai_choice['appliedStat']
-        stat_value = self._get_stat_value(ai_character, stat_kr)
-        modifier = ai_choice['modifier']
-        total = dice + stat_value + modifier
-        dc = self._get_dc(difficulty)
-        grade = "F"
-        if dice == 20: grade = "SP"
-        elif dice == 1: grade = "SF"
-        elif total >= dc: grade = "S"
-        return {
-            "role": role_id,
-            "choiceId": ai_choice['id'],
-            "grade": grade,
-            "dice": dice,
-            "appliedStat": stat_kr,
-            "statValue": stat_value,
-            "modifier": modifier,
-            "total": total,
-            "characterName": ai_character['name'],
-            "characterId": ai_character['id'],
-        }
+    def _start_ai_plan(self, scene_json):
+        """씬이 확정되면 AI 동료들의 선택/판정을 백그라운드에서 미리 계산 (사람 플레이어 고민 시간과 겹침)"""
+        if not isinstance(scene_json, dict) or scene_json.get("index") is None:
+            return
+        key = (str(self.room_id), scene_json["index"])
 
-    def _build_shari_state(self, all_characters: list, current_scene: dict, history: list) -> dict:
-        """현재 게임 정보를 SHARI 엔진이 요구하는 state JSON 형식으로 변환합니다."""
+        async def plan():
+            try:
+                setup = await GameState.get_state_fields(self.room_id, "character_setup", "difficulty")
+                ai_characters = (setup.get("character_setup") or {}).get("aiCharacters") or []
+                if not ai_characters:
+                    return None
+                result = await ai_planner.plan_scene(scene_json, ai_characters, setup.get("difficulty", "초급"))
+                await GameState.set_ai_plan(self.room_id, scene_json["index"], result)
+                return result
+            except Exception as e:
+                print(f"❌ AI 동료 행동 계획 실패 (Room: {self.room_id}): {e}")
+                return None
+
+        task = asyncio.create_task(plan())
+        _ai_plan_tasks[key] = task
+
+        def forget(done):
+            if _ai_plan_tasks.get(key) is done:
+                del _ai_plan_tasks[key]
+        task.add_done_callback(forget)
+
+    async def _get_ai_plan(self, scene_index):
+        """미리 계산된 AI 행동 계획 (이 프로세스에서 계산 중이면 기다림, 없으면 빈 계획)"""
+        task = _ai_plan_tasks.get((str(self.room_id), scene_index))
+        if task and not task.done():
+            await asyncio.wait({task}, timeout=settings.GAME_AI_PLAN_WAIT_SECONDS)
+        plan = await GameState.get_ai_plan(self.room_id, scene_index)
+        return (plan or {}).get("plans", {})
+
+    def _build_shari_state(self, all_characters: list, current_scene: dict, history: list, history_offset: int = 0,
+                           saved_party: list = None) -> dict:
+        """
+        현재 게임 정보를 SHARI 엔진이 요구하는 state JSON 형식으로 변환합니다.
+        history_offset: 대화 기록 앞에서 지금까지 잘려 나간 메시지 수 (방 상태의 history_offset)
+        saved_party: 방 상태의 party (지난 턴들의 능력치/체력/상태 변화가 반영된 sheet)
+        """
+        saved_sheets = {str(p.get("id")): p.get("sheet") or {} for p in saved_party or [] if isinstance(p, dict)}
         party = []
         for char in all_characters:
-            # 기존 캐릭터 데이터 구조를 SHARI의 sheet 형식으로 맞춤
+            saved = saved_sheets.get(str(char['id']), {})
+            # 기존 캐릭터 데이터 구조를 SHARI의 sheet 형식으로 맞춤 (판정으로 바뀐 값이 있으면 그 값)
             sheet = {
-                "stats": char.get('stats', {}),
+                "stats": {**char.get('stats', {}), **saved.get('stats', {})},
                 "skills": [s.get('name') for s in char.get('skills', [])],
                 "items": char.get('items', []),
                 "spells": [], # 주문이 있다면 여기에 추가
                 "notes": char.get('description', '')
             }
+            for field in ("hp", "status"):
+                if field in saved:
+                    sheet[field] = saved[field]
             party.append({
                 "id": char['id'], # user.id가 아닌 character.id를 고유 식별자로 사용
                 "name": char['name'],
@@ -590,7 +667,11 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
             })
 
         # 지난 대화 기록을 요약하여 로그에 추가
-        log = [{"turn": i, "narration": h.get("content", "")} for i, h in enumerate(history) if h.get("role") == "assistant"]
+        # 번호는 잘려 나간 메시지까지 센 절대 위치 → 윈도우가 앞에서 잘려도 같은 메시지는 같은 번호 (gm_log_digest.until_turn 기준)
+        log = [
+            {"turn": history_offset + i, "narration": h.get("content", "")}
+            for i, h in enumerate(history) if h.get("role") == "assistant"
+        ]
 
         return {
             "session_id": str(self.room_id),
@@ -620,7 +701,17 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
             return
 
         # 1. SHARI 엔진에 입력할 데이터 준비 (기존과 동일)
-        shari_state = self._build_shari_state(all_characters, current_scene, history)
+        shari_state = self._build_shari_state(
+            all_characters, current_scene, history, state.get("history_offset", 0), state.get("party"),
+        )
+        # 오래된 턴은 rolling summary 로 접고, 접힌 결과는 방 상태에 보관해 다음 턴에 재사용
+        shari_state, digest_metrics = digest_state(
+            shari_state,
+            token_budget=settings.GM_STATE_TOKEN_BUDGET,
+            keep_recent=settings.GM_STATE_KEEP_RECENT_TURNS,
+            log_digest=state.get("gm_log_digest"),
+        )
+        print(f"📉 GM 상태 다이제스트: {digest_metrics['tokens_before']} → {digest_metrics['tokens_after']} tokens")
         
         shari_choices = {}
         human_char_ids = {res['characterId'] for res in human_player_results}
@@ -635,43 +726,91 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
 
         ai_characters = [c for c in all_characters if c['id'] not in human_char_ids]
         
-        # ✨ 2. AI 캐릭터 턴 시뮬레이션 및 결과 생성
+        # ✨ 2. AI 캐릭터 턴: 씬 확정 시 미리 계산해 둔 계획을 쓰고, 없거나 역할이 다르면 지금 계산
+        ai_plans = await self._get_ai_plan(current_scene.get('index')) if ai_characters else {}
         ai_player_results = []
         for ai_char in ai_characters:
             role_id = ai_char.get('role_id')
-            choices_for_role = scene_choices_data.get(role_id, [])
-            
-            # AI의 선택지를 shari_choices에 추가
-            if choices_for_role:
-                random_choice = random.choice(choices_for_role)
-                shari_choices[ai_char['id']] = random_choice['text']
-            else:
-                shari_choices[ai_char['id']] = "상황을 지켜봄"
-            
-            # AI의 판정 결과를 생성
-            ai_result = self._simulate_ai_turn_result(ai_char, choices_for_role, difficulty, role_id)
-            if ai_result:
-                ai_player_results.append(ai_result)
+            planned = ai_plans.get(str(ai_char['id']))
+            if not planned or planned.get('role') != role_id:
+                planned = await ai_planner.plan_character(ai_char, role_id, current_scene, difficulty)
+
+            # AI의 선택지를 shari_choices에 추가하고, 판정 결과를 모읍니다.
+            shari_choices[ai_char['id']] = planned['text']
+            if planned['result']:
+                ai_player_results.append(planned['result'])
 
         # ✨ 3. 인간과 AI의 모든 결과를 합칩니다.
         all_player_results = human_player_results + ai_player_results
         
-        # 4. SHARI 엔진 호출 (기존과 동일)
-        try:
+        # 4. SHARI 엔진 호출 (파이프라인 모드면 내레이션이 닫히는 즉시 먼저 전송)
+        sent_narration = None
+
+        async def on_field(key, value):
+            nonlocal sent_narration
+            if key == "narration":
+                sent_narration = value
+                await self.broadcast_to_group({"event": "turn_partial", "field": "narration", "value": value})
+
+        # LLM 이 SLO 안에 답하지 않거나 실패하면(또는 규칙 전용 난이도면) 규칙 엔진으로 바로 판정해 방이 멈추지 않게 함
+        # 단, 내레이션을 이미 turn_partial 로 보냈으면 플레이어가 읽고 있으므로 SLO 를 넘겨도 GM 응답을 끝까지 기다림
+        gm_result = None
+        if difficulty in settings.GM_RULES_ONLY_DIFFICULTIES:
+            print(f"⚡ 규칙 엔진 전용 방 (난이도: {difficulty}). Turn: {shari_state['turn']}")
+        else:
             print(f"🚀 SHARI 엔진 호출 시작. Turn: {shari_state['turn']}")
-            gm_result = await sync_to_async(self.gm.resolve_turn)(state=shari_state, choices=shari_choices)
-            print("🎉 SHARI 엔진 응답 수신 완료.")
-        except Exception as e:
-            print(f"❌ SHARI 엔진 호출 중 심각한 오류 발생: {e}")
-            await self.send_error_message(f"AI 게임 마스터 엔진 오류: {e}")
-            return
-        
-        next_game_state = apply_gm_result_to_state(state, gm_result)
+            task = asyncio.ensure_future(
+                self.gm.resolve_turn(state=shari_state, choices=shari_choices, on_field=on_field if settings.GAME_GM_PIPELINE else None)
+            )
+            try:
+                done, _ = await asyncio.wait({task}, timeout=settings.GM_RESOLVE_SLO_SECONDS)
+                if not done and sent_narration is not None:
+                    print(f"⏱️ SHARI 엔진 SLO({settings.GM_RESOLVE_SLO_SECONDS}s) 초과, 내레이션이 이미 전송되어 응답을 기다립니다.")
+                    await asyncio.wait({task})
+                if task.done():
+                    gm_result = task.result()
+                    print("🎉 SHARI 엔진 응답 수신 완료.")
+                else:
+                    task.cancel()
+                    print(f"⏱️ SHARI 엔진 응답 지연 ({settings.GM_RESOLVE_SLO_SECONDS}s 초과). 규칙 엔진으로 판정합니다.")
+            except Exception as e:
+                print(f"❌ SHARI 엔진 호출 중 심각한 오류 발생: {e}. 규칙 엔진으로 판정합니다.")
+        if gm_result is None:
+            gm_result = rules_engine.resolve_turn(
+                current_scene, all_player_results, all_characters, shari_choices,
+                turn=shari_state.get('turn', 0), difficulty=difficulty,
+            )
+            if sent_narration is not None:
+                # 이미 보낸 내레이션과 turn_resolved 가 어긋나지 않도록 유지
+                gm_result["narration"] = sent_narration
         
         narration = gm_result.get('narration', '아무 일도 일어나지 않았습니다.')
-        next_game_state["conversation_history"].append({"role": "user", "content": f"(이번 턴 요약:\n{shari_choices})"})
-        next_game_state["conversation_history"].append({"role": "assistant", "content": narration})
-        await GameState.set_game_state(self.room_id, next_game_state)
+        turn_messages = [
+            {"role": "user", "content": f"(이번 턴 요약:\n{shari_choices})"},
+            {"role": "assistant", "content": narration},
+        ]
+
+        def apply(latest):
+            # 판정하는 동안 바뀐 최신 상태 위에 결과를 적용 (바뀐 필드와 이번 턴 메시지만 저장됨)
+            latest["gm_log_digest"] = shari_state["log_digest"]
+            # 캐릭터 sheet 를 방 상태에 두어 party 변화(능력치/체력/상태)가 누적되게 함
+            if "party" not in latest:
+                latest["party"] = [{"id": p["id"], "name": p["name"], "sheet": p.get("sheet", {})} for p in shari_state["party"]]
+            next_state = apply_gm_result_to_state(latest, gm_result)
+            next_state["conversation_history"] = next_state.get("conversation_history", []) + turn_messages
+            return next_state
+
+        next_game_state = await GameState.update(self.room_id, apply)
+
+        # 플레이어가 결과를 읽는 동안 다음 씬을 미리 생성 (모두 준비되면 handle_generate_next_scene 이 꺼내 씀)
+        if settings.GAME_GM_PIPELINE:
+            next_index = current_scene['index'] + 1
+            self._start_pending_scene(
+                next_index,
+                next_game_state["conversation_history"],
+                f"위 턴의 결과를 반영해서, 다음 씬(sceneIndex: {next_index})의 JSON 데이터를 생성해줘.",
+                choices=list(shari_choices.values()),  # 이 선행 생성이 반영한 선택 (다음 씬 요청과 비교)
+            )
 
         party_update = gm_result.get('party', [])
         if party_update:
@@ -695,6 +834,7 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
             "world_update": gm_result.get('world'),
             "party_update": party_update,
             "shari": gm_result.get('shari'),
+            "engine": gm_result.get('engine', 'llm'),
         })
 
     async def handle_ready_for_next_scene(self, user, history_data):
@@ -706,8 +846,7 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
             return
 
         # 1. 현재 유저를 '준비' 상태로 기록합니다.
-        await GameState.set_user_ready_for_next_scene(self.room_id, str(user.id))
-        ready_users_set = await GameState.get_ready_users_for_next_scene(self.room_id)
+        ready_users_set = await GameState.mark_ready_for_next_scene(self.room_id, str(user.id))
         
         # 2. 현재 방의 모든 활성 참가자 목록을 가져옵니다.
         #    (이 부분은 DB 조회 대신 캐시된 RoomConsumer의 참가자 목록을 활용할 수도 있습니다)
@@ -724,42 +863,51 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
         # 4. 모든 참가자가 준비되었는지 확인합니다.
         if active_participant_ids.issubset(ready_users_set):
             print(f"✅ 모든 플레이어 준비 완료. 다음 씬을 생성합니다. Room: {self.room_id}")
-            
-            # 5. (기존 로직) LLM을 호출하여 다음 씬 JSON을 생성합니다.
-            state = await GameState.get_game_state(self.room_id)
-            history = state.get("conversation_history", [])
-            username = user.name
-            
-            last_choice = history_data.get("lastChoice", {})
-            last_narration = history_data.get("lastNarration", "특별한 일은 없었다.")
-            current_scene_index = history_data.get("sceneIndex", 0)
-            usage_data = history_data.get("usage")
-            usage_text = ""
+            await self.run_job("next_scene", {"user_id": str(user.id), "history": history_data})
+
+    async def handle_generate_next_scene(self, user, history_data):
+        """모든 플레이어가 준비된 뒤 LLM을 호출하여 다음 씬 JSON을 생성합니다."""
+        state = await GameState.get_game_state(self.room_id)
+        history = state.get("conversation_history", [])
+        username = user.name
+        
+        last_choice = history_data.get("lastChoice", {})
+        last_narration = history_data.get("lastNarration", "특별한 일은 없었다.")
+        current_scene_index = history_data.get("sceneIndex", 0)
+        usage_data = history_data.get("usage")
+        usage_text = ""
+        if usage_data:
+            usage_type = "스킬" if usage_data.get("type") == "skill" else "아이템"
+            usage_name = usage_data.get("data", {}).get("name", "")
+            usage_text = f"또한, 플레이어는 방금 '{usage_name}' {usage_type}을(를) 사용했어."
+
+        user_message = f"""
+        플레이어 '{username}' (역할: {last_choice.get('role')})가 이전 씬에서 다음 선택지를 골랐고, 아래와 같은 결과를 얻었어.
+        - 선택 내용: "{last_choice.get('text')}"
+        - 결과: "{last_narration}"
+        {usage_text}
+        이 결과를 반영해서, 다음 씬(sceneIndex: {current_scene_index + 1})의 JSON 데이터를 생성해줘.
+        """
+
+        def covers(pending):
+            # 턴 판정 직후의 선행 생성은 스킬/아이템 사용과 판정에 없던 선택을 모름 → 그런 요청이면 새로 생성
             if usage_data:
-                usage_type = "스킬" if usage_data.get("type") == "skill" else "아이템"
-                usage_name = usage_data.get("data", {}).get("name", "")
-                usage_text = f"또한, 플레이어는 방금 '{usage_name}' {usage_type}을(를) 사용했어."
-
-            user_message = f"""
-            플레이어 '{username}' (역할: {last_choice.get('role')})가 이전 씬에서 다음 선택지를 골랐고, 아래와 같은 결과를 얻었어.
-            - 선택 내용: "{last_choice.get('text')}"
-            - 결과: "{last_narration}"
-            {usage_text}
-            이 결과를 반영해서, 다음 씬(sceneIndex: {current_scene_index + 1})의 JSON 데이터를 생성해줘.
-            """
-            scene_json = await self.ask_llm_for_scene_json(history, user_message)
-
-            if scene_json:
-                world_data = {
-                    "location": scene_json.get("round", {}).get("title"),
-                    "notes": scene_json.get("round", {}).get("description")
-                }
-                await self.broadcast_to_group({
-                    "event": "scene_update",
-                    "scene": scene_json,
-                    "world": world_data
-                })
-                await GameState.clear_ready_users_for_next_scene(self.room_id)
+                return False
+            return not last_choice.get("text") or last_choice["text"] in pending.get("choices", [])
+
+        scene_json, leader = await self.generate_scene(current_scene_index + 1, history, user_message, accept_pending=covers)
+
+        if scene_json and leader:
+            world_data = {
+                "location": scene_json.get("round", {}).get("title"),
+                "notes": scene_json.get("round", {}).get("description")
+            }
+            await self.broadcast_to_group({
+                "event": "scene_update",
+                "scene": scene_json,
+                "world": world_data
+            })
+            await GameState.clear_ready_users_for_next_scene(self.room_id)
 
     # ✅ [추가] 현재 방의 참가자 목록을 가져오는 헬퍼 함수
     @database_sync_to_async
@@ -778,6 +926,9 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
         system_prompt = self.create_system_prompt_for_json(scenario, characters_data)
 
         conversation_history = choice_history.get("conversation_history", [system_prompt])
+        if choice_history.get("history_summary"):
+            # 저장 당시의 줄거리 요약을 방 상태로 복원해 윈도우 밖 기록을 대신하게 함
+            await GameState.update_state(self.room_id, fields={"history_summary": choice_history["history_summary"]})
 
         last_full_summary = choice_history.get("summary", "이전 기록을 찾을 수 없습니다.")
         recent_logs = choice_history.get("recent_logs", [])
@@ -796,8 +947,8 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
         이전 씬의 sceneIndex가 {previous_index} 이었으니, 다음 씬의 index는 {previous_index + 1}(으)로 생성해야 해.
         """
 
-        scene_json = await self.ask_llm_for_scene_json(conversation_history, user_message)
-        if scene_json:
+        scene_json, leader = await self.generate_scene(previous_index + 1, conversation_history, user_message)
+        if scene_json and leader:
             player_state = choice_history.get("playerState", {})
             await self.broadcast_to_group({
                 "event": "game_loaded", # ✅ 새로운 이벤트 이름
@@ -825,66 +976,49 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
                 await self.send_error_message("이어할 게임 기록을 찾을 수 없습니다.")
             return
         
-        # 1. 기존 상태를 먼저 불러와서 character_setup 정보를 확보합니다.
-        game_state = await GameState.get_game_state(self.room_id)
-        character_setup_data = game_state.get("character_setup")
-
-        # 2. 이제 새 게임을 위해 대화 기록만 초기화합니다. 캐릭터 정보는 유지됩니다.
-        print(f"ℹ️  새 게임 시작. 대화 기록을 초기화하지만 캐릭터 정보는 유지합니다.")
-        game_state = { "character_setup": character_setup_data } # character_setup 보존
-        await GameState.set_game_state(self.room_id, game_state)
-
         scenario = await self.get_scenario_from_db(scenario_title)
         if not scenario:
             await self.send_error_message(f"시나리오 '{scenario_title}'를 찾을 수 없습니다.")
             return
         
         # characters_data는 LLM 프롬프트 생성에만 사용됩니다.
-        system_prompt = self.create_system_prompt_for_json(scenario, characters_data)
+        # 로비에서 같은 시나리오로 첫 씬을 미리 생성해 뒀다면 그때의 (서버 DB 기준) 프롬프트를 그대로 써서 이어받음
+        prewarmed = await GameState.get_pending_scene(self.room_id, 0)
+        if prewarmed and prewarmed.get("scenario") == scenario.title and prewarmed.get("system_prompt"):
+            system_prompt = prewarmed["system_prompt"]
+        else:
+            system_prompt = self.create_system_prompt_for_json(scenario, characters_data)
         initial_history = [system_prompt]
 
-        user_message = "모든 캐릭터가 참여하는 게임의 첫 번째 씬(sceneIndex: 0)을 생성해줘. 비극적인 사건 직후의 긴장감 있는 상황으로 시작해줘."
-        scene_json = await self.ask_llm_for_scene_json(initial_history, user_message)
+        async def reset_state():
+            # 1. 기존 상태에서 character_setup / 난이도만 가져옵니다.
+            setup = await GameState.get_state_fields(self.room_id, "character_setup", "difficulty")
 
-        if scene_json:
-            world_data = {
+            # 2. 이제 새 게임을 위해 대화 기록을 system 프롬프트만 남기고 초기화합니다. 캐릭터 정보는 유지됩니다.
+            print(f"ℹ️  새 게임 시작. 대화 기록을 초기화하지만 캐릭터 정보는 유지합니다.")
+            game_state = { "character_setup": setup.get("character_setup"), "conversation_history": list(initial_history) } # character_setup 보존
+            if setup.get("difficulty"):
+                game_state["difficulty"] = setup["difficulty"]  # 로비에서 정한 난이도 보존
+            await GameState.set_game_state(self.room_id, game_state)
+
+        # 초기화는 첫 씬을 실제로 생성하는 요청(leader)만 수행 → 재접속 등 중복 요청이 이미 만든 첫 씬을 지우지 않음
+        scene_json, leader = await self.generate_scene(0, initial_history, FIRST_SCENE_MESSAGE, prepare=reset_state)
+        if not scene_json:
+            return
+
+        event = {
+            "event": "scene_update",
+            "scene": scene_json,
+            "world": {
                 "location": scene_json.get("round", {}).get("title"),
                 "notes": scene_json.get("round", {}).get("description")
-            }
-            await self.broadcast_to_group({
-                "event": "scene_update",
-                "scene": scene_json,
-                "world": world_data
-            })
-
-    async def ask_llm_for_scene_json(self, history, user_message):
-        """LLM을 호출하여 JSON 형식의 씬 데이터를 받고, 파싱하여 반환"""
-        history.append({"role": "user", "content": user_message})
-        
-        try:
-            completion = await oai_client.chat.completions.create(
-                model=OAI_DEPLOYMENT,
-                messages=history,
-                max_tokens=4000,
-                temperature=0.7
-            )
-            response_text = completion.choices[0].message.content
-            json_str = self.extract_json_block(response_text)
-            scene_json = json.loads(json_str)
-            
-            history.append({"role": "assistant", "content": response_text})
-            
-            game_state = await GameState.get_game_state(self.room_id)
-            game_state["current_scene"] = scene_json
-            game_state["conversation_history"] = history
-            await GameState.set_game_state(self.room_id, game_state)
-            
-            return scene_json
-        except Exception as e:
-            error_message = f"LLM 응답 처리 중 오류: {e}"
-            print(f"❌ {error_message}")
-            await self.send_error_message(error_message)
-            return None
+            },
+        }
+        if leader:
+            await self.broadcast_to_group(event)
+        else:
+            # 이미 생성된(또는 생성 중이던) 첫 씬을 늦게 요청한 소켓에만 다시 전송
+            await self.send_json({"type": "game_update", "payload": event})
 
     async def clear_previous_session_history(self, user):
         """데이터베이스에서 해당 유저와 게임방의 choice_history를 비웁니다."""
@@ -915,30 +1049,43 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
         - 선택지 내용: "{choice_data['text']}"
         이 선택의 결과를 반영해서, 다음 씬(sceneIndex: {choice_data['sceneIndex'] + 1})의 JSON 데이터를 생성해줘.
         """
-        scene_json = await self.ask_llm_for_scene_json(history, user_message)
-        if scene_json:
+        scene_json, leader = await self.generate_scene(choice_data['sceneIndex'] + 1, history, user_message)
+        if scene_json and leader:
             await self.broadcast_to_group({ "event": "scene_update", "scene": scene_json })
 
-    async def _summarize_with_llm(self, text: str) -> str:
-        """주어진 텍스트를 LLM을 사용해 한두 문장으로 요약합니다."""
+    async def _summarize_with_llm(self, text: str, previous_summary: str = None) -> str:
+        """
+        주어진 텍스트를 LLM을 사용해 한두 문장으로 요약합니다.
+        previous_summary 가 있으면 기존 요약에 새 기록(text)만 접어 넣은 요약을 만듭니다.
+        실패하면 None 을 반환합니다.
+        """
         if not text:
-            return "아직 기록된 행동이 없습니다."
+            return previous_summary
+        if previous_summary:
+            user_content = (
+                f"기존 요약:\n{previous_summary}\n\n"
+                f"이후에 추가된 게임 플레이 기록:\n{text}\n\n"
+                "기존 요약에 추가된 기록을 반영해 전체 줄거리를 한두 문장으로 다시 요약해줘."
+            )
+        else:
+            user_content = f"다음 게임 플레이 기록을 한 문장으로 요약해줘:\n\n{text}"
         try:
             summary_prompt = [
                 {"role": "system", "content": "너는 플레이 로그를 분석하고 핵심만 간결하게 한 문장으로 요약하는 AI다."},
-                {"role": "user", "content": f"다음 게임 플레이 기록을 한 문장으로 요약해줘:\n\n{text}"}
+                {"role": "user", "content": user_content}
             ]
-            completion = await oai_client.chat.completions.create(
-                model=OAI_DEPLOYMENT,
+            completion = await gateway.achat_completion(
                 messages=summary_prompt,
                 max_tokens=200,
-                temperature=0.5
+                temperature=0.5,
+                priority=gateway.BACKGROUND,
+                call_site="game.save_summary"
             )
             summary = completion.choices[0].message.content
             return summary.strip()
         except Exception as e:
             print(f"❌ 요약 생성 중 오류 발생: {e}")
-            return "요약을 생성하는 데 실패했습니다."
+            return None
 
     @database_sync_to_async
     def _get_choice_history_from_db(self, user, room_id):
@@ -973,16 +1120,24 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
 
         game_state = await GameState.get_game_state(room_id)
         conversation_history = game_state.get("conversation_history", [])
-        
-        formatted_log_text = "\n".join([f"- {e.get('scene', '')}: {e.get('choice', '')}" for e in log_history])
-        full_summary = await self._summarize_with_llm(formatted_log_text)
+
+        # 요약은 저장 응답을 막지 않도록 백그라운드에서 갱신합니다.
+        # 그 전까지는 이전 요약(없으면 최근 기록)을 그대로 저장해 둡니다.
+        previous = previous_history if isinstance(previous_history, dict) else {}
+        summarized_count = min(int(previous.get("summarized_count", 0) or 0), len(log_history))
         recent_logs_to_save = log_history[-3:]
+        summary = previous.get("summary") if summarized_count else None
+        if not summary:
+            summary = self._format_save_log(recent_logs_to_save)
 
         new_history_entry = {
-            "summary": full_summary,
+            "summary": summary,
+            "summarized_count": summarized_count,
+            "summary_full_at": min(int(previous.get("summary_full_at", 0) or 0), summarized_count),
             "recent_logs": recent_logs_to_save,
             "full_log_history": log_history,
             "conversation_history": conversation_history,
+            "history_summary": game_state.get("history_summary", ""),
             "sceneIndex": data.get("sceneIndex", 0),
             "description": data.get("description", ""),
             "choices": data.get("choices", {}),
@@ -996,9 +1151,82 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
 
         if was_successful:
             await self.send_json({"type": "save_success", "message": "게임 진행 상황이 저장되었습니다."})
+            self._schedule_save_summary(user)
         else:
             await self.send_error_message("게임 저장에 실패했습니다.")
 
+    @staticmethod
+    def _format_save_log(entries):
+        return "\n".join([f"- {e.get('scene', '')}: {e.get('choice', '')}" for e in entries])
+
+    def _schedule_save_summary(self, user):
+        """저장된 로그 중 아직 요약에 반영되지 않은 부분을 백그라운드에서 요약합니다."""
+        # 저장 작업마다 consumer 가 새로 만들어지므로 방 단위로 프로세스 전역에서 하나만 실행
+        key = str(self.room_id)
+        task = _save_summary_tasks.get(key)
+        if task and not task.done():
+            return  # 실행 중인 작업이 새로 저장된 기록까지 이어서 처리
+        task = asyncio.create_task(self._refresh_save_summary(user))
+        _save_summary_tasks[key] = task
+
+        def forget(done):
+            if _save_summary_tasks.get(key) is done:
+                del _save_summary_tasks[key]
+        task.add_done_callback(forget)
+
+    async def _refresh_save_summary(self, user):
+        """
+        이전 요약 + 마지막 요약 이후 추가된 기록만 LLM 에 보내 요약을 갱신합니다.
+        요약이 없거나 GAME_SAVE_SUMMARY_FULL_EVERY 개의 기록이 쌓일 때마다
+        전체 기록으로 다시 요약해 누적 오차(drift)를 바로잡습니다.
+        """
+        full_every = getattr(settings, "GAME_SAVE_SUMMARY_FULL_EVERY", 20)
+        try:
+            while True:
+                history = await self._get_choice_history_from_db(user, self.room_id)
+                if not isinstance(history, dict):
+                    return
+                log_history = history.get("full_log_history") or []
+                summarized_count = int(history.get("summarized_count", 0) or 0)
+                if summarized_count >= len(log_history):
+                    return
+
+                full = summarized_count == 0 or len(log_history) - int(history.get("summary_full_at", 0) or 0) >= full_every
+                if full:
+                    summary = await self._summarize_with_llm(self._format_save_log(log_history))
+                else:
+                    summary = await self._summarize_with_llm(
+                        self._format_save_log(log_history[summarized_count:]),
+                        previous_summary=history.get("summary"),
+                    )
+                if not summary:
+                    return
+
+                stored = await self._store_save_summary(self.room_id, summary, len(log_history), full)
+                if stored:
+                    mode = "전체" if full else "증분"
+                    print(f"🧾 저장 요약 갱신({mode}): 기록 {summarized_count} → {len(log_history)}개 (Room: {self.room_id})")
+        except Exception as e:
+            print(f"❌ 저장 요약 갱신 중 오류 발생: {e}")
+
+    @database_sync_to_async
+    def _store_save_summary(self, room_id, summary, summarized_count, full):
+        """요약하는 동안 다른 저장이 있었을 수 있으므로 요약 관련 필드만 병합해서 저장합니다."""
+        with transaction.atomic():
+            session = MultimodeSession.objects.select_for_update().filter(gameroom_id=room_id).first()
+            if not session or not isinstance(session.choice_history, dict):
+                return False
+            choice_history = session.choice_history
+            if int(choice_history.get("summarized_count", 0) or 0) >= summarized_count:
+                return False  # 더 최신 요약이 이미 저장됨
+            choice_history["summary"] = summary
+            choice_history["summarized_count"] = summarized_count
+            if full:
+                choice_history["summary_full_at"] = summarized_count
+            session.choice_history = choice_history
+            session.save(update_fields=["choice_history"])
+            return True
+
     @database_sync_to_async
     def _save_to_db(self, user, room_id, new_entry, character_data):
         """DB에 choice_history와 character_history를 저장합니다."""
@@ -1045,40 +1273,295 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
             print(f"❌ DB 저장 중 심각한 오류 발생: {e}")
             return False
 
+    async def generate_scene(self, scene_index, history, user_message, prepare=None, accept_pending=None):
+        """
+        (방, 씬 번호)당 한 번만 씬을 생성합니다. 동시에 들어온 중복 요청은 같은 결과를 받고,
+        실제로 생성한 요청만 leader=True 로 브로드캐스트를 담당합니다.
+        미리 생성해 둔 씬(_start_pending_scene)이 있으면 LLM 을 다시 부르지 않고 그것을 확정합니다.
+        prepare 는 생성 직전에 leader 만 실행하는 상태 준비 코루틴 함수,
+        accept_pending(pending) 이 False 면 미리 생성된 씬이 이 요청의 입력을 반영하지 못한 것으로 보고 새로 생성합니다.
+        """
+        async def produce():
+            if prepare is not None:
+                await prepare()
+            pending = await self._take_pending_scene(scene_index, history, accept_pending)
+            if pending:
+                print(f"⚡ 미리 생성된 씬 사용 (Room: {self.room_id}, Scene: {scene_index})")
+                # 대화 기록에는 이 요청의 실제 메시지를 남김 (이후 씬 생성이 선택/사용 내용을 보도록)
+                history.append({"role": "user", "content": user_message})
+                return await self._commit_scene(history, pending["response_text"], pending["scene"])
+            return await self.ask_llm_for_scene_json(history, user_message)
+
+        return await scene_flights.do(self.room_id, scene_index, produce)
+
     async def ask_llm_for_scene_json(self, history, user_message):
         """LLM을 호출하여 JSON 형식의 씬 데이터를 받고, 파싱하여 반환"""
         history.append({"role": "user", "content": user_message})
         
         try:
-            completion = await oai_client.chat.completions.create(
-                model=OAI_DEPLOYMENT,
-                messages=history,
+            response_text, scene_json = await self._request_scene(history, stream=settings.GAME_SCENE_STREAMING)
+            return await self._commit_scene(history, response_text, scene_json)
+        except Exception as e:
+            error_message = f"LLM 응답 처리 중 오류: {e}"
+            print(f"❌ {error_message}")
+            await self.send_error_message(error_message)
+            return None
+
+    async def _request_scene(self, history, stream):
+        """씬을 생성만 하고 (응답 원문, 펼친 씬 JSON) 을 반환. stream 이면 scene_partial 을 선전송"""
+        summary = (await GameState.get_state_fields(self.room_id, "history_summary")).get("history_summary")
+        # system + 줄거리 요약 + 최근 윈도우만 전송 (캠페인 길이와 무관한 프롬프트 크기)
+        messages = self.history_window.prompt_messages(history, summary)
+
+        if stream:
+            response_text, scene_json = await self._stream_scene_json(messages)
+        else:
+            completion = await gateway.achat_completion(
+                messages=messages,
                 max_tokens=4000,
-                temperature=0.7
+                temperature=0.7,
+                call_site="game.scene"
             )
             response_text = completion.choices[0].message.content
             json_str = self.extract_json_block(response_text)
             scene_json = json.loads(json_str)
-            
-            history.append({"role": "assistant", "content": response_text})
-            
-            game_state = await GameState.get_game_state(self.room_id)
-            game_state["current_scene"] = scene_json
-            game_state["conversation_history"] = history
-            await GameState.set_game_state(self.room_id, game_state)
-            
-            return scene_json
+        # 압축 형식이면 기존 current_scene 형식으로 펼침 (대화 기록에는 압축 응답 그대로 남김)
+        return response_text, scene_format.expand_scene(scene_json)
+
+    async def _commit_scene(self, history, response_text, scene_json):
+        """
+        생성된 씬을 current_scene 으로 확정하고 대화 기록에 붙임.
+        history 는 저장된 대화 기록 + 요청 메시지여야 함 (저장소에는 요청/응답 두 메시지만 추가)
+        """
+        history.append({"role": "assistant", "content": response_text})
+        _, overflow = self.history_window.trim(history)
+
+        fields = {"current_scene": scene_json}
+        if overflow:
+            # 앞에서 잘라낸 메시지 수를 누적 (GM 로그 번호가 잘림과 무관하게 늘어나도록)
+            offset = (await GameState.get_state_fields(self.room_id, "history_offset")).get("history_offset", 0)
+            fields["history_offset"] = offset + len(overflow)
+        await GameState.update_state(
+            self.room_id,
+            fields=fields,
+            append_history=history[-2:],
+            drop_history=len(overflow),
+            append_overflow=overflow,
+        )
+        if overflow:
+            self._schedule_history_summary()
+        self._start_ai_plan(scene_json)
+
+        return scene_json
+
+    def _start_pending_scene(self, scene_index, history, user_message, replace=False, **meta):
+        """
+        다음 씬을 확정 전에 미리 생성해 Redis 에 보관합니다 (current_scene 은 건드리지 않음).
+        결과는 generate_scene() 이 같은 씬 번호를 요청할 때, 그 사이 대화 기록이 바뀌지 않았으면 사용합니다.
+        replace 면 진행 중인 선행 생성을 취소하고 새로 시작, meta 는 기록에 함께 저장됩니다.
+        """
+        key = (str(self.room_id), int(scene_index))
+        task = _pending_scene_tasks.get(key)
+        if task and not task.done():
+            if not replace:
+                return
+            task.cancel()
+        task = asyncio.create_task(self._generate_pending_scene(scene_index, list(history), user_message, meta))
+        _pending_scene_tasks[key] = task
+
+        def forget(done):
+            if _pending_scene_tasks.get(key) is done:
+                del _pending_scene_tasks[key]
+        task.add_done_callback(forget)
+
+    def prewarm_first_scene(self, scenario, characters):
+        """로비 확정 시점에 DB 의 시나리오/캐릭터로 첫 씬(sceneIndex 0)을 미리 생성 (handle_start_game_llm 이 이어받음)"""
+        system_prompt = self.create_system_prompt_for_json(scenario, [
+            {"name": c.name, "description": c.description, "ability": c.ability or {}} for c in characters
+        ])
+        self._start_pending_scene(
+            0, [system_prompt], FIRST_SCENE_MESSAGE, replace=True,
+            scenario=scenario.title, system_prompt=system_prompt,
+        )
+        print(f"🔥 첫 씬 사전 생성 시작 (Room: {self.room_id}, 시나리오: {scenario.title})")
+
+    async def _generate_pending_scene(self, scene_index, history, user_message, meta):
+        ttl = settings.GAME_SCENE_FLIGHT_LOCK_TTL
+        base = {**meta, "user_message": user_message, "base": _history_digest(history)}
+        await GameState.set_pending_scene(self.room_id, scene_index, {**base, "status": "running"}, ttl=ttl)
+        started = asyncio.get_running_loop().time()
+        try:
+            # 선행 생성은 아직 보여 줄 씬이 아니므로 scene_partial 을 보내지 않음
+            response_text, scene_json = await self._request_scene(
+                history + [{"role": "user", "content": user_message}], stream=False,
+            )
         except Exception as e:
-            error_message = f"LLM 응답 처리 중 오류: {e}"
-            print(f"❌ {error_message}")
-            await self.send_error_message(error_message)
+            print(f"❌ 다음 씬 선행 생성 실패 (Room: {self.room_id}, Scene: {scene_index}): {e}")
+            await GameState.clear_pending_scene(self.room_id, scene_index)
+            return
+        await GameState.set_pending_scene(self.room_id, scene_index, {
+            **base, "status": "ready", "response_text": response_text, "scene": scene_json,
+        })
+        elapsed = asyncio.get_running_loop().time() - started
+        print(f"🔮 다음 씬 선행 생성 완료 (Room: {self.room_id}, Scene: {scene_index}, {elapsed:.1f}s)")
+
+    async def _take_pending_scene(self, scene_index, history, accept=None):
+        """
+        미리 생성된 씬을 꺼냄. 아직 생성 중이면 끝날 때까지 기다리고(새로 생성하는 것보다 빠름),
+        그 사이 대화 기록이 달라졌거나(다른 경로로 진행됨) accept(pending) 가 거절하면 버립니다.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.GAME_SCENE_FLIGHT_LOCK_TTL
+        task = _pending_scene_tasks.get((str(self.room_id), int(scene_index)))
+        if task and not task.done():
+            await asyncio.wait({task}, timeout=settings.GAME_SCENE_FLIGHT_LOCK_TTL)
+        while True:
+            pending = await GameState.get_pending_scene(self.room_id, scene_index)
+            if not pending:
+                return None
+            if pending.get("status") == "ready" or loop.time() >= deadline:
+                break
+            await asyncio.sleep(0.25)  # 다른 워커 프로세스에서 생성 중
+        await GameState.clear_pending_scene(self.room_id, scene_index)
+        if pending.get("status") != "ready" or pending.get("base") != _history_digest(history):
+            return None
+        if accept is not None and not accept(pending):
+            print(f"♻️ 미리 생성된 씬이 요청 내용(선택/스킬·아이템 사용)을 반영하지 않아 새로 생성 (Room: {self.room_id}, Scene: {scene_index})")
             return None
+        return pending
+
+    def _schedule_history_summary(self):
+        """윈도우 밖으로 밀려난 대화를 백그라운드에서 요약에 접어 넣습니다 (요청 경로를 막지 않음)."""
+        # 작업마다 consumer 가 새로 만들어지므로 방 단위로 프로세스 전역에서 하나만 실행
+        key = str(self.room_id)
+        task = _history_summary_tasks.get(key)
+        if task and not task.done():
+            return  # 실행 중인 작업이 남은 overflow 까지 이어서 처리
+        task = asyncio.create_task(self._fold_history_overflow())
+        _history_summary_tasks[key] = task
+
+        def forget(done):
+            if _history_summary_tasks.get(key) is done:
+                del _history_summary_tasks[key]
+        task.add_done_callback(forget)
+
+    async def _fold_history_overflow(self):
+        async def summarize(messages):
+            completion = await gateway.achat_completion(
+                messages=messages,
+                max_tokens=800,
+                temperature=0.3,
+                priority=gateway.BACKGROUND,
+                call_site="game.history_fold"
+            )
+            return completion.choices[0].message.content
+
+        try:
+            while True:
+                overflow = await GameState.get_history_overflow(self.room_id)
+                if not overflow:
+                    return
+                previous = (await GameState.get_state_fields(self.room_id, "history_summary")).get("history_summary")
+                summary = await self.history_window.fold(previous, overflow, summarize)
+
+                def commit(latest):
+                    # 다른 워커가 그 사이 먼저 접었으면(요약이나 overflow 앞부분이 달라짐) 버리고 다시 읽어서 접음
+                    pending = latest.get("history_overflow") or []
+                    if latest.get("history_summary") != previous or pending[:len(overflow)] != overflow:
+                        return None
+                    # 요약하는 동안 뒤에 더 쌓였을 수 있으므로 접은 메시지만 앞에서 제거
+                    latest["history_summary"] = summary
+                    latest["history_overflow"] = pending[len(overflow):]
+                    return latest
+
+                if await GameState.update(self.room_id, commit) is None:
+                    print(f"↪️ 대화 기록 요약이 다른 작업과 겹쳐 다시 읽습니다 (Room: {self.room_id})")
+                    continue
+                print(f"🧾 대화 기록 요약 갱신: {len(overflow)}개 메시지 접음 (Room: {self.room_id})")
+        except Exception as e:
+            print(f"❌ 대화 기록 요약 중 오류 발생: {e}")
+
+    async def _stream_scene_json(self, messages):
+        """
+        씬 JSON을 토큰 스트림으로 받으면서 완성된 필드부터 그룹에 먼저 전송합니다.
+        - round.title / round.description 이 닫히는 즉시 'scene_partial' 전송
+        - round.choices 의 역할별 배열이 닫힐 때마다 'scene_partial' 전송
+        - 압축 형식이면 t / d / p 의 캐릭터 항목이 닫힐 때 같은 이벤트로 펼쳐서 전송
+        최종 씬 JSON은 호출자가 기존처럼 'scene_update' 로 브로드캐스트합니다.
+        """
+        stream = gateway.astream_chat_completion(
+            messages=messages,
+            max_tokens=4000,
+            temperature=0.7,
+            hedge=True,
+            call_site="game.scene",
+        )
+        parser = IncrementalJSONParser()
+        chunks = []
+        async for chunk in stream:
+            if not chunk.choices:
+                continue  # Azure 콘텐츠 필터 결과 등 choices 가 빈 청크
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            chunks.append(delta)
+            for path, value in parser.feed(delta):
+                if path in (("round", "title"), ("round", "description")):
+                    await self.broadcast_to_group({
+                        "event": "scene_partial",
+                        "field": path[1],
+                        "value": value,
+                    })
+                elif len(path) == 3 and path[:2] == ("round", "choices"):
+                    await self.broadcast_to_group({
+                        "event": "scene_partial",
+                        "field": "choices",
+                        "role": path[2],
+                        "value": value,
+                    })
+                elif path in (("t",), ("d",)):
+                    await self.broadcast_to_group({
+                        "event": "scene_partial",
+                        "field": "title" if path == ("t",) else "description",
+                        "value": value,
+                    })
+                elif len(path) == 2 and path[0] == "p" and isinstance(value, list):
+                    _, role_id, role_choices = scene_format.expand_party_entry(path[1], value)
+                    await self.broadcast_to_group({
+                        "event": "scene_partial",
+                        "field": "choices",
+                        "role": role_id,
+                        "value": role_choices,
+                    })
+
+        response_text = "".join(chunks)
+        scene_json = parser.result
+        if scene_json is None:
+            # 스트림이 중간에 끊겼거나 JSON이 닫히지 않은 경우 전체 텍스트로 재시도
+            scene_json = json.loads(self.extract_json_block(response_text))
+        return response_text, scene_json
             
-    def create_system_prompt_for_json(self, scenario, characters):
-        """LLM이 구조화된 JSON을 생성하도록 지시하는 시스템 프롬프트"""
+    def create_system_prompt_for_json(self, scenario, characters, compact=None):
+        """LLM이 구조화된 JSON을 생성하도록 지시하는 시스템 프롬프트 (compact: 압축 형식 여부, 기본은 GAME_SCENE_COMPACT 설정)"""
         char_descriptions = "\n".join(
             [f"- **{c['name']}** ({c['description']})\n  - 능력치: {c.get('ability', {}).get('stats', {})}" for c in characters]
         )
+        if settings.GAME_SCENE_COMPACT if compact is None else compact:
+            prompt = f"""
+        당신은 TRPG 게임의 시나리오를 실시간으로 생성하는 AI입니다.
+        당신의 임무는 사용자 행동에 따라 다음 게임 씬 데이터를 "반드시" 아래의 압축 JSON 형식에 맞춰 생성하는 것입니다.
+
+        ## 게임 배경
+        - 시나리오: {scenario.title} ({scenario.description})
+        - 참가 캐릭터 정보 (이 능력치를 반드시 참고할 것):
+        {char_descriptions}
+
+        ## 출력 형식 (필수 준수)
+        {scene_format.COMPACT_SCHEMA}
+        {scene_format.COMPACT_RULES}
+        """
+            return {"role": "system", "content": prompt}
+
         json_schema = """
         {
           "id": "string (예: scene0)",
@@ -1151,6 +1634,52 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
         })
 
 
+class DetachedGameConsumer(GameConsumer):
+    """
+    작업 큐에서 GameConsumer 핸들러를 소켓 없이 실행하기 위한 consumer.
+    그룹 브로드캐스트는 그대로 channel layer 로, send_json 은 작업을 요청한 소켓(reply_channel)으로 전달합니다.
+    """
+    def __init__(self, room_id, reply_channel=None):
+        super().__init__()
+        self.room_id = room_id
+        self.group_name = f"game_{room_id}"
+        self.reply_channel = reply_channel
+        self.channel_layer = get_channel_layer()
+        self.gm = AsyncAIGameMaster()
+        self.history_window = HistoryWindow()
+
+    async def send_json(self, content, close=False):
+        if self.reply_channel:
+            await self.channel_layer.send(self.reply_channel, {"type": "job_reply", "content": content})
+
+
+@jobs.handler("start_scene")
+async def _start_scene_job(room_id, reply_channel, payload):
+    consumer = DetachedGameConsumer(room_id, reply_channel)
+    user = await _get_user(payload.get("user_id")) if payload.get("user_id") else AnonymousUser()
+    await consumer.handle_start_game_llm(user, payload.get("topic"), payload.get("characters", []), payload.get("is_loaded_game", False))
+
+
+@jobs.handler("next_scene")
+async def _next_scene_job(room_id, reply_channel, payload):
+    consumer = DetachedGameConsumer(room_id, reply_channel)
+    user = await _get_user(payload["user_id"])
+    await consumer.handle_generate_next_scene(user, payload.get("history") or {})
+
+
+@jobs.handler("turn_resolution")
+async def _turn_resolution_job(room_id, reply_channel, payload):
+    consumer = DetachedGameConsumer(room_id, reply_channel)
+    await consumer.handle_turn_resolution_with_ai(payload.get("human_player_results", []), payload.get("all_characters"))
+
+
+@jobs.handler("save")
+async def _save_job(room_id, reply_channel, payload):
+    consumer = DetachedGameConsumer(room_id, reply_channel)
+    user = await _get_user(payload["user_id"])
+    await consumer.handle_save_game_state(user, payload["data"])
+
+
 class TurnBasedGameConsumer(AsyncJsonWebsocketConsumer):
     async def connect(self):
         self.room_id = self.scope["url_route"]["kwargs"]["room_id"]
@@ -1181,6 +1710,7 @@ class TurnBasedGameConsumer(AsyncJsonWebsocketConsumer):
         action = content.get("action")
         state = await GameState.get_game_state(self.room_id)
         if not state: return
+        await GameState.touch(self.room_id, state.get("sceneIndex"))  # 활동 중인 방의 Redis 키 TTL 연장
 
         if action == "request_initial_state":
             await self.send_game_state()
@@ -1192,13 +1722,16 @@ class TurnBasedGameConsumer(AsyncJsonWebsocketConsumer):
             
             result_payload = await perform_turn_judgement(self.room_id, state["sceneIndex"], player["role"], choice_id)
             
-            state["logs"].append({"id": len(state["logs"]), "text": f"👉 [{player_id}] 님이 '{result_payload['result']['choiceId']}' 선택지를 골랐습니다."})
-            state["logs"].append({"id": len(state["logs"]), "text": f"🎲 {result_payload['log']}"})
-            state["currentTurnIndex"] += 1
-            if state["currentTurnIndex"] >= len(state["turnOrder"]):
-                state["isSceneOver"] = True
-
-            await GameState.set_game_state(self.room_id, state)
+            def apply(state):
+                state["logs"].append({"id": len(state["logs"]), "text": f"👉 [{player_id}] 님이 '{result_payload['result']['choiceId']}' 선택지를 골랐습니다."})
+                state["logs"].append({"id": len(state["logs"]), "text": f"🎲 {result_payload['log']}"})
+                state["currentTurnIndex"] += 1
+                if state["currentTurnIndex"] >= len(state["turnOrder"]):
+                    state["isSceneOver"] = True
+                return state
+
+            # 동시에 들어온 다른 턴과 로그/턴 인덱스가 섞여도 잃지 않도록 버전 비교 후 저장
+            await GameState.update(self.room_id, apply)
             await self.channel_layer.group_send(self.group_name, {"type": "broadcast_game_state"})
 
         elif action == "run_ai_turn":
@@ -1215,26 +1748,34 @@ class TurnBasedGameConsumer(AsyncJsonWebsocketConsumer):
             
             result_payload = await perform_turn_judgement(self.room_id, state["sceneIndex"], player["role"], random_choice["id"])
             
-            state["logs"].append({"id": len(state["logs"]), "text": f"👉 [{player_id}](이)가 '{random_choice['text']}' 선택지를 골랐습니다."})
-            state["logs"].append({"id": len(state["logs"]), "text": f"🎲 {result_payload['log']}"})
-            state["currentTurnIndex"] += 1
-            if state["currentTurnIndex"] >= len(state["turnOrder"]):
-                state["isSceneOver"] = True
+            def apply(state):
+                state["logs"].append({"id": len(state["logs"]), "text": f"👉 [{player_id}](이)가 '{random_choice['text']}' 선택지를 골랐습니다."})
+                state["logs"].append({"id": len(state["logs"]), "text": f"🎲 {result_payload['log']}"})
+                state["currentTurnIndex"] += 1
+                if state["currentTurnIndex"] >= len(state["turnOrder"]):
+                    state["isSceneOver"] = True
+                return state
             
-            await GameState.set_game_state(self.room_id, state)
+            await GameState.update(self.room_id, apply)
             await self.channel_layer.group_send(self.group_name, {"type": "broadcast_game_state"})
 
         elif action == "request_next_scene":
-            state["sceneIndex"] += 1
-            state["currentTurnIndex"] = 0
-            state["isSceneOver"] = False
-            state["logs"].append({
-                "id": len(state["logs"]),
-                "text": f"--- 다음 이야기 시작 (Scene {state['sceneIndex']}) ---",
-                "isImportant": True
-            })
+            scene_index = state["sceneIndex"]
+
+            def apply(state):
+                if state["sceneIndex"] != scene_index:
+                    return None  # 다른 요청이 먼저 다음 씬으로 넘김
+                state["sceneIndex"] += 1
+                state["currentTurnIndex"] = 0
+                state["isSceneOver"] = False
+                state["logs"].append({
+                    "id": len(state["logs"]),
+                    "text": f"--- 다음 이야기 시작 (Scene {state['sceneIndex']}) ---",
+                    "isImportant": True
+                })
+                return state
             
-            await GameState.set_game_state(self.room_id, state)
+            await GameState.update(self.room_id, apply)
             await self.channel_layer.group_send(self.group_name, {"type": "broadcast_game_state"})
 
     async def send_game_state(self):
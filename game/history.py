@@ -0,0 +1,111 @@
+# backend/game/history.py
+"""
+방 상태(game_state)의 conversation_history 를 일정 크기로 유지하는 슬라이딩 윈도우.
+
+- 맨 앞의 system 프롬프트는 항상 유지
+- 그 뒤의 대화는 토큰 예산(window_tokens) 안에 드는 최신 메시지만 남김
+- 윈도우 밖으로 밀려난 메시지는 history_overflow 에 쌓아두었다가
+  백그라운드 요약으로 history_summary 에 접어 넣음
+- LLM 에 보내는 프롬프트 = system + (요약) + 윈도우  →  캠페인 길이와 무관하게 일정한 크기
+"""
+import re
+
+from django.conf import settings
+
+from llm.tokens import estimate_message_tokens
+
+SUMMARY_SYSTEM_PROMPT = "너는 TRPG 진행 기록을 다음 장면 생성에 필요한 사실 위주로 압축하는 AI다."
+
+
+class HistoryWindow:
+    def __init__(self, window_tokens=None, min_messages=2, summary_max_chars=None):
+        self.window_tokens = window_tokens or getattr(settings, "GAME_HISTORY_WINDOW_TOKENS", 6000)
+        self.min_messages = min_messages
+        self.summary_max_chars = summary_max_chars or getattr(settings, "GAME_HISTORY_SUMMARY_MAX_CHARS", 1500)
+
+    @staticmethod
+    def _split_head(history):
+        """선두의 system 메시지들과 나머지 대화를 분리"""
+        head_len = 0
+        for msg in history:
+            if msg.get("role") != "system":
+                break
+            head_len += 1
+        return history[:head_len], history[head_len:]
+
+    def trim(self, history):
+        """
+        history 를 (유지할 목록, 밀려난 목록) 으로 나눕니다.
+        유지 목록은 system 프롬프트 + 토큰 예산 안의 최신 메시지(최소 min_messages 개).
+        """
+        head, body = self._split_head(history)
+        budget = self.window_tokens - estimate_message_tokens(head)
+        kept = []
+        used = 0
+        for msg in reversed(body):
+            cost = estimate_message_tokens([msg])
+            if len(kept) >= self.min_messages and used + cost > budget:
+                break
+            kept.append(msg)
+            used += cost
+        kept.reverse()
+        overflow = body[:len(body) - len(kept)]
+        return head + kept, overflow
+
+    def prompt_messages(self, history, summary=None):
+        """LLM 에 보낼 messages: system + 요약(있으면) + 윈도우"""
+        window, _ = self.trim(history)
+        head, body = self._split_head(window)
+        if summary:
+            head = head + [{"role": "system", "content": f"지금까지의 줄거리 요약:\n{summary}"}]
+        return head + body
+
+    def prompt_tokens(self, history, summary=None):
+        return estimate_message_tokens(self.prompt_messages(history, summary))
+
+    def _format_for_summary(self, messages):
+        lines = []
+        for msg in messages:
+            speaker = "진행자" if msg.get("role") == "assistant" else "플레이어"
+            lines.append(f"[{speaker}] {msg.get('content', '')}")
+        return "\n".join(lines)
+
+    async def fold(self, summary, overflow, summarize):
+        """
+        밀려난 메시지(overflow)를 기존 요약(summary)에 접어 넣은 새 요약을 반환합니다.
+        summarize 는 messages 를 받아 요약 문자열을 돌려주는 async 함수입니다.
+        """
+        if not overflow:
+            return summary or ""
+        prompt = [
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": (
+                f"기존 요약:\n{summary or '(없음)'}\n\n"
+                f"새로 추가된 진행 기록:\n{self._format_for_summary(overflow)}\n\n"
+                f"기존 요약에 새 기록을 반영해 {self.summary_max_chars}자 이내의 한국어 요약으로 다시 써줘. "
+                "인물, 장소, 획득/소모한 물건, 해결되지 않은 사건은 반드시 남겨줘."
+            )},
+        ]
+        new_summary = (await summarize(prompt) or "").strip()
+        if not new_summary:
+            return summary or ""
+        if len(new_summary) > self.summary_max_chars:
+            # 길이를 넘기면 한 번 더 줄여 달라고 요청 (앞쪽의 오래된 사실을 잘라내지 않도록)
+            shorter = (await summarize([
+                {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                {"role": "user", "content": (
+                    f"다음 요약을 {self.summary_max_chars * 4 // 5}자 이내로 줄여줘. "
+                    f"인물, 장소, 물건, 해결되지 않은 사건은 남겨줘.\n\n{new_summary}"
+                )},
+            ]) or "").strip()
+            if shorter and len(shorter) < len(new_summary):
+                new_summary = shorter
+        if len(new_summary) > self.summary_max_chars:
+            new_summary = self._truncate_sentences(new_summary)
+        return new_summary
+
+    def _truncate_sentences(self, text):
+        """앞부분을 유지하고 summary_max_chars 안의 마지막 문장 끝에서 자름 (문장 끝이 없으면 글자 수로)"""
+        head = text[:self.summary_max_chars]
+        ends = [m.end() for m in re.finditer(r"[.!?。…](?=\s|$)|\n", head)]
+        return head[:ends[-1]].rstrip() if ends else head
@@ -0,0 +1,325 @@
+# backend/game/jobs.py
+"""
+GameConsumer 의 느린 LLM 작업(씬 생성, GM 판정, 저장 요약)을 요청 경로 밖에서 실행하는 작업 큐.
+
+- 큐는 Redis 에 있으므로 어느 워커 프로세스에서 넣든 어느 워커에서든 처리됨
+  (결과는 그룹 이벤트로 전달되므로 여러 워커에서는 Redis 채널 레이어가 필요)
+- 방(room)별 FIFO: 한 방의 작업은 한 번에 하나씩, 넣은 순서대로 실행 (방 단위 lease)
+- 우선순위: 방들 사이에서는 가장 급한(priority 가 낮은) 작업이 더 급한 방부터 처리
+  (BACKGROUND 작업 뒤에 INTERACTIVE 작업이 들어오면 방의 순위도 INTERACTIVE 로 올라감, ZADD LT → Redis 6.2 이상)
+- 작업 중인 방은 ready 에서 빠졌다가 작업이 끝나면(또는 lease 가 만료되면) 남은 작업의 score 로 돌아감
+  → 오래 걸리는 방이 ready 앞자리를 차지해 다른 방을 막지 않음
+- 방이 닫히면 cancel_room() 으로 대기 중인 작업은 버리고 실행 중인 작업은 취소
+
+Redis 키
+    game:jobs:ready              ZSET  처리할 작업이 있고 작업 중이 아닌 방 (score = 가장 급한 작업의 priority/시각)
+    game:jobs:leased             ZSET  작업 중인 방 (score = lease 만료 시각, 만료되면 ready 로 되돌림)
+    game:jobs:room:{room_id}     LIST  방의 작업 JSON (FIFO)
+    game:jobs:lease:{room_id}    STR   방을 처리 중인 워커 토큰 (만료 = 워커가 죽은 경우 회수)
+    game:jobs:cancelled:{room_id} STR  cancel_room() 호출 시각 (그 이전에 넣은 작업은 취소 대상)
+
+작업 핸들러는 @handler("kind") 로 등록하며 (room_id, reply_channel, payload) 를 받습니다.
+"""
+import asyncio
+import json
+import time
+import uuid
+import weakref
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from llm import ledger
+
+from .state import GameState
+
+# 낮을수록 먼저 처리
+INTERACTIVE = 0
+BACKGROUND = 5
+
+KEY_PREFIX = "game:jobs:"
+READY_KEY = KEY_PREFIX + "ready"
+LEASED_KEY = KEY_PREFIX + "leased"
+
+# 스크립트가 쓰는 키는 모두 KEYS 로 받음 (클러스터 / 스크립트 캐시에서도 안전하게)
+
+# KEYS = [room, ready, lease], ARGV = [room_id, job, score]
+# 방 순위는 더 급한 작업이 들어올 때만 올림(LT), 작업 중인 방은 ready 에 넣지 않음 (작업이 끝날 때 _FINISH_SCRIPT 가 넣음)
+_ENQUEUE_SCRIPT = """
+redis.call('RPUSH', KEYS[1], ARGV[2])
+if redis.call('EXISTS', KEYS[3]) == 0 then
+    redis.call('ZADD', KEYS[2], 'LT', ARGV[3], ARGV[1])
+end
+return 1
+"""
+
+# KEYS = [ready, leased, room, lease], ARGV = [room_id, token, lease_ttl, lease 만료 시각]
+_CLAIM_SCRIPT = """
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return nil
+end
+if not redis.call('SET', KEYS[4], ARGV[2], 'NX', 'EX', ARGV[3]) then
+    return nil
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+local entry = redis.call('LPOP', KEYS[3])
+if not entry then
+    redis.call('DEL', KEYS[4])
+    return nil
+end
+redis.call('ZADD', KEYS[2], ARGV[4], ARGV[1])
+return entry
+"""
+
+# 남은 작업이 있으면 그중 가장 급한 작업의 score 로 ready 에 되돌림
+_REQUEUE_LUA = """
+local best = nil
+for _, entry in ipairs(redis.call('LRANGE', KEYS[3], 0, -1)) do
+    local score = tonumber(cjson.decode(entry)['score'])
+    if not best or score < best then
+        best = score
+    end
+end
+if best then
+    redis.call('ZADD', KEYS[1], best, ARGV[1])
+else
+    redis.call('ZREM', KEYS[1], ARGV[1])
+end
+"""
+
+# KEYS = [ready, leased, room, lease], ARGV = [room_id, token]
+# lease 를 다른 워커가 가져갔으면(만료 후 회수) ready 복귀는 그 워커가 끝날 때 함
+_FINISH_SCRIPT = """
+local owner = redis.call('GET', KEYS[4])
+if owner == ARGV[2] then
+    redis.call('DEL', KEYS[4])
+elseif owner then
+    return 0
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+""" + _REQUEUE_LUA + """
+return 1
+"""
+
+# KEYS = [ready, leased, room, lease], ARGV = [room_id] — lease 가 만료된(워커가 죽은) 방을 ready 로 되돌림
+_RECOVER_SCRIPT = """
+if redis.call('EXISTS', KEYS[4]) == 1 then
+    return 0
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+""" + _REQUEUE_LUA + """
+return 1
+"""
+
+# KEYS = [lease, leased], ARGV = [token, lease_ttl, room_id, lease 만료 시각]
+_HEARTBEAT_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    redis.call('ZADD', KEYS[2], ARGV[4], ARGV[3])
+    return 1
+end
+return 0
+"""
+
+_handlers = {}
+
+
+def handler(kind):
+    """작업 종류(kind)별 핸들러 등록 데코레이터"""
+    def decorator(fn):
+        _handlers[kind] = fn
+        return fn
+    return decorator
+
+
+def _room_key(room_id):
+    return f"{KEY_PREFIX}room:{room_id}"
+
+
+def _lease_key(room_id):
+    return f"{KEY_PREFIX}lease:{room_id}"
+
+
+def _cancel_key(room_id):
+    return f"{KEY_PREFIX}cancelled:{room_id}"
+
+
+async def enqueue(room_id, kind, payload, priority=INTERACTIVE, reply_channel=None):
+    """작업을 방의 큐 끝에 넣고 작업 id 를 반환합니다."""
+    if kind not in _handlers:
+        raise ValueError(f"등록되지 않은 작업 종류: {kind}")
+    enqueued_at = time.time()
+    job = {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "payload": payload,
+        "priority": priority,
+        "enqueued_at": enqueued_at,
+        "score": priority * 1e10 + enqueued_at,
+        "reply_channel": reply_channel,
+    }
+    conn = await GameState._get_conn()
+    await conn.eval(
+        _ENQUEUE_SCRIPT, 3, _room_key(room_id), READY_KEY, _lease_key(room_id),
+        str(room_id), json.dumps(job), job["score"],
+    )
+    runner = _runners.get(asyncio.get_running_loop())
+    if runner:
+        runner.wake()
+    return job["id"]
+
+
+async def run_inline(room_id, kind, payload, reply_channel=None):
+    """큐를 거치지 않고 바로 실행 (GAME_JOBS_ENABLED=false 일 때)"""
+    with ledger.tags(room_id=room_id, user_id=payload.get("user_id")):
+        await _handlers[kind](str(room_id), reply_channel, payload)
+
+
+async def cancel_room(room_id):
+    """방이 닫힐 때: 대기 중인 작업은 버리고, 실행 중인 작업은 취소합니다."""
+    now = time.time()
+    conn = await GameState._get_conn()
+    async with conn.pipeline(transaction=True) as pipe:
+        pipe.delete(_room_key(room_id))
+        pipe.zrem(READY_KEY, str(room_id))
+        pipe.set(_cancel_key(room_id), now, ex=3600)
+        await pipe.execute()
+    for runner in list(_runners.values()):
+        runner.cancel_local(str(room_id), now)
+    print(f"🛑 방 작업 취소 (Room: {room_id})")
+
+
+class JobRunner:
+    """이벤트 루프(워커 프로세스)마다 하나씩 떠서 Redis 큐의 작업을 가져와 실행"""
+
+    def __init__(self, concurrency=None, lease_ttl=None, poll_interval=0.5, claim_batch=16):
+        self.concurrency = concurrency or getattr(settings, "GAME_JOB_WORKERS", 4)
+        self.lease_ttl = lease_ttl or getattr(settings, "GAME_JOB_LEASE_TTL", 30)
+        self.poll_interval = poll_interval
+        self.claim_batch = claim_batch
+        self.heartbeat_interval = min(2.0, self.lease_ttl / 3)
+        self._wake = asyncio.Event()
+        self._running = {}
+        self._workers = []
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._workers = [loop.create_task(self._work()) for _ in range(self.concurrency)]
+
+    def wake(self):
+        self._wake.set()
+
+    def cancel_local(self, room_id, cancelled_at):
+        running = self._running.get(room_id)
+        if running and running[1]["enqueued_at"] <= cancelled_at:
+            running[0].cancel()
+
+    async def _work(self):
+        while True:
+            try:
+                claimed = await self._claim()
+            except Exception as e:
+                print(f"❌ 작업 큐 조회 실패: {e}")
+                claimed = None
+            if not claimed:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            room_id, token, job = claimed
+            try:
+                await self._run(room_id, token, job)
+            except Exception as e:
+                print(f"❌ 작업 정리 실패 (Room: {room_id}): {e}")
+
+    async def _claim(self):
+        conn = await GameState._get_conn()
+        now = time.time()
+        # lease 가 만료된 방(워커가 죽음)을 먼저 ready 로 되돌림
+        for room_id in await conn.zrangebyscore(LEASED_KEY, "-inf", now):
+            await conn.eval(_RECOVER_SCRIPT, 4, *self._keys(room_id), room_id)
+
+        # 작업 중인 방은 ready 에 없으므로 앞쪽 후보는 다른 워커와 경합할 때만 실패
+        token = uuid.uuid4().hex
+        for room_id in await conn.zrange(READY_KEY, 0, self.claim_batch - 1):
+            entry = await conn.eval(
+                _CLAIM_SCRIPT, 4, *self._keys(room_id), room_id, token, self.lease_ttl, now + self.lease_ttl,
+            )
+            if entry:
+                return room_id, token, json.loads(entry)
+        return None
+
+    @staticmethod
+    def _keys(room_id):
+        return READY_KEY, LEASED_KEY, _room_key(room_id), _lease_key(room_id)
+
+    async def _run(self, room_id, token, job):
+        fn = _handlers.get(job["kind"])
+        started = time.monotonic()
+        waited = time.time() - job["enqueued_at"]
+        try:
+            if fn is None:
+                print(f"⚠️ 알 수 없는 작업 종류: {job['kind']} (Room: {room_id})")
+                return
+            payload = job.get("payload") or {}
+            # 작업 중 LLM 호출은 사용량 장부에 방/요청자로 기록 (태스크가 컨텍스트를 복사해 감)
+            with ledger.tags(room_id=room_id, user_id=payload.get("user_id")):
+                task = asyncio.create_task(fn(room_id, job.get("reply_channel"), payload))
+            self._running[room_id] = (task, job)
+            heartbeat = asyncio.create_task(self._heartbeat(room_id, token, job, task))
+            try:
+                await asyncio.wait({task})
+            finally:
+                heartbeat.cancel()
+                self._running.pop(room_id, None)
+
+            if task.cancelled():
+                print(f"🛑 작업 취소됨: {job['kind']} (Room: {room_id})")
+            elif task.exception() is not None:
+                print(f"❌ 작업 실패: {job['kind']} (Room: {room_id}): {task.exception()}")
+                await self._reply_error(job, "요청을 처리하는 중 오류가 발생했습니다.")
+            else:
+                print(f"✅ 작업 완료: {job['kind']} (Room: {room_id}, 대기 {waited:.1f}s, 실행 {time.monotonic() - started:.1f}s)")
+        finally:
+            conn = await GameState._get_conn()
+            await conn.eval(_FINISH_SCRIPT, 4, *self._keys(room_id), room_id, token)
+            self.wake()
+
+    async def _heartbeat(self, room_id, token, job, task):
+        """lease 를 연장하고, 다른 워커에서 cancel_room() 이 호출됐는지 확인"""
+        conn = await GameState._get_conn()
+        while not task.done():
+            await asyncio.sleep(self.heartbeat_interval)
+            owned = await conn.eval(
+                _HEARTBEAT_SCRIPT, 2, _lease_key(room_id), LEASED_KEY,
+                token, self.lease_ttl, room_id, time.time() + self.lease_ttl,
+            )
+            cancelled_at = await conn.get(_cancel_key(room_id))
+            if not owned or (cancelled_at and float(cancelled_at) >= job["enqueued_at"]):
+                task.cancel()
+                return
+
+    async def _reply_error(self, job, message):
+        reply_channel = job.get("reply_channel")
+        if not reply_channel:
+            return
+        await get_channel_layer().send(reply_channel, {
+            "type": "job_reply",
+            "content": {"type": "error", "message": message},
+        })
+
+
+_runners = weakref.WeakKeyDictionary()
+
+
+def ensure_runner():
+    """현재 이벤트 루프에 작업 러너가 없으면 띄웁니다 (GameConsumer.connect 에서 호출)."""
+    loop = asyncio.get_running_loop()
+    runner = _runners.get(loop)
+    if runner is None:
+        runner = JobRunner()
+        _runners[loop] = runner
+        runner.start()
+    return runner
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+import redis.asyncio as aioredis
+from redis.asyncio.connection import AbstractConnection
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from game import redis_pool
+from game.state import GameState
+
+
+class _Counter :
+    """Redis 로 실제 전송한 횟수(왕복)와 새로 연 TCP 연결 수를 셈"""
+
+    def __init__(self) :
+        self.round_trips = 0
+        self.connects = 0
+
+    def install(self) :
+        counter = self
+        # connect_check_health 는 연결(Connection.connect)의 공통 진입점, 이미 연결돼 있으면 새 소켓을 열지 않음
+        original_send, original_connect = AbstractConnection.send_packed_command, AbstractConnection.connect_check_health
+
+        async def send_packed_command(conn, command, check_health=True) :
+            counter.round_trips += 1
+            return await original_send(conn, command, check_health)
+
+        async def connect_check_health(conn, *args, **kwargs) :
+            if not conn.is_connected :
+                counter.connects += 1
+            return await original_connect(conn, *args, **kwargs)
+
+        AbstractConnection.send_packed_command = send_packed_command
+        AbstractConnection.connect_check_health = connect_check_health
+        return original_send, original_connect
+
+    @staticmethod
+    def uninstall(originals) :
+        AbstractConnection.send_packed_command, AbstractConnection.connect_check_health = originals
+
+
+class _LegacyState :
+    """변경 전 GameState 와 같은 방식: 명령마다 from_url() 로 새 클라이언트, 명령 하나당 왕복 하나"""
+
+    def __init__(self, url) :
+        self.url = url
+
+    def conn(self) :
+        return aioredis.from_url(self.url, decode_responses=True)
+
+    async def submit_turn_result(self, room_id, user_id, result) :
+        key = f'game:{room_id}:turn_results'
+        await self.conn().hset(key, user_id, json.dumps(result))
+        await self.conn().expire(key, 3600)
+        return await self.conn().hgetall(key)
+
+    async def mark_ready_for_next_scene(self, room_id, user_id) :
+        key = f'game:{room_id}:next_scene_ready_users'
+        await self.conn().sadd(key, user_id)
+        await self.conn().expire(key, 3600)
+        return await self.conn().smembers(key)
+
+    async def get_current_turn_role(self, room_id, scene_index) :
+        order = await self.conn().get(f'game:{room_id}:scene:{scene_index}:turn_order')
+        index = await self.conn().get(f'game:{room_id}:scene:{scene_index}:current_turn_index')
+        return json.loads(order)[int(index)]
+
+    async def advance_turn(self, room_id, scene_index) :
+        order = await self.conn().get(f'game:{room_id}:scene:{scene_index}:turn_order')
+        new_index = await self.conn().incr(f'game:{room_id}:scene:{scene_index}:current_turn_index')
+        return json.loads(order)[new_index] if new_index < len(json.loads(order)) else None
+
+    async def get_game_state(self, room_id) :
+        data = await self.conn().get(f'game:{room_id}:state')
+        return json.loads(data) if data else None
+
+    async def set_game_state(self, room_id, state) :
+        await self.conn().set(f'game:{room_id}:state', json.dumps(state))
+
+    async def clear(self, key) :
+        await self.conn().delete(key)
+
+
+class _PooledState :
+    """현재 GameState (공용 풀 + 파이프라인)"""
+
+    async def submit_turn_result(self, room_id, user_id, result) :
+        return await GameState.submit_turn_result(room_id, user_id, result)
+
+    async def mark_ready_for_next_scene(self, room_id, user_id) :
+        return await GameState.mark_ready_for_next_scene(room_id, user_id)
+
+    async def get_current_turn_role(self, room_id, scene_index) :
+        return await GameState.get_current_turn_role(room_id, scene_index)
+
+    async def advance_turn(self, room_id, scene_index) :
+        return await GameState.advance_turn(room_id, scene_index)
+
+    async def get_game_state(self, room_id) :
+        return await GameState.get_game_state(room_id)
+
+    async def set_game_state(self, room_id, state) :
+        await GameState.set_game_state(room_id, state)
+
+    async def clear(self, key) :
+        conn = await GameState._get_conn()
+        await conn.delete(key)
+
+
+class Command(BaseCommand) :
+    help = (
+        'GameConsumer 한 턴 동안의 Redis 접근(결과 제출, 턴 순서, 상태 읽기/쓰기, 다음 씬 준비)을 '
+        '변경 전 방식(명령마다 새 클라이언트, 명령당 왕복 하나)과 현재 방식(공용 풀 + 파이프라인)으로 '
+        '실행해 턴당 왕복 수, 새 연결 수, 지연을 비교합니다. 실행 중인 Redis 가 필요합니다.'
+    )
+
+    def add_arguments(self, parser) :
+        parser.add_argument('--url', default=settings.GAME_REDIS_URL, help='Redis 주소 (기본 GAME_REDIS_URL)')
+        parser.add_argument('--players', type=int, default=4, help='방 인원 수')
+        parser.add_argument('--turns', type=int, default=50, help='측정할 턴 수')
+
+    def handle(self, *args, **options) :
+        if options['players'] < 1 or options['turns'] < 1 :
+            raise CommandError('--players 와 --turns 는 1 이상이어야 합니다.')
+        settings.GAME_REDIS_URL = options['url']
+        asyncio.run(self._run(options['url'], options['players'], options['turns']))
+
+    async def _run(self, url, players, turns) :
+        try :
+            await redis_pool.get_client().ping()
+        except Exception as e :
+            raise CommandError(f'Redis 에 연결할 수 없습니다 ({url}): {e}')
+
+        self.stdout.write(f'인원 {players}명, {turns}턴 ({url})')
+        self.stdout.write(f'{"방식":<10}{"턴당 왕복":>10}{"턴당 새 연결":>12}{"평균(ms)":>10}{"p50(ms)":>10}{"p95(ms)":>10}')
+        rows = {}
+        for label, state in (('변경 전', _LegacyState(url)), ('풀+파이프', _PooledState())) :
+            rows[label] = await self._measure(state, players, turns)
+            round_trips, connects, durations = rows[label]
+            self.stdout.write(
+                f'{label:<10}{round_trips / turns:>10.1f}{connects / turns:>12.1f}'
+                f'{statistics.mean(durations):>10.2f}{self._percentile(durations, 50):>10.2f}{self._percentile(durations, 95):>10.2f}'
+            )
+        await redis_pool.close()
+
+        before, after = rows['변경 전'], rows['풀+파이프']
+        self.stdout.write(self.style.SUCCESS(
+            f'턴당 왕복 {before[0] / turns:.0f} → {after[0] / turns:.0f}, '
+            f'p50 지연 {self._percentile(before[2], 50):.2f}ms → {self._percentile(after[2], 50):.2f}ms, '
+            f'p95 지연 {self._percentile(before[2], 95):.2f}ms → {self._percentile(after[2], 95):.2f}ms'
+        ))
+
+    @staticmethod
+    def _percentile(durations, pct) :
+        return sorted(durations)[max(0, int(len(durations) * pct / 100) - 1)]
+
+    async def _measure(self, state, players, turns) :
+        room_id = f'bench-{uuid.uuid4().hex[:8]}'
+        conn = redis_pool.get_client()
+        await conn.mset({
+            f'game:{room_id}:scene:0:turn_order' : json.dumps([f'role{i}' for i in range(players)]),
+            f'game:{room_id}:state' : json.dumps({'conversation_history' : [], 'turn' : 0}),
+        })
+        counter = _Counter()
+        round_trips, connects, durations = 0, 0, []
+        originals = counter.install()
+        try :
+            for turn in range(turns) :
+                await conn.set(f'game:{room_id}:scene:0:current_turn_index', 0)  # 턴 준비 (측정 제외)
+                sent, opened = counter.round_trips, counter.connects
+                started = time.perf_counter()
+                await self._turn(state, room_id, players, turn)
+                durations.append((time.perf_counter() - started) * 1000)
+                round_trips += counter.round_trips - sent
+                connects += counter.connects - opened
+        finally :
+            _Counter.uninstall(originals)
+        await conn.delete(*[key async for key in conn.scan_iter(f'game:{room_id}:*')])
+        return round_trips, connects, durations
+
+    async def _turn(self, state, room_id, players, turn) :
+        """GameConsumer 한 턴의 Redis 접근 순서"""
+        for i in range(players) :
+            await state.get_current_turn_role(room_id, 0)
+            await state.submit_turn_result(room_id, f'user{i}', {'role' : f'role{i}', 'choiceId' : 'A1', 'grade' : 'S'})
+            await state.advance_turn(room_id, 0)
+        await state.clear(f'game:{room_id}:turn_results')
+        game_state = await state.get_game_state(room_id)
+        game_state['turn'] = turn + 1
+        await state.set_game_state(room_id, game_state)
+        for i in range(players) :
+            await state.mark_ready_for_next_scene(room_id, f'user{i}')
+        await state.clear(f'game:{room_id}:next_scene_ready_users')
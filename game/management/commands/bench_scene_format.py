@@ -0,0 +1,139 @@
+import glob
+import json
+import os
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+
+from game import scenarios_realtime, scenarios_turn, scene_format
+from llm import gateway
+from llm.tokens import estimate_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        '씬 출력 형식(기존 JSON / 압축 형식)의 출력 토큰 수와 생성 시간을 비교합니다. '
+        '기본은 저장된 씬(시나리오 템플릿 + --fixtures 의 녹화 응답)을 두 형식으로 직렬화해 토큰 수와 '
+        '예상 생성 시간을 계산하고, --live N 이면 게이트웨이로 실제 생성을 N번씩 요청해 측정합니다.'
+    )
+
+    def add_arguments(self, parser) :
+        parser.add_argument('--fixtures', help='fake_openai 녹화 fixture 디렉터리 (씬 JSON 응답만 사용)')
+        parser.add_argument('--tokens-per-sec', type=float, default=60.0, help='예상 시간 계산용 출력 토큰 속도')
+        parser.add_argument('--ttft-ms', type=float, default=800.0, help='예상 시간 계산용 첫 토큰 시간')
+        parser.add_argument('--live', type=int, default=0, help='형식별 실제 생성 요청 횟수 (0 이면 오프라인 계산만)')
+
+    def handle(self, *args, **options) :
+        if options['tokens_per_sec'] <= 0 :
+            raise CommandError('--tokens-per-sec 는 0 보다 커야 합니다.')
+        scenes = self._load_scenes(options['fixtures'])
+        if not scenes :
+            raise CommandError('비교할 씬이 없습니다.')
+        self._offline(scenes, options['tokens_per_sec'], options['ttft_ms'] / 1000)
+        if options['live'] :
+            self._live(scenes[0][0], options['live'])
+
+    # 시나리오 템플릿 + 녹화된 씬 응답 (기존 형식 텍스트는 녹화본 그대로, 템플릿은 모델이 흔히 내는 들여쓰기 JSON)
+    def _load_scenes(self, fixtures_dir) :
+        scenes = []
+        for template in scenarios_realtime.SCENE_TEMPLATES + scenarios_turn.SCENE_TEMPLATES :
+            scene = self._as_scene(template)
+            scenes.append((scene, json.dumps(scene, ensure_ascii=False, indent=2)))
+        if fixtures_dir :
+            for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.json'))) :
+                with open(path, encoding='utf-8') as f :
+                    content = json.load(f).get('content') or ''
+                try :
+                    scene = json.loads(content[content.find('{'):content.rfind('}') + 1])
+                except ValueError :
+                    continue
+                if isinstance(scene, dict) and 'round' in scene :
+                    scenes.append((scene, content))
+        return scenes
+
+    # 템플릿에서 LLM 이 실제로 출력하는 필드만 남김 (fragments 등 제외, 턴제 템플릿은 역할별 turns 를 round 로)
+    def _as_scene(self, template) :
+        if 'round' in template :
+            round_data = template['round']
+            choices = round_data.get('choices', {})
+            title, description = round_data.get('title', ''), round_data.get('description', '')
+        else :
+            turns = template.get('turns', [])
+            choices = {turn['role'] : turn.get('choices', []) for turn in turns}
+            title = turns[0].get('title', '') if turns else ''
+            description = turns[0].get('description', '') if turns else ''
+        return {
+            'id' : template.get('id'),
+            'index' : template.get('index', 0),
+            'roleMap' : template.get('roleMap', {}),
+            'round' : {'title' : title, 'description' : description, 'choices' : choices},
+        }
+
+    def _offline(self, scenes, tokens_per_sec, ttft) :
+        verbose_tokens, compact_tokens, mismatches = [], [], 0
+        for scene, verbose_text in scenes :
+            compact = scene_format.compact_scene(scene)
+            verbose_tokens.append(estimate_tokens(verbose_text))
+            compact_tokens.append(estimate_tokens(scene_format.dumps_compact(compact)))
+            if not self._same_scene(scene, scene_format.expand_scene(compact)) :
+                mismatches += 1
+
+        verbose_total, compact_total = sum(verbose_tokens), sum(compact_tokens)
+        self.stdout.write(f'씬 {len(scenes)}개 (왕복 변환 불일치 {mismatches}개)')
+        self.stdout.write(f'{"형식":<8}{"평균 토큰":>10}{"최대 토큰":>10}{"예상 시간(s)":>14}')
+        for label, counts in (('기존', verbose_tokens), ('압축', compact_tokens)) :
+            mean = statistics.mean(counts)
+            self.stdout.write(f'{label:<8}{mean:>10.0f}{max(counts):>10}{ttft + mean / tokens_per_sec:>14.2f}')
+        self.stdout.write(self.style.SUCCESS(
+            f'출력 토큰 {100 * (1 - compact_total / verbose_total):.1f}% 감소 '
+            f'({verbose_total} → {compact_total}, {tokens_per_sec:.0f} tok/s 기준 씬당 '
+            f'{(verbose_total - compact_total) / len(scenes) / tokens_per_sec:.2f}s 단축)'
+        ))
+
+    # 선택지 id 는 서버가 새로 매기므로 비교에서 제외
+    def _same_scene(self, original, expanded) :
+        def strip(scene) :
+            round_data = scene.get('round', {})
+            return (
+                scene.get('index'), scene.get('roleMap'), round_data.get('title'), round_data.get('description') or '',
+                {role : [(c['text'], c['appliedStat'], c['modifier']) for c in choices]
+                 for role, choices in round_data.get('choices', {}).items()},
+            )
+        return strip(original) == strip(expanded)
+
+    def _live(self, template, runs) :
+        from game.consumers import GameConsumer
+
+        scenario = SimpleNamespace(title=template.get('id', 'scene'), description=template['round'].get('title', ''))
+        characters = [
+            {'name' : name, 'description' : role_id, 'ability' : {'stats' : {'힘' : 1, '민첩' : 1, '지식' : 1, '의지' : 1, '매력' : 1, '운' : 1}}}
+            for name, role_id in template.get('roleMap', {}).items()
+        ]
+        user_message = {'role' : 'user', 'content' : '모든 캐릭터가 참여하는 게임의 첫 번째 씬(sceneIndex: 0)을 생성해줘.'}
+        consumer = GameConsumer()
+
+        self.stdout.write(f'실제 생성 {runs}회씩 (배포: {gateway.default_profile().deployment})')
+        for label, compact in (('기존', False), ('압축', True)) :
+            messages = [consumer.create_system_prompt_for_json(scenario, characters, compact=compact), user_message]
+            tokens, seconds, failures = [], [], 0
+            for _ in range(runs) :
+                started = time.perf_counter()
+                try :
+                    resp = gateway.chat_completion(messages=messages, max_tokens=4000, temperature=0.7, call_site='bench.scene_format')
+                    text = resp.choices[0].message.content
+                    scene = scene_format.expand_scene(json.loads(consumer.extract_json_block(text)))
+                    if not scene.get('round', {}).get('choices') :
+                        raise ValueError('선택지 없음')
+                except Exception as e :
+                    failures += 1
+                    self.stderr.write(f'  {label} 실패: {e}')
+                    continue
+                seconds.append(time.perf_counter() - started)
+                tokens.append(resp.usage.completion_tokens if resp.usage else estimate_tokens(text))
+            if tokens :
+                self.stdout.write(
+                    f'{label:<8}출력 토큰 평균 {statistics.mean(tokens):.0f}, '
+                    f'시간 평균 {statistics.mean(seconds):.2f}s / 최대 {max(seconds):.2f}s, 실패 {failures}회'
+                )
@@ -0,0 +1,106 @@
+import itertools
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import TextField
+from django.db.models.functions import Cast, Length
+
+from game import codec
+from game.models import MultimodeSession
+from game.state import LIST_FIELDS, _split_history_head
+
+
+class Command(BaseCommand) :
+    help = (
+        '녹화된 긴 세션의 방 상태를 GameState 가 저장하는 단위(필드별 값, 대화 메시지별 값)로 나눠 '
+        '형식(json / msgpack)과 압축(none / zstd / lz4)별 저장 크기, 인코딩/디코딩 시간을 '
+        '변경 전 방식(json.dumps)과 비교합니다. 입력은 상태 JSON 파일(상태 하나 또는 목록)이나 '
+        '--from-db 로 불러온 MultimodeSession 기록입니다.'
+    )
+
+    def add_arguments(self, parser) :
+        parser.add_argument('paths', nargs='*', help='녹화된 방 상태 JSON 파일 (상태 dict 또는 dict 목록)')
+        parser.add_argument('--from-db', type=int, default=0, help='기록이 긴 MultimodeSession N개를 함께 측정')
+        parser.add_argument('--min-bytes', type=int, default=None, help='압축 기준 크기 (기본 GAME_STATE_COMPRESS_MIN_BYTES)')
+        parser.add_argument('--repeat', type=int, default=5, help='반복 횟수 (가장 빠른 회차 기준)')
+
+    def handle(self, *args, **options) :
+        if options['repeat'] < 1 :
+            raise CommandError('--repeat 는 1 이상이어야 합니다.')
+        states = self._load_files(options['paths'])
+        if options['from_db'] :
+            states += self._load_sessions(options['from_db'])
+        if not states :
+            raise CommandError('측정할 상태가 없습니다. 상태 JSON 파일이나 --from-db 를 지정하세요.')
+
+        values = [value for state in states for value in self._stored_values(state)]
+        self.stdout.write(f'상태 {len(states)}개, 저장 값 {len(values)}개')
+        self.stdout.write(f'{"방식":<16}{"크기(KB)":>10}{"비율":>8}{"인코딩(ms)":>12}{"디코딩(ms)":>12}')
+
+        baseline = self._measure(values, lambda obj : json.dumps(obj), json.loads, options['repeat'])
+        self._row('변경 전 json', baseline, baseline[0])
+        formats, compressions = codec.available()
+        best = None
+        for fmt, compression in itertools.product(formats, compressions) :
+            encode = lambda obj, f=fmt, c=compression : codec.encode(obj, f, c, options['min_bytes'])
+            result = self._measure(values, encode, codec.decode, options['repeat'])
+            self._row(f'{fmt}+{compression}', result, baseline[0])
+            if best is None or result[0] < best[1][0] :
+                best = (f'{fmt}+{compression}', result)
+
+        label, (size, encode_ms, decode_ms) = best
+        self.stdout.write(self.style.SUCCESS(
+            f'가장 작은 방식 {label}: 크기 {100 * (1 - size / baseline[0]):.1f}% 감소 '
+            f'({baseline[0] / 1024:.1f}KB → {size / 1024:.1f}KB), '
+            f'디코딩 {baseline[2]:.2f}ms → {decode_ms:.2f}ms'
+        ))
+
+    def _load_files(self, paths) :
+        states = []
+        for path in paths :
+            try :
+                with open(path, encoding='utf-8') as f :
+                    data = json.load(f)
+            except (OSError, ValueError) as e :
+                raise CommandError(f'{path} 를 읽을 수 없습니다: {e}')
+            states += [s for s in (data if isinstance(data, list) else [data]) if isinstance(s, dict)]
+        return states
+
+    # 세션 기록은 choice_history(대화 기록 포함) + character_history 를 하나의 상태처럼 측정
+    def _load_sessions(self, limit) :
+        sessions = (
+            MultimodeSession.objects
+            .annotate(size=Length(Cast('choice_history', TextField())))
+            .order_by('-size')
+            .values_list('choice_history', 'character_history')[:limit]
+        )
+        return [{**(choice or {}), 'character_history' : character or {}} for choice, character in sessions]
+
+    # GameState 가 Redis 에 나눠 넣는 값 단위 (state.py 의 _encode_fields / 대화 기록 목록과 같은 분할)
+    def _stored_values(self, state) :
+        values = [v for k, v in state.items() if k not in LIST_FIELDS]
+        head, body = _split_history_head(state.get('conversation_history') or [])
+        values.append(head)
+        values += body
+        values += state.get('history_overflow') or []
+        return values
+
+    def _measure(self, values, encode, decode, repeat) :
+        encode_s, decode_s = float('inf'), float('inf')
+        for _ in range(repeat) :
+            started = time.perf_counter()
+            encoded = [encode(v) for v in values]
+            encode_s = min(encode_s, time.perf_counter() - started)
+            started = time.perf_counter()
+            decoded = [decode(e) for e in encoded]
+            decode_s = min(decode_s, time.perf_counter() - started)
+        if json.loads(json.dumps(decoded)) != json.loads(json.dumps(values)) :
+            raise CommandError('왕복 변환 결과가 원본과 다릅니다.')
+        # Redis 에는 UTF-8 로 저장되므로 바이트 수로 비교
+        size = sum(len(e.encode('utf-8')) for e in encoded)
+        return size, encode_s * 1000, decode_s * 1000
+
+    def _row(self, label, result, baseline_size) :
+        size, encode_ms, decode_ms = result
+        self.stdout.write(f'{label:<16}{size / 1024:>10.1f}{size / baseline_size:>8.2f}{encode_ms:>12.2f}{decode_ms:>12.2f}')
@@ -0,0 +1,100 @@
+import asyncio
+import uuid
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from game import redis_pool
+from game.jobs import KEY_PREFIX as JOB_KEY_PREFIX
+from game.models import GameRoom
+
+
+def _room_id(key) :
+    """game:{room}:... 의 방 ID (UUID 가 아니면 None)"""
+    try :
+        return str(uuid.UUID(key.split(':', 2)[1]))
+    except (IndexError, ValueError) :
+        return None
+
+
+class Command(BaseCommand) :
+    help = (
+        'SCAN 으로 game:* Redis 키를 훑어 정리합니다. 방이 DB 에 없거나 ID 가 UUID 가 아닌 키는 삭제하고, '
+        'TTL 이 없는 키(TTL 도입 전에 쓰인 키)에는 GAME_ROOM_TTL_SECONDS 를 걸어 활동이 없으면 만료되게 합니다. '
+        '삭제/만료 예정 키의 크기는 MEMORY USAGE 로 합산해 보고합니다. 작업 큐 키(game:jobs:*)는 건드리지 않습니다. '
+        '--interval 을 주면 그 간격으로 계속 반복합니다.'
+    )
+
+    def add_arguments(self, parser) :
+        parser.add_argument('--url', default=settings.GAME_REDIS_URL, help='Redis 주소 (기본 GAME_REDIS_URL)')
+        parser.add_argument('--interval', type=int, default=0, help='반복 간격(초), 0 이면 한 번만')
+        parser.add_argument('--batch', type=int, default=500, help='SCAN COUNT 및 파이프라인 묶음 크기')
+        parser.add_argument('--dry-run', action='store_true', help='지우거나 TTL 을 걸지 않고 보고만')
+
+    def handle(self, *args, **options) :
+        if options['interval'] < 0 or options['batch'] < 1 :
+            raise CommandError('--interval 은 0 이상, --batch 는 1 이상이어야 합니다.')
+        settings.GAME_REDIS_URL = options['url']
+        asyncio.run(self._run(options['interval'], options['batch'], options['dry_run']))
+
+    async def _run(self, interval, batch, dry_run) :
+        try :
+            await redis_pool.get_client().ping()
+        except Exception as e :
+            raise CommandError(f'Redis 에 연결할 수 없습니다 ({settings.GAME_REDIS_URL}): {e}')
+        try :
+            while True :
+                await self._sweep(batch, dry_run)
+                if not interval :
+                    break
+                await asyncio.sleep(interval)
+        finally :
+            await redis_pool.close()
+
+    async def _sweep(self, batch, dry_run) :
+        conn = redis_pool.get_client()
+        keys_by_room = defaultdict(list)
+        scanned = 0
+        async for key in conn.scan_iter(match='game:*', count=batch) :
+            if key.startswith(JOB_KEY_PREFIX) :
+                continue
+            scanned += 1
+            keys_by_room[_room_id(key)].append(key)
+
+        room_ids = [room_id for room_id in keys_by_room if room_id is not None]
+        existing = await sync_to_async(self._existing_rooms)(room_ids)
+        orphans = [key for room_id, keys in keys_by_room.items() if room_id not in existing for key in keys]
+        live = [key for room_id, keys in keys_by_room.items() if room_id in existing for key in keys]
+
+        # 살아 있는 방 중 TTL 이 없는 키만 골라 만료 예약
+        ttls = await self._pipelined(live, batch, lambda pipe, key : pipe.ttl(key))
+        no_ttl = [key for key, ttl in zip(live, ttls) if ttl == -1]
+
+        orphan_bytes = sum(b or 0 for b in await self._pipelined(orphans, batch, lambda pipe, key : pipe.memory_usage(key)))
+        no_ttl_bytes = sum(b or 0 for b in await self._pipelined(no_ttl, batch, lambda pipe, key : pipe.memory_usage(key)))
+        if not dry_run :
+            await self._pipelined(orphans, batch, lambda pipe, key : pipe.unlink(key))
+            await self._pipelined(no_ttl, batch, lambda pipe, key : pipe.expire(key, settings.GAME_ROOM_TTL_SECONDS))
+
+        prefix = '[dry-run] ' if dry_run else ''
+        self.stdout.write(
+            f'{prefix}키 {scanned}개 / 방 {len(room_ids)}개 (DB 에 있는 방 {len(existing)}개) 확인'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}삭제: 고아 키 {len(orphans)}개, {orphan_bytes / 1024:.1f}KB 회수 / '
+            f'TTL 설정: {len(no_ttl)}개, {no_ttl_bytes / 1024:.1f}KB 는 {settings.GAME_ROOM_TTL_SECONDS}초 동안 활동이 없으면 만료'
+        ))
+
+    def _existing_rooms(self, room_ids) :
+        return {str(pk) for pk in GameRoom.objects.filter(pk__in=room_ids).values_list('pk', flat=True)}
+
+    async def _pipelined(self, keys, batch, command) :
+        results = []
+        for i in range(0, len(keys), batch) :
+            async with redis_pool.pipeline(transaction=False) as pipe :
+                for key in keys[i:i + batch] :
+                    command(pipe, key)
+                results += await pipe.execute()
+        return results
@@ -0,0 +1,81 @@
+# backend/game/redis_pool.py
+"""
+GameState / 작업 큐 / single-flight 가 함께 쓰는 프로세스 공용 async Redis 클라이언트.
+
+- 이벤트 루프마다 클라이언트(=연결 풀) 하나를 만들어 재사용 (redis.asyncio 연결은 만든 루프에 묶임)
+  → 예전처럼 명령마다 from_url() 로 새 풀을 만들고 닫지 않아 연결이 쌓이는 일이 없음
+- 풀 크기는 GAME_REDIS_MAX_CONNECTIONS, 주소는 GAME_REDIS_URL
+- ASGI lifespan(config/asgi.py 의 LifespanMiddleware)에서 startup 때 연결을 확인하고 shutdown 때 닫음
+- 여러 명령은 pipeline() 으로 묶어 한 번의 왕복으로 보냄
+
+사용 예:
+    async with redis_pool.pipeline() as pipe:
+        pipe.hset(key, field, value)
+        pipe.expire(key, 3600)
+        _, _ = await pipe.execute()
+"""
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+
+import redis.asyncio as aioredis
+from django.conf import settings
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    """현재 이벤트 루프의 공용 클라이언트 (없으면 생성)"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = aioredis.Redis(connection_pool=aioredis.ConnectionPool.from_url(
+            settings.GAME_REDIS_URL,
+            decode_responses=True,
+            max_connections=settings.GAME_REDIS_MAX_CONNECTIONS,
+        ))
+        _clients[loop] = client
+    return client
+
+
+@asynccontextmanager
+async def pipeline(transaction=True):
+    """명령을 모아 execute() 때 한 번에 보냄 (transaction=True 면 MULTI/EXEC 로 원자적으로 실행)"""
+    async with get_client().pipeline(transaction=transaction) as pipe:
+        yield pipe
+
+
+async def startup():
+    """워커 시작 시 풀을 만들고 연결을 확인 (실패해도 첫 요청 때 다시 시도하므로 기동은 막지 않음)"""
+    try:
+        await get_client().ping()
+        print(f"✅ Redis 연결 풀 준비 완료 ({settings.GAME_REDIS_URL})")
+    except Exception as e:
+        print(f"⚠️ Redis 연결 확인 실패: {e}")
+
+
+async def close():
+    """현재 이벤트 루프의 클라이언트와 연결 풀을 닫음 (워커 종료 시)"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose(close_connection_pool=True)
+
+
+class LifespanMiddleware:
+    """ASGI lifespan 이벤트를 받아 startup()/close() 를 호출하고, 나머지 요청은 app 으로 넘김"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "lifespan":
+            return await self.app(scope, receive, send)
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await startup()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
@@ -0,0 +1,114 @@
+# backend/game/rules_engine.py
+"""
+LLM 없이 규칙만으로 턴을 판정하는 엔진 (SHARI GM 의 대체 경로).
+
+- 등급은 판정 결과의 grade 를 그대로 쓰고, 없으면 round.map_grade(dice, total, DC) 로 계산
+- 서술은 턴제 시나리오 템플릿(scenarios_turn)의 fragments["{선택지id}_{등급}"],
+  템플릿에 없는 씬(LLM 이 만든 씬)은 등급별 기본 문장으로 조립
+- 능력치 변화는 템플릿의 statChanges["{선택지id}_{등급}"], 없으면(압축 씬의 A1 같은 id 포함) 대성공 +1 / 대실패 -1 (판정 능력치)
+- 대실패(SF)는 부상(characterHurt)으로 기록
+
+결과는 AsyncAIGameMaster.resolve_turn 과 같은 형태라 apply_gm_result_to_state / turn_resolved 를 그대로 탐.
+쓰이는 곳: GM 엔진이 GM_RESOLVE_SLO_SECONDS 안에 답하지 않거나 실패할 때, 그리고 GM_RULES_ONLY_DIFFICULTIES 의 방.
+"""
+from .ai_planner import get_dc
+from .round import map_grade
+from .scenarios_turn import get_scene_template
+
+GRADE_LABELS = {"SP": "대성공", "S": "성공", "F": "실패", "SF": "대실패"}
+
+# 템플릿 fragment 가 없을 때 쓰는 등급별 문장 ({name}: 캐릭터 이름, {text}: 선택지 내용)
+DEFAULT_FRAGMENTS = {
+    "SP": "{name}은(는) '{text}' — 누구도 예상하지 못한 완벽한 결과를 만들어냈다.",
+    "S": "{name}은(는) '{text}' — 무사히 뜻한 바를 이뤘다.",
+    "F": "{name}은(는) '{text}' — 시도했지만 뜻대로 되지 않았다.",
+    "SF": "{name}은(는) '{text}' — 일이 크게 틀어져 상처를 입고 말았다.",
+}
+
+
+def _template_turn(scene_index, role):
+    template = get_scene_template(scene_index) if scene_index is not None else None
+    for turn in (template or {}).get("turns", []):
+        if turn.get("role") == role:
+            return turn
+    return None
+
+
+def _grade(result, difficulty):
+    grade = result.get("grade")
+    if grade in GRADE_LABELS:
+        return grade
+    try:
+        return map_grade(int(result["dice"]), int(result["total"]), get_dc(difficulty))
+    except (KeyError, TypeError, ValueError):
+        return "F"
+
+
+def resolve_turn(current_scene, player_results, characters, choice_texts, turn=0, difficulty="초급"):
+    """
+    current_scene: 현재 씬 (index, round.choices)
+    player_results: 사람 + AI 의 판정 결과 목록 (role, choiceId, grade, dice, total, characterId, ...)
+    characters: 전체 캐릭터 목록 (id, name)
+    choice_texts: {character_id: 선택지 내용}
+    """
+    scene_index = current_scene.get("index")
+    round_data = current_scene.get("round", {})
+    names = {str(c.get("id")): c.get("name", "") for c in characters}
+
+    lines, personal, party, rolls, hurt, log_append = [], {}, [], [], {}, []
+    for result in player_results:
+        pid = str(result.get("characterId", ""))
+        role = result.get("role")
+        choice_id = result.get("choiceId")
+        grade = _grade(result, difficulty)
+        name = result.get("characterName") or names.get(pid, role)
+        text = choice_texts.get(pid) or choice_texts.get(result.get("characterId")) or ""
+
+        turn_spec = _template_turn(scene_index, role) or {}
+        key = f"{choice_id}_{grade}"
+        fragment = (turn_spec.get("fragments") or {}).get(key) or DEFAULT_FRAGMENTS[grade].format(name=name, text=text)
+        if key in (turn_spec.get("statChanges") or {}):
+            stat_changes = dict(turn_spec["statChanges"][key])
+        else:
+            stat = result.get("appliedStat")
+            stat_changes = {stat: 1} if grade == "SP" and stat else {stat: -1} if grade == "SF" and stat else {}
+
+        lines.append(fragment)
+        personal[pid] = fragment
+        rolls.append({
+            "player_id": pid,
+            "choice": text,
+            "dice": result.get("dice"),
+            "total": result.get("total"),
+            "grade": grade,
+            "label": GRADE_LABELS[grade],
+        })
+        hurt[pid] = grade == "SF"
+        changes = {"status": ["부상"]} if grade == "SF" else {}
+        if stat_changes:
+            changes["stats"] = stat_changes
+        if changes:
+            party.append({"id": pid, "name": name, "changes": changes})
+        log_append.append({"turn": turn + 1, "player_id": pid, "event": f"{text} → {GRADE_LABELS[grade]}"})
+
+    return {
+        "turn": turn + 1,
+        "narration": " ".join(lines) or "아무 일도 일어나지 않았습니다.",
+        "personal": personal,
+        "world": {"location": round_data.get("title"), "notes": round_data.get("description", "")},
+        "party": party,
+        "log_append": log_append,
+        "shari": {
+            "assess": [],
+            "rolls": rolls,
+            "update": {
+                "characterHurt": hurt,
+                "currentLocation": round_data.get("title"),
+                "previousLocation": None,
+                "notes": "",
+                "inventory": {"consumed": {}, "added": {}, "charges": {}},
+                "skills": {"cooldown": {}},
+            },
+        },
+        "engine": "rules",
+    }
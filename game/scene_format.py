@@ -0,0 +1,130 @@
+# backend/game/scene_format.py
+"""
+씬 JSON 의 압축 출력 형식 (LLM → 서버).
+
+기존 형식은 appliedStat/modifier 같은 긴 키와 역할 ID 를 roleMap 과 choices 양쪽에 반복해서
+출력 토큰이 많습니다. 압축 형식은 짧은 키와 능력치 코드만 쓰고, 캐릭터마다 한 줄로 묶습니다.
+
+    {"i": 1,
+     "t": "씬 제목",
+     "d": "상황 묘사",
+     "p": [["캐릭터이름", "역할ID", [["선택지 내용", "STR", 1], ...]], ...]}
+
+expand_scene() 이 이를 기존 current_scene 형식(id/index/roleMap/round)으로 펼칩니다.
+- 선택지 id 는 서버가 부여: 캐릭터 순서 알파벳 + 선택지 번호 (A1, A2, B1, ...)
+- 능력치 코드는 STAT_CODES 로 한글 이름으로 바꾸고, 모르는 값은 그대로 둠
+- 기존 형식(round 키가 있는 씬)은 그대로 통과시켜, 예전 프롬프트로 시작한 방도 계속 동작
+"""
+import json
+import string
+
+# 능력치 한글 이름 ↔ 코드 (앞의 6개는 캐릭터 시트, 뒤의 3개는 기본 시나리오 템플릿에서 사용)
+STAT_CODES = {
+    "STR": "힘",
+    "DEX": "민첩",
+    "INT": "지식",
+    "WIL": "의지",
+    "CHA": "매력",
+    "LUK": "운",
+    "CON": "체력",
+    "WIS": "지혜",
+    "LCK": "행운",
+}
+STAT_NAMES = {name: code for code, name in STAT_CODES.items()}
+
+# LLM 에게 보여 줄 압축 스키마 설명 (create_system_prompt_for_json 에서 사용)
+COMPACT_SCHEMA = """
+{"i": 씬번호(number),
+ "t": "씬 제목",
+ "d": "현재 상황 묘사 (2~3 문장)",
+ "p": [["캐릭터이름", "역할ID(영문 소문자 한 단어)", [["선택지 내용", "능력치코드", 보정치(number)], ...]], ...]}
+"""
+COMPACT_RULES = (
+    "- 공백·줄바꿈 없이 한 줄의 JSON 으로만 출력하세요.\n"
+    "- p 에는 참가 캐릭터마다 한 항목씩, 각 캐릭터의 선택지는 2~3개.\n"
+    "- 능력치코드는 STR(힘) DEX(민첩) INT(지식) WIL(의지) CHA(매력) LUK(운) 중 하나.\n"
+    "- 선택지 id, roleMap 등 다른 필드는 만들지 마세요 (서버가 채웁니다)."
+)
+
+
+def is_compact(data):
+    return isinstance(data, dict) and "round" not in data and ("p" in data or "t" in data)
+
+
+def choice_id(role_pos, choice_pos):
+    """캐릭터 순서(0부터)와 선택지 순서(0부터)로 씬 안에서 유일한 선택지 id 를 만듦."""
+    letters = string.ascii_uppercase
+    prefix = letters[role_pos] if role_pos < len(letters) else f"R{role_pos + 1}"
+    return f"{prefix}{choice_pos + 1}"
+
+
+def expand_choices(role_pos, compact_choices):
+    """[["text", "STR", 1], ...] → [{"id", "text", "appliedStat", "modifier"}, ...]"""
+    choices = []
+    for j, item in enumerate(compact_choices or []):
+        if isinstance(item, dict):  # 모델이 객체로 낸 경우도 허용
+            text, stat, modifier = item.get("text", ""), item.get("appliedStat", ""), item.get("modifier", 0)
+        else:
+            text, stat, modifier = (list(item) + ["", "", 0])[:3]
+        try:
+            modifier = int(modifier)
+        except (TypeError, ValueError):
+            modifier = 0
+        choices.append({
+            "id": choice_id(role_pos, j),
+            "text": text,
+            "appliedStat": STAT_CODES.get(str(stat).upper(), stat),
+            "modifier": modifier,
+        })
+    return choices
+
+
+def expand_party_entry(role_pos, entry):
+    """["이름", "역할ID", [...]] → (이름, 역할ID, 선택지 목록)"""
+    name, role_id, compact_choices = (list(entry) + ["", "", []])[:3]
+    role_id = role_id or f"role{role_pos + 1}"
+    return name, role_id, expand_choices(role_pos, compact_choices)
+
+
+def expand_scene(data, scene_index=None):
+    """압축 씬을 기존 current_scene 형식으로 펼침. 기존 형식이면 그대로 반환."""
+    if not is_compact(data):
+        return data
+    index = data.get("i", scene_index if scene_index is not None else 0)
+    role_map = {}
+    choices = {}
+    for k, entry in enumerate(data.get("p") or []):
+        name, role_id, role_choices = expand_party_entry(k, entry)
+        role_map[name] = role_id
+        choices[role_id] = role_choices
+    return {
+        "id": f"scene{index}",
+        "index": index,
+        "roleMap": role_map,
+        "round": {
+            "title": data.get("t", ""),
+            "description": data.get("d", ""),
+            "choices": choices,
+        },
+    }
+
+
+def compact_scene(scene):
+    """기존 형식의 씬을 압축 형식으로 (벤치마크/퓨샷 예시용). 선택지 id 는 버려짐."""
+    round_data = scene.get("round", {})
+    choices = round_data.get("choices", {})
+    party = []
+    for name, role_id in scene.get("roleMap", {}).items():
+        party.append([name, role_id, [
+            [c.get("text", ""), STAT_NAMES.get(c.get("appliedStat"), c.get("appliedStat")), c.get("modifier", 0)]
+            for c in choices.get(role_id, [])
+        ]])
+    compact = {"i": scene.get("index", 0), "t": round_data.get("title", "")}
+    if round_data.get("description"):
+        compact["d"] = round_data["description"]
+    compact["p"] = party
+    return compact
+
+
+def dumps_compact(compact):
+    return json.dumps(compact, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,106 @@
+# backend/game/singleflight.py
+"""
+방(room) + 씬 번호(scene index) 단위 single-flight.
+
+같은 씬 생성이 동시에 여러 번 요청되면(더블 클릭, 재접속, 준비 체크를 동시에 통과한 두 클라이언트 등)
+LLM 호출은 한 번만 하고, 나머지 요청자는 그 결과를 기다렸다가 그대로 받습니다.
+- 같은 프로세스 안: asyncio.Future 공유
+- 다른 워커 프로세스 사이: Redis 락(SET NX) + 결과 키로 공유
+  (락을 못 잡은 쪽은 결과 키가 생길 때까지 폴링)
+- 완료된 결과는 result_ttl 초 동안 남겨 두어, 직후에 도착한 중복 요청도 재생성하지 않음
+
+반환값은 (결과, leader) 이고, 실제로 생성한 쪽만 leader=True 입니다.
+브로드캐스트처럼 한 번만 해야 하는 후처리는 leader 만 수행하면 됩니다.
+"""
+import asyncio
+import json
+import uuid
+
+from django.conf import settings
+
+from .state import GameState
+
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class SceneSingleFlight:
+    def __init__(self, lock_ttl=None, result_ttl=None, poll_interval=0.25):
+        self.lock_ttl = lock_ttl or getattr(settings, "GAME_SCENE_FLIGHT_LOCK_TTL", 180)
+        self.result_ttl = result_ttl or getattr(settings, "GAME_SCENE_FLIGHT_RESULT_TTL", 30)
+        self.poll_interval = poll_interval
+        self._flights = {}
+
+    @staticmethod
+    def _lock_key(room_id, scene_index):
+        return f"game:{room_id}:scene:{scene_index}:flight"
+
+    @staticmethod
+    def _result_key(room_id, scene_index):
+        return f"game:{room_id}:scene:{scene_index}:flight_result"
+
+    async def do(self, room_id, scene_index, fn):
+        """fn() 을 (room_id, scene_index) 당 한 번만 실행하고 (결과, leader) 를 반환합니다."""
+        flight_key = (str(room_id), int(scene_index))
+        future = self._flights.get(flight_key)
+        if future is not None:
+            # 취소되더라도 진행 중인 생성에는 영향을 주지 않도록 shield
+            return await asyncio.shield(future), False
+
+        future = asyncio.get_running_loop().create_future()
+        self._flights[flight_key] = future
+        try:
+            result, leader = await self._run_across_workers(room_id, scene_index, fn)
+            future.set_result(result)
+            return result, leader
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # 기다리는 쪽이 없어도 "never retrieved" 경고가 나지 않게
+            raise
+        finally:
+            self._flights.pop(flight_key, None)
+
+    async def forget(self, room_id, scene_index):
+        """남아 있는 완료 결과를 지움 (같은 방에서 새 게임을 시작할 때)"""
+        conn = await GameState._get_conn()
+        await conn.delete(self._result_key(room_id, scene_index))
+
+    async def _run_across_workers(self, room_id, scene_index, fn):
+        conn = await GameState._get_conn()
+        lock_key = self._lock_key(room_id, scene_index)
+        result_key = self._result_key(room_id, scene_index)
+
+        cached = await conn.get(result_key)
+        if cached is not None:
+            return json.loads(cached), False
+
+        token = uuid.uuid4().hex
+        if await conn.set(lock_key, token, nx=True, ex=self.lock_ttl):
+            try:
+                result = await fn()
+                if result is not None:
+                    await conn.set(result_key, json.dumps(result), ex=self.result_ttl)
+                return result, True
+            finally:
+                await conn.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+
+        # 다른 워커가 생성 중 → 결과가 올라오거나 락이 풀릴 때까지 대기
+        print(f"⏳ 씬 생성 중복 요청 대기 (Room: {room_id}, scene: {scene_index})")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_ttl
+        while loop.time() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            cached = await conn.get(result_key)
+            if cached is not None:
+                return json.loads(cached), False
+            if not await conn.exists(lock_key):
+                # 생성하던 쪽이 실패함 (결과 없음)
+                return None, False
+        return None, False
+
+
+scene_flights = SceneSingleFlight()
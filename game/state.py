@@ -1,26 +1,191 @@
-import redis.asyncio as aioredis
+from django.conf import settings
+
+from . import codec, redis_pool
 from .scenarios_turn import get_scene_template
+import asyncio
+import copy
+import inspect
 import json
+import random
+import time
+
+REDIS_URL = settings.GAME_REDIS_URL
+
+# 방 상태(game_state) 저장 구조 — 바뀐 필드/메시지만 주고받도록 나눠서 저장
+#   game:{room}:state:fields    HASH  최상위 필드별 값 (current_scene, character_setup, difficulty, history_summary, ...)
+#                                     "_" 로 시작하는 필드는 메타 (_history_head: 대화 기록 앞의 system 프롬프트, _updated_at)
+#   game:{room}:state:history   LIST  conversation_history 중 system 프롬프트 뒤의 대화 (메시지별 값, 뒤에 추가)
+#   game:{room}:state:overflow  LIST  history_overflow (윈도우 밖으로 밀려나 요약을 기다리는 메시지)
+#   game:{room}:state:version   STR   쓸 때마다 1 증가하는 버전 (GameState.update 의 compare-and-set 기준)
+#   game:{room}:state           STR   이전 형식(전체 JSON). 읽거나 필드를 쓸 때 발견하면 새 형식으로 옮기고 지움
+#   위 키와 씬별 키(choices, turn_order, current_turn_index)는 쓸 때/활동이 있을 때 GAME_ROOM_TTL_SECONDS 로 연장,
+#   게임 종료 시 purge 로 game:{room}:* 전체 삭제 (남은 키는 sweep_game_keys 명령이 정리)
+#   필드/메시지 값은 game/codec.py 로 인코딩 (JSON 텍스트, 또는 태그가 붙은 압축/MessagePack)
+LIST_FIELDS = ("conversation_history", "history_overflow")
+
+# 버전이 ARGV[1] 과 같을 때만 변경을 적용하고 새 버전을 반환 (다르면 -1)
+# KEYS: version, fields, history, overflow / ARGV[2]: {"set": {필드: JSON}, "del": [...], "history": {...}, "overflow": {...}}
+# ARGV[3]: 방 키 TTL (네 키 모두 연장)
+_CAS_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if current ~= tonumber(ARGV[1]) then
+    return -1
+end
+local ops = cjson.decode(ARGV[2])
+for field, value in pairs(ops['set']) do
+    redis.call('HSET', KEYS[2], field, value)
+end
+for _, field in ipairs(ops['del']) do
+    redis.call('HDEL', KEYS[2], field)
+end
+local lists = {history = KEYS[3], overflow = KEYS[4]}
+for name, key in pairs(lists) do
+    local op = ops[name]
+    if op then
+        if op['drop'] > 0 then
+            redis.call('LTRIM', key, op['drop'], -1)
+        end
+        for _, item in ipairs(op['append']) do
+            redis.call('RPUSH', key, item)
+        end
+    end
+end
+local version = redis.call('INCR', KEYS[1])
+for i = 1, 4 do
+    redis.call('EXPIRE', KEYS[i], ARGV[3])
+end
+return version
+"""
+
+# 같은 방의 활동 TTL 연장 시각 (GameState.touch 가 GAME_ROOM_TOUCH_INTERVAL 간격으로만 연장)
+# 연장한 순서대로 유지하고, 간격이 지난 항목은 새로 넣을 때 앞에서부터 버림 → 최근 간격 안에 활동한 방만 남음
+_touched_at = {}
+
+
+class GameStateConflict(Exception):
+    """GameState.update 가 재시도 횟수 안에 다른 쓰기와의 충돌을 피하지 못함"""
+
+
+def _fields_key(room_id):
+    return f"game:{room_id}:state:fields"
+
+
+def _history_key(room_id):
+    return f"game:{room_id}:state:history"
+
+
+def _overflow_key(room_id):
+    return f"game:{room_id}:state:overflow"
+
+
+def _version_key(room_id):
+    return f"game:{room_id}:state:version"
+
+
+def _legacy_key(room_id):
+    return f"game:{room_id}:state"
+
+
+def _state_keys(room_id):
+    return (_version_key(room_id), _fields_key(room_id), _history_key(room_id), _overflow_key(room_id))
+
+
+def _room_keys(room_id, scene_index=None):
+    """활동 시 TTL 을 연장할 방 키 (scene_index 를 주면 그 씬의 턴 키도)"""
+    keys = [*_state_keys(room_id), f"game:{room_id}:scene_index", f"game:{room_id}:turn_rolls"]
+    if scene_index is not None:
+        keys += [f"game:{room_id}:scene:{scene_index}:{name}" for name in ("choices", "turn_order", "current_turn_index")]
+    return keys
+
+
+def _expire(pipe, *keys):
+    for key in keys:
+        pipe.expire(key, settings.GAME_ROOM_TTL_SECONDS)
+
 
-REDIS_URL = "redis://localhost:6379"
+def _split_history_head(history):
+    """맨 앞의 system 메시지들(고정)과 그 뒤 대화(추가/삭제되는 부분)를 분리"""
+    head_len = 0
+    for msg in history:
+        if msg.get("role") != "system":
+            break
+        head_len += 1
+    return history[:head_len], history[head_len:]
+
+
+def _encode_fields(state):
+    mapping = {k: codec.encode(v) for k, v in state.items() if k not in LIST_FIELDS}
+    if "conversation_history" in state:
+        mapping["_history_head"] = codec.encode(_split_history_head(state["conversation_history"])[0])
+    mapping["_updated_at"] = time.time()
+    return mapping
+
+
+def _list_ops(old, new):
+    """저장된 목록(old)을 new 로 만드는 최소 변경: 앞에서 drop 개 제거 + 뒤에 append (같으면 None)"""
+    if new == old:
+        return None
+    for drop in range(len(old) + 1):
+        kept = old[drop:]
+        if new[:len(kept)] == kept:
+            return {"drop": drop, "append": [codec.encode(m) for m in new[len(kept):]]}
 
 class GameState:
     @staticmethod
     async def _get_conn():
-        # redis.asyncio.from_url 로 연결
-        return aioredis.from_url(REDIS_URL, decode_responses=True)
+        # 이벤트 루프 공용 연결 풀 (game/redis_pool.py)
+        return redis_pool.get_client()
+
+    @staticmethod
+    def pipeline(transaction=True):
+        """여러 명령을 한 번의 왕복으로: async with GameState.pipeline() as pipe: ..."""
+        return redis_pool.pipeline(transaction=transaction)
+
+    @staticmethod
+    async def touch(room_id, scene_index=None, force=False):
+        """
+        활동이 있을 때 방 키의 TTL 을 GAME_ROOM_TTL_SECONDS 로 다시 연장 (sliding TTL).
+        같은 방은 GAME_ROOM_TOUCH_INTERVAL 초에 한 번만 실제로 연장 (force=True 면 바로).
+        """
+        now = time.monotonic()
+        if not force and now - _touched_at.get(room_id, float("-inf")) < settings.GAME_ROOM_TOUCH_INTERVAL:
+            return
+        _touched_at.pop(room_id, None)
+        _touched_at[room_id] = now
+        while _touched_at:
+            oldest = next(iter(_touched_at))
+            if now - _touched_at[oldest] < settings.GAME_ROOM_TOUCH_INTERVAL:
+                break
+            del _touched_at[oldest]
+        async with GameState.pipeline(transaction=False) as pipe:
+            _expire(pipe, *_room_keys(room_id, scene_index))
+            await pipe.execute()
+
+    @staticmethod
+    async def purge(room_id):
+        """게임 종료: 방의 game:{room}:* 키를 모두 지우고 지운 키 수를 반환"""
+        _touched_at.pop(room_id, None)
+        conn = await GameState._get_conn()
+        keys = [key async for key in conn.scan_iter(match=f"game:{room_id}:*", count=500)]
+        for i in range(0, len(keys), 500):
+            await conn.unlink(*keys[i:i + 500])
+        if keys:
+            print(f"🧹 방 Redis 키 {len(keys)}개 삭제 (Room: {room_id})")
+        return len(keys)
 
     @staticmethod
     async def ensure_scene(room_id, scene_index):
         conn = await GameState._get_conn()
         key = f"game:{room_id}:scene_index"
-        await conn.set(key, scene_index)
+        await conn.set(key, scene_index, ex=settings.GAME_ROOM_TTL_SECONDS)
 
     @staticmethod
     async def store_choice(room_id, scene_index, role, choice_id):
-        conn = await GameState._get_conn()
         key = f"game:{room_id}:scene:{scene_index}:choices"
-        await conn.hset(key, role, choice_id)
+        async with GameState.pipeline() as pipe:
+            pipe.hset(key, role, choice_id)
+            _expire(pipe, key)
+            await pipe.execute()
 
     @staticmethod
     async def get_choices(room_id, scene_index):
@@ -40,28 +205,213 @@ class GameState:
     async def advance_scene(room_id, scene_index):
         next_index = scene_index + 1
         conn = await GameState._get_conn()
-        await conn.set(f"game:{room_id}:scene_index", next_index)
+        await conn.set(f"game:{room_id}:scene_index", next_index, ex=settings.GAME_ROOM_TTL_SECONDS)
         return next_index
     
     @staticmethod
     async def get_game_state(room_id):
-        """방의 전체 게임 상태를 불러옵니다."""
+        """방의 전체 게임 상태를 불러옵니다. (필드 + 대화 기록을 한 번의 왕복으로 모아 dict 로)"""
+        state, _ = await GameState.get_game_state_versioned(room_id)
+        return state
+
+    @staticmethod
+    async def get_game_state_versioned(room_id):
+        """(상태, 버전) — 상태와 버전을 같은 트랜잭션에서 읽음 (update 의 compare-and-set 용)"""
+        async with GameState.pipeline() as pipe:
+            pipe.get(_version_key(room_id))
+            pipe.hgetall(_fields_key(room_id))
+            pipe.lrange(_history_key(room_id), 0, -1)
+            pipe.lrange(_overflow_key(room_id), 0, -1)
+            pipe.get(_legacy_key(room_id))
+            version, fields, body, overflow, legacy = await pipe.execute()
+        if legacy:
+            await GameState._migrate_legacy(room_id, legacy)
+            return await GameState.get_game_state_versioned(room_id)
+        return GameState._assemble(fields, body, overflow), int(version or 0)
+
+    @staticmethod
+    def _assemble(fields, body, overflow):
+        if not fields:
+            return None
+
+        state = {k: codec.decode(v) for k, v in fields.items() if not k.startswith("_")}
+        if "_history_head" in fields or body:
+            state["conversation_history"] = codec.decode(fields.get("_history_head", "[]")) + [codec.decode(m) for m in body]
+        if overflow:
+            state["history_overflow"] = [codec.decode(m) for m in overflow]
+        return state
+
+    @staticmethod
+    async def update(room_id, fn, retries=None):
+        """
+        낙관적 동시성으로 방 상태를 고칩니다 (방 단위 락 없음).
+        fn(state) 는 최신 상태의 복사본을 받아 새 상태를 반환 (None 이면 쓰지 않고 중단), 코루틴이어도 됨.
+        읽은 뒤 다른 쓰기가 끼어들어 버전이 바뀌었으면 최신 상태로 fn 을 다시 실행합니다.
+        fn 은 여러 번 실행될 수 있으므로 상태 계산만 하고 부수 효과(전송, LLM 호출)는 밖에서 할 것.
+        반환: 저장된 새 상태 (중단했으면 None). 재시도를 다 쓰면 GameStateConflict.
+        """
+        retries = settings.GAME_STATE_CAS_RETRIES if retries is None else retries
         conn = await GameState._get_conn()
-        state_json = await conn.get(f"game:{room_id}:state")
-        if state_json:
-            return json.loads(state_json)
-        return None
+        for attempt in range(retries + 1):
+            state, version = await GameState.get_game_state_versioned(room_id)
+            state = state or {}
+            new_state = fn(copy.deepcopy(state))
+            if inspect.isawaitable(new_state):
+                new_state = await new_state
+            if new_state is None:
+                return None
+
+            ops = GameState._diff(state, new_state)
+            keys = _state_keys(room_id)
+            if await conn.eval(_CAS_SCRIPT, len(keys), *keys, version, json.dumps(ops), settings.GAME_ROOM_TTL_SECONDS) != -1:
+                return new_state
+            # 충돌: 다른 핸들러가 먼저 씀 → 잠깐 쉬었다가 최신 상태로 다시
+            await asyncio.sleep(random.uniform(0, 0.005 * (2 ** min(attempt, 5))))
+        raise GameStateConflict(f"방 상태 갱신 충돌 (Room: {room_id}, {retries}회 재시도)")
+
+    @staticmethod
+    def _diff(old, new):
+        """두 상태의 차이를 _CAS_SCRIPT 의 ops 로 (바뀐 필드만 set, 없어진 필드는 del, 목록은 앞 제거 + 뒤 추가)"""
+        old_fields = {k: v for k, v in old.items() if k not in LIST_FIELDS}
+        new_fields = {k: v for k, v in new.items() if k not in LIST_FIELDS}
+        ops = {
+            "set": {k: codec.encode(v) for k, v in new_fields.items() if k not in old_fields or old_fields[k] != v},
+            "del": [k for k in old_fields if k not in new_fields],
+        }
+        old_head, old_body = _split_history_head(old.get("conversation_history", []))
+        new_head, new_body = _split_history_head(new.get("conversation_history", []))
+        if new_head != old_head or ("conversation_history" in new and "conversation_history" not in old):
+            ops["set"]["_history_head"] = codec.encode(new_head)
+        if "conversation_history" not in new and "conversation_history" in old:
+            ops["del"].append("_history_head")
+        history = _list_ops(old_body, new_body)
+        if history:
+            ops["history"] = history
+        overflow = _list_ops(old.get("history_overflow") or [], new.get("history_overflow") or [])
+        if overflow:
+            ops["overflow"] = overflow
+        ops["set"]["_updated_at"] = json.dumps(time.time())
+        return ops
 
     @staticmethod
     async def set_game_state(room_id, state):
-        """방의 전체 게임 상태를 저장합니다."""
+        """방의 전체 게임 상태를 통째로 교체합니다. (새 게임/불러오기 등 — 일부만 바꿀 때는 update_state)"""
+        head, body = _split_history_head(state.get("conversation_history", []))
+        async with GameState.pipeline() as pipe:
+            pipe.delete(_fields_key(room_id), _history_key(room_id), _overflow_key(room_id), _legacy_key(room_id))
+            pipe.incr(_version_key(room_id))
+            pipe.hset(_fields_key(room_id), mapping=_encode_fields(state))
+            if body:
+                pipe.rpush(_history_key(room_id), *[codec.encode(m) for m in body])
+            if state.get("history_overflow"):
+                pipe.rpush(_overflow_key(room_id), *[codec.encode(m) for m in state["history_overflow"]])
+            _expire(pipe, *_state_keys(room_id))
+            await pipe.execute()
+
+    @staticmethod
+    async def _migrate_legacy(room_id, legacy_json):
+        """
+        이전 형식(전체 JSON 한 덩어리)을 새 형식으로 옮깁니다.
+        이미 새 형식으로 쓰인 필드는 덮어쓰지 않고(HSETNX), 대화 기록은 새 형식 목록이 비어 있을 때만 옮김.
+        """
+        legacy = codec.decode(legacy_json)
+        head, body = _split_history_head(legacy.get("conversation_history", []))
+        async with GameState.pipeline() as pipe:
+            for field, value in _encode_fields(legacy).items():
+                pipe.hsetnx(_fields_key(room_id), field, value)
+            pipe.llen(_history_key(room_id))
+            pipe.llen(_overflow_key(room_id))
+            pipe.delete(_legacy_key(room_id))
+            pipe.incr(_version_key(room_id))
+            results = await pipe.execute()
+        history_len, overflow_len = results[-4], results[-3]
+        async with GameState.pipeline() as pipe:
+            if body and not history_len:
+                pipe.rpush(_history_key(room_id), *[codec.encode(m) for m in body])
+            if legacy.get("history_overflow") and not overflow_len:
+                pipe.rpush(_overflow_key(room_id), *[codec.encode(m) for m in legacy["history_overflow"]])
+            _expire(pipe, *_state_keys(room_id))
+            await pipe.execute()
+        print(f"🔁 방 상태를 필드별 저장 형식으로 옮김 (Room: {room_id})")
+        return await GameState.get_game_state(room_id)
+
+    @staticmethod
+    async def get_state_fields(room_id, *names):
+        """최상위 필드 몇 개만 읽음 → {이름: 값} (없는 필드는 빠짐). 대화 기록은 get_history 로."""
+        async with GameState.pipeline(transaction=False) as pipe:
+            pipe.hmget(_fields_key(room_id), *names)
+            pipe.exists(_legacy_key(room_id))
+            values, legacy = await pipe.execute()
+        if legacy:
+            state = await GameState.get_game_state(room_id) or {}
+            return {name: state[name] for name in names if name in state}
+        return {name: codec.decode(v) for name, v in zip(names, values) if v is not None}
+
+    @staticmethod
+    async def update_state(room_id, fields=None, delete_fields=(), append_history=(), drop_history=0,
+                           append_overflow=(), drop_overflow=0):
+        """
+        바뀐 부분만 한 트랜잭션으로 씁니다.
+        - fields: 바꿀 최상위 필드 {이름: 값} / delete_fields: 지울 필드
+        - append_history / drop_history: 대화 기록 뒤에 메시지 추가 / 앞에서(system 프롬프트 제외) n개 제거
+        - append_overflow / drop_overflow: 요약 대기 목록 뒤에 추가 / 앞에서 n개 제거
+        """
+        fields = {k: v for k, v in (fields or {}).items() if k not in LIST_FIELDS}
+        async with GameState.pipeline() as pipe:
+            pipe.exists(_legacy_key(room_id))
+            pipe.incr(_version_key(room_id))
+            pipe.hset(_fields_key(room_id), mapping={**{k: codec.encode(v) for k, v in fields.items()}, "_updated_at": time.time()})
+            if delete_fields:
+                pipe.hdel(_fields_key(room_id), *delete_fields)
+            if append_history:
+                pipe.rpush(_history_key(room_id), *[codec.encode(m) for m in append_history])
+            if drop_history:
+                pipe.ltrim(_history_key(room_id), drop_history, -1)
+            if append_overflow:
+                pipe.rpush(_overflow_key(room_id), *[codec.encode(m) for m in append_overflow])
+            if drop_overflow:
+                pipe.ltrim(_overflow_key(room_id), drop_overflow, -1)
+            _expire(pipe, *_state_keys(room_id))
+            legacy = (await pipe.execute())[0]
+        if legacy:
+            # 이전 형식이 남아 있던 방: 방금 쓴 값은 유지하고 나머지를 옮김
+            conn = await GameState._get_conn()
+            legacy_json = await conn.get(_legacy_key(room_id))
+            if legacy_json:
+                await GameState._migrate_legacy(room_id, legacy_json)
+
+    @staticmethod
+    async def get_current_scene(room_id):
+        return (await GameState.get_state_fields(room_id, "current_scene")).get("current_scene")
+
+    @staticmethod
+    async def set_current_scene(room_id, scene):
+        await GameState.update_state(room_id, fields={"current_scene": scene})
+
+    @staticmethod
+    async def get_character_setup(room_id):
+        return (await GameState.get_state_fields(room_id, "character_setup")).get("character_setup")
+
+    @staticmethod
+    async def get_history(room_id):
+        """conversation_history (system 프롬프트 + 대화)"""
+        async with GameState.pipeline(transaction=False) as pipe:
+            pipe.hget(_fields_key(room_id), "_history_head")
+            pipe.lrange(_history_key(room_id), 0, -1)
+            pipe.exists(_legacy_key(room_id))
+            head, body, legacy = await pipe.execute()
+        if legacy:
+            return (await GameState.get_game_state(room_id) or {}).get("conversation_history", [])
+        return codec.decode(head or "[]") + [codec.decode(m) for m in body]
+
+    @staticmethod
+    async def get_history_overflow(room_id):
         conn = await GameState._get_conn()
-        await conn.set(f"game:{room_id}:state", json.dumps(state))
+        return [codec.decode(m) for m in await conn.lrange(_overflow_key(room_id), 0, -1)]
     
     @staticmethod
     async def initialize_turn_order(room_id, scene_index):
         """씬 시작 시 턴 순서와 현재 턴 인덱스를 초기화"""
-        conn = await GameState._get_conn()
         template = get_scene_template(scene_index) # 턴제용 템플릿 사용
         if not template or "turns" not in template:
             return
@@ -69,13 +419,20 @@ class GameState:
         turn_order = [turn["role"] for turn in template["turns"]]
         
         # 턴 순서(리스트)와 현재 턴 인덱스(0)를 저장
-        await conn.set(f"game:{room_id}:scene:{scene_index}:turn_order", json.dumps(turn_order))
-        await conn.set(f"game:{room_id}:scene:{scene_index}:current_turn_index", 0)
+        async with GameState.pipeline() as pipe:
+            pipe.mset({
+                f"game:{room_id}:scene:{scene_index}:turn_order": json.dumps(turn_order),
+                f"game:{room_id}:scene:{scene_index}:current_turn_index": 0,
+            })
+            _expire(pipe, f"game:{room_id}:scene:{scene_index}:turn_order", f"game:{room_id}:scene:{scene_index}:current_turn_index")
+            await pipe.execute()
 
     @staticmethod
     async def record_turn_roll(room_id, player_id, roll):
-        conn = await GameState._get_conn()
-        await conn.hset(f"game:{room_id}:turn_rolls", player_id, roll)
+        async with GameState.pipeline() as pipe:
+            pipe.hset(f"game:{room_id}:turn_rolls", player_id, roll)
+            _expire(pipe, f"game:{room_id}:turn_rolls")
+            await pipe.execute()
 
     @staticmethod
     async def get_all_turn_rolls(room_id):
@@ -86,10 +443,11 @@ class GameState:
     async def get_current_turn_role(room_id, scene_index):
         """현재 턴인 역할(role)을 반환"""
         conn = await GameState._get_conn()
-        order_str = await conn.get(f"game:{room_id}:scene:{scene_index}:turn_order")
+        order_str, index_str = await conn.mget(
+            f"game:{room_id}:scene:{scene_index}:turn_order",
+            f"game:{room_id}:scene:{scene_index}:current_turn_index",
+        )
         turn_order = json.loads(order_str)
-        
-        index_str = await conn.get(f"game:{room_id}:scene:{scene_index}:current_turn_index")
         current_index = int(index_str)
         
         return turn_order[current_index]
@@ -97,13 +455,13 @@ class GameState:
     @staticmethod
     async def advance_turn(room_id, scene_index):
         """턴을 1 증가시키고, 다음 턴 역할(role)을 반환. 마지막 턴이면 None 반환"""
-        conn = await GameState._get_conn()
-        order_str = await conn.get(f"game:{room_id}:scene:{scene_index}:turn_order")
+        # 턴 순서 조회와 현재 턴 인덱스 1 증가를 한 번에
+        async with GameState.pipeline() as pipe:
+            pipe.get(f"game:{room_id}:scene:{scene_index}:turn_order")
+            pipe.incr(f"game:{room_id}:scene:{scene_index}:current_turn_index")
+            order_str, new_index = await pipe.execute()
         turn_order = json.loads(order_str)
 
-        # 현재 턴 인덱스를 1 증가시킴
-        new_index = await conn.incr(f"game:{room_id}:scene:{scene_index}:current_turn_index")
-
         if new_index < len(turn_order):
             return turn_order[new_index]
         else:
@@ -112,11 +470,23 @@ class GameState:
     @staticmethod
     async def set_user_ready_for_next_scene(room_id, user_id):
         """지정된 사용자를 '다음 씬 준비' 상태로 Redis Set에 추가합니다."""
-        conn = await GameState._get_conn()
         key = f"game:{room_id}:next_scene_ready_users"
-        await conn.sadd(key, user_id)
         # 키가 자동으로 만료되도록 시간 설정 (예: 1시간)
-        await conn.expire(key, 3600)
+        async with GameState.pipeline() as pipe:
+            pipe.sadd(key, user_id)
+            pipe.expire(key, 3600)
+            await pipe.execute()
+
+    @staticmethod
+    async def mark_ready_for_next_scene(room_id, user_id):
+        """사용자를 '다음 씬 준비' 로 추가하고, 준비된 사용자 전체를 같은 왕복에서 반환합니다."""
+        key = f"game:{room_id}:next_scene_ready_users"
+        async with GameState.pipeline() as pipe:
+            pipe.sadd(key, user_id)
+            pipe.expire(key, 3600)
+            pipe.smembers(key)
+            _, _, ready_users = await pipe.execute()
+        return ready_users
 
     # ✅ [추가] 준비된 유저 목록을 가져오는 함수
     @staticmethod
@@ -136,10 +506,22 @@ class GameState:
 
     @staticmethod
     async def store_turn_result(room_id, user_id, result_data):
-        conn = await GameState._get_conn()
         key = f"game:{room_id}:turn_results"
-        await conn.hset(key, user_id, json.dumps(result_data))
-        await conn.expire(key, 3600) # 1시간 후 만료
+        async with GameState.pipeline() as pipe:
+            pipe.hset(key, user_id, json.dumps(result_data))
+            pipe.expire(key, 3600) # 1시간 후 만료
+            await pipe.execute()
+
+    @staticmethod
+    async def submit_turn_result(room_id, user_id, result_data):
+        """플레이어 결과 저장 + 이번 턴에 제출된 전체 결과 조회를 한 번의 왕복으로."""
+        key = f"game:{room_id}:turn_results"
+        async with GameState.pipeline() as pipe:
+            pipe.hset(key, user_id, json.dumps(result_data))
+            pipe.expire(key, 3600) # 1시간 후 만료
+            pipe.hgetall(key)
+            _, _, results_json = await pipe.execute()
+        return {uid: json.loads(res) for uid, res in results_json.items()}
 
     # ✅ [추가] 이번 턴에 제출된 모든 플레이어 결과를 가져오기
     @staticmethod
@@ -156,3 +538,33 @@ class GameState:
         conn = await GameState._get_conn()
         key = f"game:{room_id}:turn_results"
         await conn.delete(key)
+
+    # ✅ [추가] 확정 전에 미리 생성해 둔 씬 (턴 파이프라인 / 로비 사전 생성)
+    @staticmethod
+    async def set_pending_scene(room_id, scene_index, data, ttl=900):
+        """플레이어가 다음 씬으로 넘어갈 때 꺼내서 확정할 씬. status 는 running / ready"""
+        conn = await GameState._get_conn()
+        await conn.set(f"game:{room_id}:scene:{scene_index}:pending", codec.encode(data), ex=ttl)
+
+    @staticmethod
+    async def get_pending_scene(room_id, scene_index):
+        conn = await GameState._get_conn()
+        data = await conn.get(f"game:{room_id}:scene:{scene_index}:pending")
+        return codec.decode(data)
+
+    @staticmethod
+    async def clear_pending_scene(room_id, scene_index):
+        conn = await GameState._get_conn()
+        await conn.delete(f"game:{room_id}:scene:{scene_index}:pending")
+
+    # ✅ [추가] 씬별 AI 동료 행동 계획 (game/ai_planner.py)
+    @staticmethod
+    async def set_ai_plan(room_id, scene_index, plan, ttl=3600):
+        conn = await GameState._get_conn()
+        await conn.set(f"game:{room_id}:scene:{scene_index}:ai_plan", codec.encode(plan), ex=ttl)
+
+    @staticmethod
+    async def get_ai_plan(room_id, scene_index):
+        conn = await GameState._get_conn()
+        data = await conn.get(f"game:{room_id}:scene:{scene_index}:ai_plan")
+        return codec.decode(data)
@@ -0,0 +1,163 @@
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from game import codec
+from game.state import GameState, GameStateConflict, _list_ops
+
+
+def _decoded(values):
+    return [codec.decode(v) for v in values]
+
+
+class ListOpsTests(SimpleTestCase):
+    """저장된 목록 → 새 목록의 최소 변경 (앞에서 drop + 뒤에 append)"""
+
+    def test_same_list_has_no_ops(self):
+        self.assertIsNone(_list_ops([1, 2], [1, 2]))
+
+    def test_append(self):
+        ops = _list_ops([1, 2], [1, 2, 3, 4])
+        self.assertEqual(ops["drop"], 0)
+        self.assertEqual(_decoded(ops["append"]), [3, 4])
+
+    def test_drop_from_front(self):
+        ops = _list_ops([1, 2, 3], [2, 3])
+        self.assertEqual(ops["drop"], 1)
+        self.assertEqual(ops["append"], [])
+
+    def test_drop_and_append(self):
+        ops = _list_ops([1, 2, 3], [3, 4])
+        self.assertEqual(ops["drop"], 2)
+        self.assertEqual(_decoded(ops["append"]), [4])
+
+    def test_full_replace(self):
+        ops = _list_ops([1, 2], [5, 6, 7])
+        self.assertEqual(ops["drop"], 2)
+        self.assertEqual(_decoded(ops["append"]), [5, 6, 7])
+
+    def test_clear(self):
+        self.assertEqual(_list_ops([1, 2], []), {"drop": 2, "append": []})
+
+
+class DiffTests(SimpleTestCase):
+    """GameState._diff 가 만드는 _CAS_SCRIPT ops"""
+
+    system = {"role": "system", "content": "규칙"}
+
+    def test_only_changed_fields_are_set(self):
+        ops = GameState._diff({"a": 1, "b": {"x": 1}}, {"a": 1, "b": {"x": 2}, "c": "새 값"})
+        self.assertEqual(set(ops["set"]) - {"_updated_at"}, {"b", "c"})
+        self.assertEqual(codec.decode(ops["set"]["b"]), {"x": 2})
+        self.assertEqual(ops["del"], [])
+        self.assertIn("_updated_at", ops["set"])
+
+    def test_removed_field_is_deleted(self):
+        ops = GameState._diff({"a": 1, "b": 2}, {"a": 1})
+        self.assertEqual(ops["del"], ["b"])
+
+    def test_history_append_keeps_head(self):
+        old = {"conversation_history": [self.system, {"role": "user", "content": "1"}]}
+        new = {"conversation_history": old["conversation_history"] + [{"role": "assistant", "content": "2"}]}
+        ops = GameState._diff(old, new)
+        self.assertNotIn("_history_head", ops["set"])
+        self.assertEqual(ops["history"]["drop"], 0)
+        self.assertEqual(_decoded(ops["history"]["append"]), [{"role": "assistant", "content": "2"}])
+        self.assertNotIn("overflow", ops)
+
+    def test_history_head_change_is_set(self):
+        old = {"conversation_history": [self.system, {"role": "user", "content": "1"}]}
+        new = {"conversation_history": [{"role": "system", "content": "새 규칙"}, {"role": "user", "content": "1"}]}
+        ops = GameState._diff(old, new)
+        self.assertEqual(codec.decode(ops["set"]["_history_head"]), [{"role": "system", "content": "새 규칙"}])
+        self.assertNotIn("history", ops)
+
+    def test_history_trim_and_overflow(self):
+        turns = [{"role": "user", "content": str(i)} for i in range(4)]
+        old = {"conversation_history": [self.system] + turns, "history_overflow": []}
+        new = {"conversation_history": [self.system] + turns[2:], "history_overflow": turns[:2]}
+        ops = GameState._diff(old, new)
+        self.assertEqual(ops["history"], {"drop": 2, "append": []})
+        self.assertEqual(ops["overflow"]["drop"], 0)
+        self.assertEqual(_decoded(ops["overflow"]["append"]), turns[:2])
+
+    def test_list_fields_are_not_hash_fields(self):
+        ops = GameState._diff({}, {"conversation_history": [self.system], "history_overflow": [1]})
+        self.assertNotIn("conversation_history", ops["set"])
+        self.assertNotIn("history_overflow", ops["set"])
+        self.assertIn("_history_head", ops["set"])
+
+
+@override_settings(GAME_STATE_CAS_RETRIES=2, GAME_ROOM_TTL_SECONDS=60)
+class UpdateTests(SimpleTestCase):
+    """GameState.update 의 버전 compare-and-set / 충돌 재시도 (Redis 없이 읽기와 eval 만 흉내)"""
+
+    def setUp(self):
+        self.conn = mock.Mock()
+        self.conn.eval = mock.AsyncMock()
+        patcher = mock.patch.object(GameState, "_get_conn", mock.AsyncMock(return_value=self.conn))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(mock.patch.stopall)
+
+    def _reads(self, *snapshots):
+        mock.patch.object(GameState, "get_game_state_versioned", mock.AsyncMock(side_effect=snapshots)).start()
+
+    def _eval_ops(self, call):
+        args = call.args
+        nkeys = args[1]
+        return args[2 + nkeys], json.loads(args[3 + nkeys])
+
+    async def test_writes_diff_against_read_version(self):
+        self._reads(({"turn": 1}, 7))
+        self.conn.eval.return_value = 8
+
+        result = await GameState.update("room", lambda s: {**s, "turn": s["turn"] + 1})
+
+        self.assertEqual(result, {"turn": 2})
+        version, ops = self._eval_ops(self.conn.eval.call_args)
+        self.assertEqual(version, 7)
+        self.assertEqual(codec.decode(ops["set"]["turn"]), 2)
+
+    async def test_conflict_retries_on_latest_state(self):
+        self._reads(({"logs": [1]}, 3), ({"logs": [1, 2]}, 4))
+        self.conn.eval.side_effect = [-1, 5]
+        seen = []
+
+        def fn(state):
+            seen.append(list(state["logs"]))
+            state["logs"].append("mine")
+            return state
+
+        result = await GameState.update("room", fn)
+
+        self.assertEqual(seen, [[1], [1, 2]])
+        self.assertEqual(result, {"logs": [1, 2, "mine"]})
+        self.assertEqual([self._eval_ops(c)[0] for c in self.conn.eval.call_args_list], [3, 4])
+
+    async def test_gives_up_after_retries(self):
+        self._reads(*[({"a": i}, i) for i in range(3)])
+        self.conn.eval.return_value = -1
+
+        with self.assertRaises(GameStateConflict):
+            await GameState.update("room", lambda s: {**s, "b": 1})
+        self.assertEqual(self.conn.eval.call_count, 3)
+
+    async def test_none_aborts_without_writing(self):
+        self._reads(({"a": 1}, 1))
+
+        self.assertIsNone(await GameState.update("room", lambda s: None))
+        self.conn.eval.assert_not_called()
+
+    async def test_async_fn_gets_a_copy(self):
+        original = {"nested": {"x": 1}}
+        self._reads((original, 1))
+        self.conn.eval.return_value = 2
+
+        async def fn(state):
+            state["nested"]["x"] = 2
+            return state
+
+        await GameState.update("room", fn)
+        self.assertEqual(original, {"nested": {"x": 1}})
@@ -26,6 +26,22 @@ from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 
 from game import scenarios_turn
+from game import jobs
+from game.state import GameState
+
+def _cancel_room_jobs(room_id):
+    """게임 종료 시 방의 대기/실행 중인 LLM 작업을 취소 (실패해도 종료 응답은 그대로)"""
+    try:
+        async_to_sync(jobs.cancel_room)(room_id)
+    except Exception as e:
+        print(f"⚠️ 방 작업 취소 실패 (Room: {room_id}): {e}")
+
+def _purge_room_state(room_id):
+    """게임 종료 시 방의 Redis 게임 상태(game:{room}:*)를 삭제 (실패해도 종료 응답은 그대로, 남은 키는 TTL/스위퍼가 정리)"""
+    try:
+        async_to_sync(GameState.purge)(room_id)
+    except Exception as e:
+        print(f"⚠️ 방 상태 삭제 실패 (Room: {room_id}): {e}")
 
 def get_scene_templates(request):
     """
@@ -280,6 +296,8 @@ class RoomViewSet(viewsets.ModelViewSet):
             return Response({"error": "방장만 게임을 종료할 수 있습니다."}, status=403)
         room.status = "waiting"
         room.save()
+        _cancel_room_jobs(room.id)
+        _purge_room_state(room.id)
         return Response({"status": "게임 종료"}, status=200)
     
 class EndMultiGameView(APIView):
@@ -294,6 +312,8 @@ class EndMultiGameView(APIView):
 
         room.status = "waiting"
         room.save()
+        _cancel_room_jobs(room.id)
+        _purge_room_state(room.id)
         return Response({"status": "게임 종료"}, status=status.HTTP_200_OK)
     
 class ScenarioListView(generics.ListAPIView):
@@ -40,7 +40,8 @@ def generate_images_for_story(file_path):
             
             payload = {
                 "story_id": story_id,
-                "scene_name": moment_id
+                "scene_name": moment_id,
+                "priority": "bulk"  # 실시간 게임 요청보다 뒤로
             }
             
             try:
@@ -3,7 +3,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 
-from openai import AzureOpenAI
+from llm import gateway
 from dotenv import load_dotenv
 import json
 import os
@@ -32,6 +32,11 @@ class GenerateSceneImageView(APIView):
             if not story_identifier or not scene_name:
                 return Response({"error": "'story_id'와 'scene_name'이 필요합니다."}, status=status.HTTP_400_BAD_REQUEST)
 
+            # 일괄 생성 스크립트는 'bulk' 로 보내 실시간 게임 요청보다 뒤로 밀리게 함
+            priority = request.data.get("priority", gateway.BACKGROUND)
+            if priority not in (gateway.BACKGROUND, gateway.BULK):
+                return Response({"error": "'priority'는 'background' 또는 'bulk'만 가능합니다."}, status=status.HTTP_400_BAD_REQUEST)
+
             container_name = story_identifier.lower()
 
             connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
@@ -70,13 +75,6 @@ class GenerateSceneImageView(APIView):
 
             print(">> GPT-4를 호출하여 DALL-E 프롬프트를 생성합니다...")
             
-            gpt_api_key = os.getenv("AZURE_OPENAI_API_KEY")
-            gpt_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-            gpt_deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT")
-            gpt_api_version = os.getenv("AZURE_OPENAI_VERSION")
-
-            gpt_client = AzureOpenAI(api_key=gpt_api_key, azure_endpoint=gpt_endpoint, api_version=gpt_api_version)
-
             description = story_data['moments'][scene_name]['description']
             characters_info = "Haesik (a girl in traditional yellow and red Hanbok), Dalsik (her younger brother in white and gray Hanbok), and a large, slightly foolish Tiger. Or a woodcutter and a ghost from a well."
             style_description = "Simple and clean 8-bit pixel art, minimalist, retro video game asset, clear outlines, Korean fairy tale theme. No Japanese or Chinese elements."
@@ -91,24 +89,18 @@ class GenerateSceneImageView(APIView):
             Combine all of this information into a single descriptive paragraph. Focus on visual details like character actions, expressions, and background elements. Do not use markdown or lists.
             """
 
-            gpt_response = gpt_client.chat.completions.create(
-                model=gpt_deployment,
+            gpt_response = gateway.chat_completion(
                 messages=[{"role": "user", "content": gpt_prompt}],
                 temperature=0.7,
-                max_tokens=250
+                max_tokens=250,
+                priority=priority,
+                call_site="image_gen.prompt"
             )
             dalle_prompt = gpt_response.choices[0].message.content.strip()
             print(f">> 생성된 DALL-E 프롬프트: {dalle_prompt}")
 
-            dalle_api_key = os.getenv("AZURE_OPENAI_DALLE_APIKEY")
-            dalle_endpoint = os.getenv("AZURE_OPENAI_DALLE_ENDPOINT")
-            dalle_deployment = os.getenv("AZURE_OPENAI_DALLE_DEPLOYMENT")
-            dalle_api_version = os.getenv("AZURE_OPENAI_DALLE_VERSION")
-
-            dalle_client = AzureOpenAI(api_key=dalle_api_key, azure_endpoint=dalle_endpoint, api_version=dalle_api_version)
-            
             start_time = time.perf_counter()
-            dalle_response = dalle_client.images.generate(model=dalle_deployment, prompt=dalle_prompt, n=1, size="1024x1024", style="vivid", quality="standard")
+            dalle_response = gateway.image_generation(prompt=dalle_prompt, profile=gateway.dalle_profile(), priority=priority, call_site="image_gen.image", n=1, size="1024x1024", style="vivid", quality="standard")
             end_time = time.perf_counter()
             duration = end_time - start_time
             
@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+"""
+llm/fake_openai.py
+
+오프라인 벤치마크/부하 테스트용 가짜 Azure OpenAI 서버.
+chat/completions(스트리밍 포함)와 images/generations 응답 형태를 그대로 흉내 낸다.
+
+모드
+- record : 요청을 실제 Azure(upstream)로 그대로 전달하고, 응답을 fixtures 디렉터리에 저장
+- replay : fixtures 에서 같은 요청(메시지/프롬프트 해시)을 찾아 응답. 없으면 on_miss 에 따라
+           합성 응답(synthetic) 또는 404(error)
+- synthetic : fixtures 없이 항상 합성 응답
+
+지연 프로필(PROFILES)로 첫 토큰까지의 시간(ttft), 초당 토큰 수, 지터, 429 비율을 흉내 낸다.
+"recorded" 프로필은 녹화 당시 걸린 시간을 그대로 재현한다.
+seed 를 고정하면 같은 요청에는 항상 같은 지연/오류가 나온다.
+
+앱을 가짜 서버로 돌리기:
+    python manage.py fake_openai --mode replay --fixtures llm_fixtures --profile azure
+    AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8765 AZURE_OPENAI_DALLE_ENDPOINT=http://127.0.0.1:8765 ...
+
+코드(벤치마크)에서:
+    with fake_openai.running(mode="synthetic", profile="instant") as base_url:
+        ...
+"""
+from __future__ import annotations
+
+import base64
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from llm.tokens import estimate_message_tokens, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+SYNTHETIC_TEXT = "(가짜 응답) 이 응답은 fake_openai 서버가 만든 합성 텍스트입니다."
+# 1x1 투명 PNG (이미지 fixture 가 없을 때 사용)
+_BLANK_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+_PATH_RE = re.compile(r"^/openai/deployments/(?P<deployment>[^/]+)/(?P<kind>chat/completions|images/generations)$")
+
+
+class LatencyProfile(NamedTuple):
+    ttft: float            # 첫 토큰까지의 시간(초)
+    tokens_per_sec: float  # 0 이면 제한 없음
+    jitter: float          # ttft 에 곱해지는 ±비율
+    error_rate: float      # 429 를 돌려줄 확률
+    retry_after: float = 1.0
+
+
+PROFILES: Dict[str, LatencyProfile] = {
+    "instant": LatencyProfile(ttft=0.0, tokens_per_sec=0, jitter=0.0, error_rate=0.0),
+    "azure": LatencyProfile(ttft=0.8, tokens_per_sec=60, jitter=0.3, error_rate=0.0),
+    "slow": LatencyProfile(ttft=2.5, tokens_per_sec=15, jitter=0.5, error_rate=0.0),
+    "flaky": LatencyProfile(ttft=0.8, tokens_per_sec=60, jitter=0.3, error_rate=0.1),
+    # fixture 에 녹화된 지연(latency_ms)을 그대로 재현 (없으면 azure 와 동일)
+    "recorded": LatencyProfile(ttft=0.8, tokens_per_sec=60, jitter=0.0, error_rate=0.0),
+}
+
+
+def request_key(kind: str, body: Dict[str, Any]) -> str:
+    """요청을 fixture 파일 이름으로 바꾸는 해시. 샘플링 파라미터는 무시하고 내용만 본다."""
+    if kind == "images/generations":
+        material = {"kind": kind, "prompt": body.get("prompt"), "size": body.get("size")}
+    else:
+        material = {"kind": kind, "messages": body.get("messages")}
+    raw = json.dumps(material, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _split_tokens(text: str) -> List[str]:
+    """스트리밍 청크 단위. 실제 토큰과 비슷하게 공백+최대 4글자씩 자름."""
+    return re.findall(r"\s*\S{1,4}|\s+$", text) or [text]
+
+
+class FixtureStore:
+    """fixtures 디렉터리: {key}.json (+ 이미지면 {key}.png)."""
+
+    def __init__(self, root: Optional[str]):
+        self.root = root
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.root, f"{key}.{ext}")
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.root or not os.path.exists(self._path(key, "json")):
+            return None
+        with open(self._path(key, "json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def load_image(self, key: str) -> Optional[bytes]:
+        if not self.root or not os.path.exists(self._path(key, "png")):
+            return None
+        with open(self._path(key, "png"), "rb") as f:
+            return f.read()
+
+    def save(self, key: str, fixture: Dict[str, Any], image: Optional[bytes] = None) -> None:
+        if not self.root:
+            return
+        tmp = self._path(key, "json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(fixture, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self._path(key, "json"))
+        if image is not None:
+            with open(self._path(key, "png"), "wb") as f:
+                f.write(image)
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=(DEFAULT_HOST, DEFAULT_PORT),
+        *,
+        mode: str = "replay",
+        fixtures: Optional[str] = None,
+        profile: str = "instant",
+        upstream: Optional[str] = None,
+        image_upstream: Optional[str] = None,
+        on_miss: str = "synthetic",
+        synthetic_text: str = SYNTHETIC_TEXT,
+        seed: int = 0,
+    ):
+        if mode not in ("record", "replay", "synthetic"):
+            raise ValueError(f"unknown mode: {mode}")
+        if profile not in PROFILES:
+            raise ValueError(f"unknown profile: {profile} (choices: {', '.join(PROFILES)})")
+        if mode == "record" and not upstream:
+            raise ValueError("record mode needs an upstream endpoint")
+        super().__init__(address, _Handler)
+        self.mode = mode
+        self.store = FixtureStore(fixtures)
+        self.profile_name = profile
+        self.profile = PROFILES[profile]
+        self.upstream = (upstream or "").rstrip("/")
+        self.image_upstream = (image_upstream or upstream or "").rstrip("/")
+        self.on_miss = on_miss
+        self.synthetic_text = synthetic_text
+        self.seed = seed
+        self.stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "replayed": 0, "recorded": 0, "synthetic": 0, "missed": 0, "throttled": 0}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name: str) -> None:
+        with self.stats_lock:
+            self.stats[name] += 1
+
+    def rng(self, key: str) -> random.Random:
+        """같은 요청 + 같은 seed → 같은 지연/오류 (동시 요청 순서와 무관)."""
+        return random.Random(f"{self.seed}:{key}")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeOpenAIServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        logger.debug("fake_openai: " + fmt, *args)
+
+    # ----------------------------- 응답 헬퍼 -----------------------------
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send_json(status, {"error": {"code": str(status), "message": message}}, headers)
+
+    # ----------------------------- 라우팅 -----------------------------
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/healthz":
+            with self.server.stats_lock:
+                stats = dict(self.server.stats)
+            return self._send_json(200, {"mode": self.server.mode, "profile": self.server.profile_name, **stats})
+        m = re.match(r"^/fake/images/(?P<key>[0-9a-f]+)\.png$", path)
+        if m:
+            image = self.server.store.load_image(m.group("key")) or _BLANK_PNG
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(image)))
+            self.end_headers()
+            self.wfile.write(image)
+            return
+        self._send_error(404, f"unknown path: {path}")
+
+    def do_POST(self):
+        m = _PATH_RE.match(urlsplit(self.path).path)
+        if not m:
+            return self._send_error(404, f"unknown path: {self.path}")
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send_error(400, "invalid JSON body")
+
+        server = self.server
+        server.count("requests")
+        kind = m.group("kind")
+        deployment = m.group("deployment")
+        key = request_key(kind, body)
+        rng = server.rng(key)
+
+        if server.profile.error_rate and rng.random() < server.profile.error_rate:
+            server.count("throttled")
+            retry_after = server.profile.retry_after
+            return self._send_error(429, "Rate limit is exceeded (fake)", {"Retry-After": str(retry_after)})
+
+        fixture = None
+        if server.mode == "record":
+            try:
+                fixture = self._record(kind, key, body)
+            except requests.RequestException as e:
+                logger.warning("fake_openai: upstream request failed: %s", e)
+                return self._send_error(502, f"upstream request failed: {e}")
+            if fixture is None:
+                return  # upstream 오류 응답을 그대로 전달함
+            server.count("recorded")
+        elif server.mode == "replay":
+            fixture = server.store.load(key)
+            if fixture is not None:
+                server.count("replayed")
+            elif server.on_miss == "error":
+                server.count("missed")
+                return self._send_error(404, f"no fixture for request {key}")
+
+        if fixture is None:
+            server.count("synthetic")
+            fixture = self._synthetic(kind, key, body)
+
+        if kind == "images/generations":
+            return self._reply_image(key, fixture, rng)
+        if body.get("stream"):
+            return self._reply_chat_stream(deployment, body, fixture, rng)
+        return self._reply_chat(deployment, body, fixture, rng)
+
+    # ----------------------------- record -----------------------------
+    def _record(self, kind: str, key: str, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """upstream 으로 전달하고 fixture 를 저장. 스트리밍 요청도 녹화는 완성 응답으로 받는다."""
+        server = self.server
+        base = server.image_upstream if kind == "images/generations" else server.upstream
+        headers = {"Content-Type": "application/json"}
+        for name in ("api-key", "Authorization"):
+            if self.headers.get(name):
+                headers[name] = self.headers[name]
+        upstream_body = dict(body)
+        upstream_body.pop("stream", None)
+        upstream_body.pop("stream_options", None)
+
+        started = time.monotonic()
+        resp = requests.post(base + self.path, headers=headers, json=upstream_body, timeout=300)
+        latency_ms = (time.monotonic() - started) * 1000
+        if resp.status_code != 200:
+            self._send_json(resp.status_code, resp.json() if resp.content else {}, {
+                k: v for k, v in resp.headers.items() if k.lower() == "retry-after"
+            })
+            return None
+
+        payload = resp.json()
+        image = None
+        if kind == "images/generations":
+            url = ((payload.get("data") or [{}])[0]).get("url")
+            if url:
+                image = requests.get(url, timeout=120).content
+            fixture = {"kind": kind, "revised_prompt": ((payload.get("data") or [{}])[0]).get("revised_prompt")}
+        else:
+            message = ((payload.get("choices") or [{}])[0]).get("message") or {}
+            fixture = {"kind": kind, "content": message.get("content") or "", "usage": payload.get("usage")}
+        fixture.update({"key": key, "request": body, "latency_ms": round(latency_ms, 1), "recorded_at": time.time()})
+        server.store.save(key, fixture, image)
+        return fixture
+
+    def _synthetic(self, kind: str, key: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        if kind == "images/generations":
+            return {"kind": kind, "key": key, "revised_prompt": body.get("prompt")}
+        return {"kind": kind, "key": key, "content": self.server.synthetic_text}
+
+    # ----------------------------- 지연 재현 -----------------------------
+    def _ttft(self, fixture: Dict[str, Any], rng: random.Random, n_tokens: int) -> float:
+        profile = self.server.profile
+        if self.server.profile_name == "recorded" and fixture.get("latency_ms"):
+            total = fixture["latency_ms"] / 1000
+            stream_time = n_tokens / profile.tokens_per_sec if profile.tokens_per_sec else 0.0
+            return max(0.0, total - stream_time)
+        return max(0.0, profile.ttft * (1 + rng.uniform(-profile.jitter, profile.jitter)))
+
+    def _token_delay(self) -> float:
+        tps = self.server.profile.tokens_per_sec
+        return 1.0 / tps if tps else 0.0
+
+    # ----------------------------- chat -----------------------------
+    def _completion_envelope(self, deployment: str, obj: str) -> Dict[str, Any]:
+        return {
+            "id": f"chatcmpl-fake-{uuid.uuid4().hex[:12]}",
+            "object": obj,
+            "created": int(time.time()),
+            "model": deployment,
+        }
+
+    def _usage(self, body: Dict[str, Any], content: str) -> Dict[str, int]:
+        prompt_tokens = estimate_message_tokens(body.get("messages") or [])
+        completion_tokens = estimate_tokens(content)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def _reply_chat(self, deployment: str, body: Dict[str, Any], fixture: Dict[str, Any], rng: random.Random) -> None:
+        content = fixture.get("content") or ""
+        tokens = _split_tokens(content)
+        time.sleep(self._ttft(fixture, rng, len(tokens)) + self._token_delay() * len(tokens))
+        payload = self._completion_envelope(deployment, "chat.completion")
+        payload["choices"] = [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }]
+        payload["usage"] = fixture.get("usage") or self._usage(body, content)
+        self._send_json(200, payload)
+
+    def _reply_chat_stream(self, deployment: str, body: Dict[str, Any], fixture: Dict[str, Any], rng: random.Random) -> None:
+        content = fixture.get("content") or ""
+        tokens = _split_tokens(content)
+        envelope = self._completion_envelope(deployment, "chat.completion.chunk")
+
+        def event(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> bytes:
+            chunk = dict(envelope, choices=[{"index": 0, "delta": delta, "finish_reason": finish_reason}])
+            return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            time.sleep(self._ttft(fixture, rng, len(tokens)))
+            self.wfile.write(event({"role": "assistant", "content": ""}))
+            delay = self._token_delay()
+            for token in tokens:
+                if delay:
+                    time.sleep(delay)
+                self.wfile.write(event({"content": token}))
+                self.wfile.flush()
+            self.wfile.write(event({}, "stop"))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug("fake_openai: client closed the stream early")
+
+    # ----------------------------- images -----------------------------
+    def _reply_image(self, key: str, fixture: Dict[str, Any], rng: random.Random) -> None:
+        time.sleep(self._ttft(fixture, rng, 0))
+        self._send_json(200, {
+            "created": int(time.time()),
+            "data": [{
+                "url": f"{self.server.base_url}/fake/images/{key}.png",
+                "revised_prompt": fixture.get("revised_prompt"),
+            }],
+        })
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, **options: Any) -> None:
+    server = FakeOpenAIServer((host, port), **options)
+    logger.info("fake_openai: %s mode on %s (profile=%s)", server.mode, server.base_url, server.profile_name)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+@contextlib.contextmanager
+def running(host: str = DEFAULT_HOST, port: int = 0, **options: Any) -> Iterator[str]:
+    """백그라운드 스레드로 서버를 띄우고 base URL 을 돌려줌 (port=0 이면 빈 포트)."""
+    server = FakeOpenAIServer((host, port), **options)
+    thread = threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True)
+    thread.start()
+    try:
+        yield server.base_url
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=5)
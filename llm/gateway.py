@@ -0,0 +1,1070 @@
+# -*- coding: utf-8 -*-
+"""
+llm/gateway.py
+
+프로젝트 전체가 공유하는 Azure OpenAI 게이트웨이.
+- 프로세스당 자격증명(endpoint/key/version)별로 장수명 클라이언트 1개(동기) + 이벤트 루프별 1개(비동기)
+  → HTTP 커넥션 풀을 공유해 소켓 고갈 방지
+- 배포(deployment)별 동시 요청 수 제한 (동기 스레드/비동기 태스크 공용 대기열)
+- 우선순위 클래스(interactive/background/bulk)별 가중치 스케줄링, 클래스별 상한, 대기 중인 bulk 선점
+- 429/5xx/연결 오류에 지터 백오프 재시도 (Retry-After 헤더 존중)
+- 여러 배포(리전) 중 상태 점수(지연·오류율·부하)가 가장 좋은 곳으로 라우팅, 연속 실패 시 서킷 브레이커로 잠시 제외
+- 헤지 요청: 첫 토큰이 평소 p90 보다 늦으면 다른 배포에도 보내 먼저 온 쪽을 쓰고 나머지는 취소
+- 배포별 대기열 길이/처리 중/지연 시간 카운터 (metrics())
+- 호출마다 호출 위치(call_site)/방/사용자/토큰 수/지연을 사용량 장부(llm.ledger)에 기록
+
+사용 예:
+    from llm import gateway
+
+    resp = gateway.chat_completion(messages=[...], temperature=0.7)
+    resp = await gateway.achat_completion(messages=[...], max_tokens=4000)
+    async for chunk in gateway.astream_chat_completion(messages=[...]):
+        ...
+    img = gateway.image_generation(prompt="...", profile=gateway.dalle_profile())
+    resp = gateway.chat_completion(messages=[...], priority=gateway.BULK)
+    resp = await gateway.achat_completion(messages=[...], hedge=True)
+
+환경변수/설정 (settings.py):
+AZURE_OPENAI_API_KEY / AZURE_OPENAI_ENDPOINT / AZURE_OPENAI_VERSION / AZURE_OPENAI_DEPLOYMENT
+AZURE_OPENAI_DALLE_APIKEY / AZURE_OPENAI_DALLE_ENDPOINT / AZURE_OPENAI_DALLE_VERSION / AZURE_OPENAI_DALLE_DEPLOYMENT
+LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES, LLM_HTTP_POOL_SIZE
+LLM_BACKGROUND_MAX_CONCURRENCY, LLM_BULK_MAX_CONCURRENCY (클래스별 상한, 기본은 전체의 1/2, 1/4)
+AZURE_OPENAI_DEPLOYMENTS (채팅 라우팅 대상 JSON 배열), LLM_CIRCUIT_FAILURES, LLM_CIRCUIT_COOLOFF_SECONDS,
+LLM_HEDGE_PERCENTILE, LLM_HEDGE_DELAY_MS
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import json
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from typing import Any, AsyncIterator, Dict, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import openai
+from django.conf import settings
+from openai import AsyncAzureOpenAI, AzureOpenAI
+from openai.types.chat import ChatCompletion
+
+from llm import ledger, tokens
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_CAP_SECONDS = 20.0
+
+
+class AzureProfile(NamedTuple):
+    """Azure OpenAI 자격증명 묶음. 같은 프로필은 같은 커넥션 풀을 공유한다."""
+    endpoint: Optional[str]
+    api_key: Optional[str]
+    api_version: Optional[str]
+    deployment: Optional[str]
+
+
+def default_profile() -> AzureProfile:
+    """채팅용 기본 프로필 (settings.AZURE_OPENAI_*)."""
+    return AzureProfile(
+        endpoint=getattr(settings, "AZURE_OPENAI_ENDPOINT", None),
+        api_key=getattr(settings, "AZURE_OPENAI_API_KEY", None),
+        api_version=getattr(settings, "AZURE_OPENAI_VERSION", None) or "2025-01-01-preview",
+        deployment=getattr(settings, "AZURE_OPENAI_DEPLOYMENT", None),
+    )
+
+
+def dalle_profile() -> AzureProfile:
+    """이미지 생성(DALL-E)용 프로필 (AZURE_OPENAI_DALLE_*)."""
+    return AzureProfile(
+        endpoint=os.getenv("AZURE_OPENAI_DALLE_ENDPOINT"),
+        api_key=os.getenv("AZURE_OPENAI_DALLE_APIKEY"),
+        api_version=os.getenv("AZURE_OPENAI_DALLE_VERSION"),
+        deployment=os.getenv("AZURE_OPENAI_DALLE_DEPLOYMENT"),
+    )
+
+
+def _check_profile(profile: AzureProfile) -> None:
+    missing = [name for name, v in (
+        ("endpoint", profile.endpoint),
+        ("api_key", profile.api_key),
+        ("api_version", profile.api_version),
+        ("deployment", profile.deployment),
+    ) if not v]
+    if missing:
+        raise RuntimeError(f"Azure OpenAI 설정 누락: {', '.join(missing)}")
+
+
+def _pool_limits() -> httpx.Limits:
+    size = getattr(settings, "LLM_HTTP_POOL_SIZE", 32)
+    return httpx.Limits(max_connections=size, max_keepalive_connections=size)
+
+
+# ----------------------------- 클라이언트 풀 -----------------------------
+_clients_lock = threading.Lock()
+_sync_clients: Dict[tuple, AzureOpenAI] = {}
+# AsyncAzureOpenAI 의 httpx 풀은 이벤트 루프에 묶이므로 루프별로 보관
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, AsyncAzureOpenAI]]" = weakref.WeakKeyDictionary()
+
+
+def _client_key(profile: AzureProfile) -> tuple:
+    return (profile.endpoint, profile.api_key, profile.api_version)
+
+
+def get_client(profile: Optional[AzureProfile] = None) -> AzureOpenAI:
+    """프로필별로 공유되는 동기 클라이언트."""
+    profile = profile or default_profile()
+    key = _client_key(profile)
+    with _clients_lock:
+        client = _sync_clients.get(key)
+        if client is None:
+            client = AzureOpenAI(
+                api_key=profile.api_key,
+                azure_endpoint=profile.endpoint,
+                api_version=profile.api_version,
+                max_retries=0,  # 재시도는 게이트웨이가 담당
+                http_client=openai.DefaultHttpxClient(limits=_pool_limits()),
+            )
+            _sync_clients[key] = client
+        return client
+
+
+def get_async_client(profile: Optional[AzureProfile] = None) -> AsyncAzureOpenAI:
+    """현재 이벤트 루프에서 프로필별로 공유되는 비동기 클라이언트."""
+    profile = profile or default_profile()
+    key = _client_key(profile)
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        per_loop = _async_clients.setdefault(loop, {})
+        client = per_loop.get(key)
+        if client is None:
+            client = AsyncAzureOpenAI(
+                api_key=profile.api_key,
+                azure_endpoint=profile.endpoint,
+                api_version=profile.api_version,
+                max_retries=0,
+                http_client=openai.DefaultAsyncHttpxClient(limits=_pool_limits()),
+            )
+            per_loop[key] = client
+        return client
+
+
+# ----------------------------- 동시성 제한 -----------------------------
+class _Waiter:
+    """대기열 항목. 슬롯이 넘어오면 wake() 로 깨운다 (스레드/태스크 공용)."""
+    __slots__ = ("granted", "_event", "_future", "_loop")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.granted = False
+        self._loop = loop
+        self._event = None if loop else threading.Event()
+        self._future = loop.create_future() if loop else None
+
+    def wake(self) -> None:
+        self.granted = True
+        if self._loop is None:
+            self._event.set()
+        else:
+            self._loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self._future.done():
+            self._future.set_result(None)
+
+
+# 우선순위 클래스: 실시간 게임 진행 > 사용자 대기 작업/백그라운드 요약 > 일괄(batch) 작업
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+BULK = "bulk"
+PRIORITY_CLASSES = (INTERACTIVE, BACKGROUND, BULK)
+# 슬롯이 비었을 때 클래스 간 배분 비율 (stride 스케줄링 가중치)
+_CLASS_WEIGHTS = {INTERACTIVE: 8, BACKGROUND: 3, BULK: 1}
+
+
+def _class_caps(limit: int) -> Dict[str, int]:
+    """클래스별 동시 실행 상한. interactive 는 전체 한도를 다 쓸 수 있고, 나머지는 일부만."""
+    return {
+        INTERACTIVE: limit,
+        BACKGROUND: min(limit, getattr(settings, "LLM_BACKGROUND_MAX_CONCURRENCY", None) or max(1, limit // 2)),
+        BULK: min(limit, getattr(settings, "LLM_BULK_MAX_CONCURRENCY", None) or max(1, limit // 4)),
+    }
+
+
+def _check_priority(priority: str) -> str:
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"unknown LLM priority class: {priority}")
+    return priority
+
+
+class _Limiter:
+    """
+    배포 하나의 동시 요청 수 제한 + 우선순위 스케줄러.
+    - 클래스별 FIFO 대기열, 클래스별 동시 실행 상한(caps)
+    - 슬롯이 비면 가중치(_CLASS_WEIGHTS)에 따른 stride 스케줄링으로 다음 클래스를 고름
+    - interactive 대기자가 있으면 대기 중인 bulk 는 뒤로 밀림(선점)
+    """
+
+    def __init__(self, limit: int, caps: Optional[Dict[str, int]] = None):
+        self.limit = max(1, int(limit))
+        self.caps = caps or _class_caps(self.limit)
+        self.active = 0
+        self.active_by_class = {cls: 0 for cls in PRIORITY_CLASSES}
+        self._waiters: Dict[str, "collections.deque[_Waiter]"] = {cls: collections.deque() for cls in PRIORITY_CLASSES}
+        self._pass = {cls: 0.0 for cls in PRIORITY_CLASSES}
+        self._vtime = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self._waiters.values())
+
+    def queued_by_class(self) -> Dict[str, int]:
+        return {cls: len(q) for cls, q in self._waiters.items()}
+
+    def _pick(self) -> Optional[str]:
+        candidates = [
+            cls for cls in PRIORITY_CLASSES
+            if self._waiters[cls] and self.active_by_class[cls] < self.caps[cls]
+        ]
+        if self._waiters[INTERACTIVE] and BULK in candidates:
+            candidates.remove(BULK)
+        if not candidates:
+            return None
+        return min(candidates, key=lambda cls: (self._pass[cls], PRIORITY_CLASSES.index(cls)))
+
+    def _dispatch(self) -> None:
+        """(락 보유 상태에서) 빈 슬롯을 대기자에게 나눠줌."""
+        while self.active < self.limit:
+            cls = self._pick()
+            if cls is None:
+                return
+            waiter = self._waiters[cls].popleft()
+            self.active += 1
+            self.active_by_class[cls] += 1
+            self._vtime = self._pass[cls]
+            self._pass[cls] += 1.0 / _CLASS_WEIGHTS[cls]
+            waiter.wake()
+
+    def _enqueue(self, waiter: _Waiter, priority: str) -> None:
+        if not self._waiters[priority]:
+            # 한동안 비어 있던 클래스가 밀린 몫을 한꺼번에 가져가지 않도록 현재 시점으로 맞춤
+            self._pass[priority] = max(self._pass[priority], self._vtime)
+        self._waiters[priority].append(waiter)
+        self._dispatch()
+
+    def acquire(self, priority: str = INTERACTIVE) -> None:
+        waiter = _Waiter()
+        with self._lock:
+            self._enqueue(waiter, priority)
+        waiter._event.wait()
+
+    async def acquire_async(self, priority: str = INTERACTIVE) -> None:
+        waiter = _Waiter(asyncio.get_running_loop())
+        with self._lock:
+            self._enqueue(waiter, priority)
+            if waiter.granted:
+                return
+        try:
+            await waiter._future
+        except asyncio.CancelledError:
+            with self._lock:
+                if not waiter.granted:
+                    self._waiters[priority].remove(waiter)
+                    raise
+            self.release(priority)  # 슬롯을 받은 직후 취소된 경우 되돌려줌
+            raise
+
+    def release(self, priority: str = INTERACTIVE) -> None:
+        with self._lock:
+            self.active -= 1
+            self.active_by_class[priority] -= 1
+            self._dispatch()
+
+
+_limiters: Dict[str, _Limiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _limiter(deployment: str) -> _Limiter:
+    with _limiters_lock:
+        lim = _limiters.get(deployment)
+        if lim is None:
+            lim = _Limiter(getattr(settings, "LLM_MAX_CONCURRENCY", 8))
+            _limiters[deployment] = lim
+        return lim
+
+
+# ----------------------------- 메트릭 -----------------------------
+# 클래스별 지연 히스토그램 버킷 상한(ms). 마지막 버킷은 그 이상 전부
+HISTOGRAM_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+_metrics_lock = threading.Lock()
+_metrics: Dict[str, Dict[str, float]] = collections.defaultdict(lambda: {
+    "requests": 0, "errors": 0, "retries": 0,
+    "latency_total_ms": 0.0, "latency_max_ms": 0.0,
+})
+# (deployment, class) -> {"requests", "wait_ms": [...], "latency_ms": [...]}
+_class_metrics: Dict[tuple, Dict[str, Any]] = collections.defaultdict(lambda: {
+    "requests": 0,
+    "wait_ms": [0] * (len(HISTOGRAM_BUCKETS_MS) + 1),
+    "latency_ms": [0] * (len(HISTOGRAM_BUCKETS_MS) + 1),
+})
+
+
+def _bucket(ms: float) -> int:
+    for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+        if ms <= bound:
+            return i
+    return len(HISTOGRAM_BUCKETS_MS)
+
+
+def _percentile(counts, q: float) -> Optional[float]:
+    """히스토그램에서 분위수가 속한 버킷의 상한(ms). 마지막 버킷이면 None(상한 없음)."""
+    total = sum(counts)
+    if not total:
+        return 0.0
+    seen = 0
+    for i, c in enumerate(counts):
+        seen += c
+        if seen >= q * total:
+            return float(HISTOGRAM_BUCKETS_MS[i]) if i < len(HISTOGRAM_BUCKETS_MS) else None
+    return None
+
+
+def _record(deployment: str, started: float, ok: bool, priority: str = INTERACTIVE, queued_at: Optional[float] = None) -> None:
+    now = time.perf_counter()
+    elapsed_ms = (now - started) * 1000
+    with _metrics_lock:
+        m = _metrics[deployment]
+        m["requests"] += 1
+        if not ok:
+            m["errors"] += 1
+        m["latency_total_ms"] += elapsed_ms
+        m["latency_max_ms"] = max(m["latency_max_ms"], elapsed_ms)
+
+        c = _class_metrics[(deployment, priority)]
+        c["requests"] += 1
+        c["latency_ms"][_bucket((now - (queued_at or started)) * 1000)] += 1
+        c["wait_ms"][_bucket(((started - queued_at) if queued_at else 0.0) * 1000)] += 1
+
+
+def _count_retry(deployment: str) -> None:
+    with _metrics_lock:
+        _metrics[deployment]["retries"] += 1
+
+
+def metrics() -> Dict[str, Dict[str, Any]]:
+    """
+    배포별 카운터 스냅샷 (queue_depth/in_flight 는 현재 값, 나머지는 누적).
+    classes[클래스] 에는 대기열/실행 수와 대기 시간(wait_ms)·전체 지연(latency_ms, 대기 포함) 히스토그램.
+    """
+    out: Dict[str, Dict[str, Any]] = {}
+    with _metrics_lock:
+        snapshot = {k: dict(v) for k, v in _metrics.items()}
+        class_snapshot = {k: {"requests": v["requests"], "wait_ms": list(v["wait_ms"]), "latency_ms": list(v["latency_ms"])}
+                          for k, v in _class_metrics.items()}
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    for deployment in set(snapshot) | set(limiters):
+        m = snapshot.get(deployment) or {"requests": 0, "errors": 0, "retries": 0,
+                                         "latency_total_ms": 0.0, "latency_max_ms": 0.0}
+        lim = limiters.get(deployment)
+        m["latency_avg_ms"] = round(m["latency_total_ms"] / m["requests"], 1) if m["requests"] else 0.0
+        m["queue_depth"] = lim.queued if lim else 0
+        m["in_flight"] = lim.active if lim else 0
+        m["concurrency_limit"] = lim.limit if lim else None
+        queued = lim.queued_by_class() if lim else {}
+        classes = {}
+        for cls in PRIORITY_CLASSES:
+            c = class_snapshot.get((deployment, cls)) or {
+                "requests": 0,
+                "wait_ms": [0] * (len(HISTOGRAM_BUCKETS_MS) + 1),
+                "latency_ms": [0] * (len(HISTOGRAM_BUCKETS_MS) + 1),
+            }
+            classes[cls] = {
+                "queued": queued.get(cls, 0),
+                "in_flight": lim.active_by_class[cls] if lim else 0,
+                "concurrency_cap": lim.caps[cls] if lim else None,
+                "requests": c["requests"],
+                "wait_p50_ms": _percentile(c["wait_ms"], 0.5),
+                "wait_p95_ms": _percentile(c["wait_ms"], 0.95),
+                "latency_p50_ms": _percentile(c["latency_ms"], 0.5),
+                "latency_p95_ms": _percentile(c["latency_ms"], 0.95),
+                "latency_p99_ms": _percentile(c["latency_ms"], 0.99),
+                "wait_ms": c["wait_ms"],
+                "latency_ms": c["latency_ms"],
+            }
+        m["histogram_buckets_ms"] = list(HISTOGRAM_BUCKETS_MS)
+        m["classes"] = classes
+        m["health"] = _health_snapshot(deployment)
+        out[deployment] = m
+    return out
+
+
+# ----------------------------- 라우팅 / 상태 점수 -----------------------------
+class _Target(NamedTuple):
+    """요청을 보낼 곳 하나. key 는 동시성 제한/메트릭/상태 점수를 구분하는 이름."""
+    key: str
+    profile: AzureProfile
+
+
+class _Health:
+    """
+    대상 하나의 상태 점수 + 서킷 브레이커.
+    - 지연(첫 토큰 또는 전체 응답)과 오류율의 EWMA 로 점수를 매김 (낮을수록 좋음)
+    - 연속 실패가 LLM_CIRCUIT_FAILURES 번이면 LLM_CIRCUIT_COOLOFF_SECONDS 동안 제외(open)
+    - 쿨오프가 끝나면 요청 하나만 시험 삼아 보내고(half-open), 성공하면 복귀
+    """
+    ALPHA = 0.2
+
+    def __init__(self):
+        self.latency_ewma_ms: Optional[float] = None
+        self.error_ewma = 0.0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trial_in_flight = False
+        self.ttft_ms: "collections.deque[float]" = collections.deque(maxlen=200)
+        self.hedges_started = 0
+        self.hedges_won = 0
+
+    def state(self, now: float) -> str:
+        if self.open_until == 0.0:
+            return "closed"
+        return "open" if now < self.open_until else "half_open"
+
+    def start_trial(self, now: float) -> None:
+        """half-open 시험 요청 하나를 보냄. 결과가 오기 전까지(최대 쿨오프 동안) 다시 open 으로 둠."""
+        self.trial_in_flight = True
+        self.open_until = now + getattr(settings, "LLM_CIRCUIT_COOLOFF_SECONDS", 30)
+
+    def available(self, now: float) -> bool:
+        return self.state(now) != "open"
+
+    def score(self, limiter: _Limiter) -> float:
+        latency = self.latency_ewma_ms if self.latency_ewma_ms is not None else 1000.0
+        load = 1 + (limiter.active + limiter.queued) / limiter.limit
+        return latency * (1 + 5 * self.error_ewma) * load
+
+    def ttft_percentile(self, q: float) -> Optional[float]:
+        if len(self.ttft_ms) < 20:
+            return None
+        ordered = sorted(self.ttft_ms)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def on_success(self, latency_ms: float, first_token: bool = False) -> None:
+        self.latency_ewma_ms = latency_ms if self.latency_ewma_ms is None else (
+            self.ALPHA * latency_ms + (1 - self.ALPHA) * self.latency_ewma_ms)
+        self.error_ewma *= 1 - self.ALPHA
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trial_in_flight = False
+        if first_token:
+            self.ttft_ms.append(latency_ms)
+
+    def on_failure(self, now: float) -> bool:
+        """실패 반영. 이번 실패로 서킷이 (다시) 열렸으면 True."""
+        self.error_ewma = self.ALPHA + (1 - self.ALPHA) * self.error_ewma
+        self.consecutive_failures += 1
+        opened = False
+        if self.trial_in_flight or self.consecutive_failures >= getattr(settings, "LLM_CIRCUIT_FAILURES", 5):
+            opened = self.trial_in_flight or self.open_until == 0.0
+            self.open_until = now + getattr(settings, "LLM_CIRCUIT_COOLOFF_SECONDS", 30)
+        self.trial_in_flight = False
+        return opened
+
+    def on_neutral(self) -> None:
+        """요청 자체의 문제(400 등)로 실패: 대상 상태와 무관하므로 시험 요청만 해제."""
+        self.trial_in_flight = False
+
+
+_health_lock = threading.Lock()
+_health: Dict[str, _Health] = collections.defaultdict(_Health)
+_pool_cache: Dict[str, Any] = {}
+
+
+def routing_pool() -> list:
+    """
+    settings.AZURE_OPENAI_DEPLOYMENTS(JSON 배열)에 정의된 채팅 대상 목록.
+    항목: {"name", "endpoint", "api_key", "api_version", "deployment"} — 빠진 값은 기본 프로필 값 사용.
+    정의가 없으면 기본 프로필 하나.
+    """
+    raw = getattr(settings, "AZURE_OPENAI_DEPLOYMENTS", None) or ""
+    cached = _pool_cache.get("pool")
+    if cached is not None and _pool_cache.get("raw") == raw:
+        return cached
+    base = default_profile()
+    pool = []
+    if raw:
+        try:
+            items = json.loads(raw)
+        except ValueError as exc:
+            raise RuntimeError(f"AZURE_OPENAI_DEPLOYMENTS 형식 오류: {exc}")
+        for item in items:
+            profile = AzureProfile(
+                endpoint=item.get("endpoint") or base.endpoint,
+                api_key=item.get("api_key") or base.api_key,
+                api_version=item.get("api_version") or base.api_version,
+                deployment=item.get("deployment") or base.deployment,
+            )
+            key = item.get("name") or f"{profile.deployment}@{urlsplit(profile.endpoint or '').hostname}"
+            pool.append(_Target(key, profile))
+    if not pool:
+        pool = [_Target(base.deployment, base)]
+    _pool_cache.update(raw=raw, pool=pool)
+    return pool
+
+
+def _targets(profile: Optional[AzureProfile], deployment: Optional[str], default=default_profile) -> list:
+    """프로필/배포를 직접 지정하지 않은 채팅 요청만 라우팅 대상 전체로 보냄."""
+    if profile is None and deployment is None and default is default_profile:
+        pool = routing_pool()
+        for target in pool:
+            _check_profile(target.profile)
+        return pool
+    profile = profile or default()
+    if deployment:
+        profile = profile._replace(deployment=deployment)
+    _check_profile(profile)
+    return [_Target(profile.deployment, profile)]
+
+
+def _choose(targets: list, exclude=()) -> _Target:
+    """상태 점수가 가장 좋은 대상. 서킷이 열린 대상은 모두 열렸을 때만 고름."""
+    if len(targets) == 1:
+        return targets[0]
+    now = time.monotonic()
+    with _health_lock:
+        ranked = sorted(targets, key=lambda t: _health[t.key].score(_limiter(t.key)))
+        candidates = [t for t in ranked if t.key not in exclude] or ranked
+        available = [t for t in candidates if _health[t.key].available(now)]
+        chosen = (available or candidates)[0]
+        health = _health[chosen.key]
+        if health.state(now) == "half_open":
+            health.start_trial(now)
+        return chosen
+
+
+def _report(key: str, started: float, exc: Optional[BaseException] = None, first_token: bool = False) -> None:
+    with _health_lock:
+        health = _health[key]
+        if exc is None:
+            health.on_success((time.perf_counter() - started) * 1000, first_token=first_token)
+        elif isinstance(exc, Exception) and _is_retryable(exc):
+            if health.on_failure(time.monotonic()):
+                logger.warning("LLM 대상 서킷 open: %s (%ss 제외)", key,
+                               getattr(settings, "LLM_CIRCUIT_COOLOFF_SECONDS", 30))
+        else:
+            health.on_neutral()
+
+
+def _health_snapshot(key: str) -> Dict[str, Any]:
+    now = time.monotonic()
+    with _health_lock:
+        if key not in _health:
+            return {}
+        h = _health[key]
+        return {
+            "circuit": h.state(now),
+            "latency_ewma_ms": round(h.latency_ewma_ms, 1) if h.latency_ewma_ms is not None else None,
+            "error_rate_ewma": round(h.error_ewma, 3),
+            "consecutive_failures": h.consecutive_failures,
+            "ttft_p50_ms": h.ttft_percentile(0.5),
+            "ttft_p95_ms": h.ttft_percentile(0.95),
+            "hedges_started": h.hedges_started,
+            "hedges_won": h.hedges_won,
+        }
+
+
+# ----------------------------- 사용량 장부 -----------------------------
+class _CallInfo:
+    """공개 API 호출 하나(재시도/헤지 포함)의 장부 기록용 정보."""
+
+    def __init__(self, call_site: Optional[str], priority: str):
+        self.call_site = call_site or "other"
+        self.priority = priority
+        self.started = time.perf_counter()
+        self.target = ""
+        self.attempts = 0
+        self.wait_s = 0.0
+        self.ttft_ms: Optional[int] = None
+
+    def attempt(self, key: str, waited: float) -> None:
+        self.target = key
+        self.attempts += 1
+        self.wait_s += waited
+
+    def first_token(self) -> None:
+        if self.ttft_ms is None:
+            self.ttft_ms = int((time.perf_counter() - self.started) * 1000)
+
+
+def _account(info: _CallInfo, *, messages=None, usage=None, text: Optional[str] = None, images: int = 0,
+             exc: Optional[BaseException] = None) -> None:
+    """
+    호출 결과를 장부에 기록. usage 가 없으면 받은 텍스트가 있을 때만 토큰 수를 추정
+    (요청이 거절된 경우 등 생성되지 않은 호출은 0 으로 기록).
+    """
+    prompt_tokens = completion_tokens = 0
+    estimated = False
+    if usage is not None:
+        prompt_tokens = usage.prompt_tokens or 0
+        completion_tokens = usage.completion_tokens or 0
+    elif text and messages is not None:
+        prompt_tokens = tokens.estimate_message_tokens(messages)
+        completion_tokens = tokens.estimate_tokens(text)
+        estimated = True
+    ledger.record(
+        call_site=info.call_site,
+        deployment=info.target,
+        priority=info.priority,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        usage_estimated=estimated,
+        images=images,
+        attempts=max(info.attempts, 1),
+        ok=exc is None,
+        error=type(exc).__name__[:100] if exc is not None else "",
+        wait_ms=int(info.wait_s * 1000),
+        latency_ms=int((time.perf_counter() - info.started) * 1000),
+        ttft_ms=info.ttft_ms,
+    )
+
+
+def _collect(chunk, parts: list):
+    """스트림 청크의 텍스트를 모으고, usage 청크(stream_options.include_usage)가 오면 돌려줌."""
+    if chunk.choices and chunk.choices[0].delta.content:
+        parts.append(chunk.choices[0].delta.content)
+    return getattr(chunk, "usage", None)
+
+
+def _stream_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    if getattr(settings, "LLM_STREAM_INCLUDE_USAGE", False):
+        return {**kwargs, "stream_options": {"include_usage": True}}
+    return kwargs
+
+
+# ----------------------------- 재시도 -----------------------------
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return False
+
+
+def _backoff_delay(attempt: int, exc: Exception) -> float:
+    """Retry-After 가 있으면 그 값을, 없으면 full jitter 지수 백오프."""
+    response = getattr(exc, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_CAP_SECONDS)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+def _retry_delay(targets: list, failed: tuple, attempt: int, exc: Exception) -> float:
+    """
+    이번 호출에서 아직 실패하지 않은(서킷도 닫힌) 대상이 남아 있으면 바로 그쪽으로,
+    모든 대상이 한 번씩 실패했으면 _backoff_delay (Retry-After 존중) 만큼 기다림.
+    """
+    now = time.monotonic()
+    with _health_lock:
+        untried = [t for t in targets if t.key not in failed and _health[t.key].available(now)]
+    return 0.0 if untried else _backoff_delay(attempt, exc)
+
+
+def _max_retries() -> int:
+    return getattr(settings, "LLM_MAX_RETRIES", 3)
+
+
+def _call(targets: list, fn, priority: str, info: _CallInfo):
+    """
+    동기 호출: 대상 선택 → 슬롯 확보 → 호출 → 재시도 대기 중에는 슬롯 반납.
+    fn(profile) 이 실제 SDK 호출. 재시도는 이번 호출에서 실패한 대상을 피해서 보내고,
+    모든 대상이 실패한 뒤에는 백오프 후 재시도.
+    """
+    failed = ()
+    for attempt in range(_max_retries() + 1):
+        target = _choose(targets, exclude=failed)
+        limiter = _limiter(target.key)
+        queued_at = time.perf_counter()
+        limiter.acquire(priority)
+        started = time.perf_counter()
+        info.attempt(target.key, started - queued_at)
+        try:
+            result = fn(target.profile)
+        except Exception as exc:
+            _record(target.key, started, ok=False, priority=priority, queued_at=queued_at)
+            _report(target.key, started, exc)
+            if attempt >= _max_retries() or not _is_retryable(exc):
+                raise
+            failed = failed + (target.key,)
+            delay = _retry_delay(targets, failed, attempt, exc)
+            logger.warning("LLM 호출 재시도(%s/%s) %.2fs 후: %s", attempt + 1, _max_retries(), delay, exc)
+            _count_retry(target.key)
+        else:
+            _record(target.key, started, ok=True, priority=priority, queued_at=queued_at)
+            _report(target.key, started)
+            return result
+        finally:
+            limiter.release(priority)
+        time.sleep(delay)
+
+
+async def _acall(targets: list, fn, priority: str, info: _CallInfo):
+    """비동기 호출: _call 과 동일한 정책."""
+    failed = ()
+    for attempt in range(_max_retries() + 1):
+        target = _choose(targets, exclude=failed)
+        limiter = _limiter(target.key)
+        queued_at = time.perf_counter()
+        await limiter.acquire_async(priority)
+        started = time.perf_counter()
+        info.attempt(target.key, started - queued_at)
+        try:
+            result = await fn(target.profile)
+        except Exception as exc:
+            _record(target.key, started, ok=False, priority=priority, queued_at=queued_at)
+            _report(target.key, started, exc)
+            if attempt >= _max_retries() or not _is_retryable(exc):
+                raise
+            failed = failed + (target.key,)
+            delay = _retry_delay(targets, failed, attempt, exc)
+            logger.warning("LLM 호출 재시도(%s/%s) %.2fs 후: %s", attempt + 1, _max_retries(), delay, exc)
+            _count_retry(target.key)
+        else:
+            _record(target.key, started, ok=True, priority=priority, queued_at=queued_at)
+            _report(target.key, started)
+            return result
+        finally:
+            limiter.release(priority)
+        await asyncio.sleep(delay)
+
+
+# ----------------------------- 헤지(hedged) 스트림 -----------------------------
+class _OpenStream:
+    """첫 토큰까지 받은 스트림. 슬롯을 쥐고 있으므로 반드시 close() 해야 함."""
+
+    def __init__(self, target: _Target, stream, iterator, buffered, priority: str, queued_at: float, started: float):
+        self.target = target
+        self.stream = stream
+        self.iterator = iterator
+        self.buffered = buffered
+        self.priority = priority
+        self.queued_at = queued_at
+        self.started = started
+        self.closed = False
+
+    async def close(self, ok: bool) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        _record(self.target.key, self.started, ok=ok, priority=self.priority, queued_at=self.queued_at)
+        _limiter(self.target.key).release(self.priority)
+        try:
+            await self.stream.close()
+        except Exception:
+            pass
+
+
+def _has_token(chunk) -> bool:
+    """Azure 콘텐츠 필터 결과처럼 choices 가 빈 청크는 '첫 토큰'으로 치지 않음."""
+    return bool(chunk.choices) and (chunk.choices[0].delta.content is not None or chunk.choices[0].finish_reason)
+
+
+async def _open_stream(target: _Target, messages, kwargs, priority: str, info: _CallInfo) -> _OpenStream:
+    limiter = _limiter(target.key)
+    queued_at = time.perf_counter()
+    await limiter.acquire_async(priority)
+    started = time.perf_counter()
+    info.attempt(target.key, started - queued_at)
+    stream = None
+    sent = False
+    try:
+        client = get_async_client(target.profile)
+        sent = True
+        stream = await client.chat.completions.create(
+            model=target.profile.deployment, messages=messages, stream=True, **kwargs
+        )
+        iterator = stream.__aiter__()
+        buffered = []
+        while True:
+            chunk = await iterator.__anext__()
+            buffered.append(chunk)
+            if _has_token(chunk):
+                break
+    except BaseException as exc:
+        _record(target.key, started, ok=False, priority=priority, queued_at=queued_at)
+        # 헤지에서 져서 취소된 경우(CancelledError)는 상태 점수에 반영하지 않음(neutral)
+        _report(target.key, started, exc)
+        limiter.release(priority)
+        if sent and isinstance(exc, asyncio.CancelledError):
+            # 진 쪽도 프롬프트 토큰은 과금되므로 별도 행으로 기록
+            ledger.record(
+                call_site=info.call_site, deployment=target.key, priority=priority,
+                prompt_tokens=tokens.estimate_message_tokens(messages), usage_estimated=True,
+                ok=False, error="hedge_cancelled", wait_ms=int((started - queued_at) * 1000),
+                latency_ms=int((time.perf_counter() - queued_at) * 1000),
+            )
+        if stream is not None:
+            try:
+                await stream.close()
+            except Exception:
+                pass
+        raise
+    _report(target.key, started, first_token=True)
+    return _OpenStream(target, stream, iterator, buffered, priority, queued_at, started)
+
+
+def _hedge_delay(key: str) -> float:
+    """첫 토큰이 이 시간(초) 안에 오지 않으면 두 번째 대상으로 헤지 요청을 보냄."""
+    q = getattr(settings, "LLM_HEDGE_PERCENTILE", 0.9)
+    with _health_lock:
+        observed = _health[key].ttft_percentile(q)
+    fallback = getattr(settings, "LLM_HEDGE_DELAY_MS", 2000)
+    return (observed if observed is not None else fallback) / 1000
+
+
+async def _race_first_token(targets: list, messages, kwargs, priority: str, info: _CallInfo) -> _OpenStream:
+    """
+    가장 좋은 대상에 먼저 보내고, hedge delay 안에 첫 토큰이 없으면 두 번째 대상에도 보냄.
+    먼저 첫 토큰을 받은 쪽을 쓰고 나머지는 취소. 한쪽이 실패하면 바로 다른 쪽으로 넘김.
+    """
+    primary = _choose(targets)
+    tasks = {asyncio.create_task(_open_stream(primary, messages, kwargs, priority, info)): primary}
+    tried = {primary.key}
+    last_exc: Optional[BaseException] = None
+
+    def start_next(hedge: bool) -> bool:
+        remaining = [t for t in targets if t.key not in tried]
+        if not remaining:
+            return False
+        target = _choose(remaining)
+        tried.add(target.key)
+        if hedge:
+            with _health_lock:
+                _health[target.key].hedges_started += 1
+            logger.info("LLM 헤지 요청: %s → %s", primary.key, target.key)
+        tasks[asyncio.create_task(_open_stream(target, messages, kwargs, priority, info))] = target
+        return True
+
+    try:
+        done, _ = await asyncio.wait(set(tasks), timeout=_hedge_delay(primary.key))
+        if not done:
+            start_next(hedge=True)
+        while tasks:
+            done, _ = await asyncio.wait(set(tasks), return_when=asyncio.FIRST_COMPLETED)
+            winner = None
+            for task in done:
+                target = tasks.pop(task)
+                if task.exception() is not None:
+                    last_exc = task.exception()
+                    logger.warning("LLM 스트림 실패(%s): %s", target.key, last_exc)
+                    continue
+                if winner is None:
+                    winner = task.result()
+                else:
+                    await task.result().close(ok=True)  # 같은 순간에 둘 다 도착한 경우
+            if winner is not None:
+                info.target = winner.target.key
+                info.first_token()
+                if winner.target.key != primary.key:
+                    with _health_lock:
+                        _health[winner.target.key].hedges_won += 1
+                return winner
+            if not tasks:
+                start_next(hedge=False)
+        raise last_exc or RuntimeError("LLM 스트림을 열지 못했습니다.")
+    finally:
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                opened = await task
+            except BaseException:
+                continue
+            await opened.close(ok=True)
+
+
+async def _hedged_stream(targets: list, messages, kwargs, priority: str, info: _CallInfo) -> AsyncIterator[Any]:
+    opened = await _race_first_token(targets, messages, kwargs, priority, info)
+    ok = False
+    try:
+        for chunk in opened.buffered:
+            yield chunk
+        async for chunk in opened.iterator:
+            yield chunk
+        ok = True
+    finally:
+        await opened.close(ok=ok)
+
+
+async def _assemble_completion(chunks: AsyncIterator[Any]):
+    """스트림 청크를 모아 chat.completions.create(stream=False) 와 같은 형태의 응답으로 조립."""
+    parts = []
+    first = None
+    finish_reason = "stop"
+    usage = None
+    async for chunk in chunks:
+        first = first or chunk
+        if getattr(chunk, "usage", None):
+            usage = chunk.usage.model_dump()
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        if choice.delta.content:
+            parts.append(choice.delta.content)
+        if choice.finish_reason:
+            finish_reason = choice.finish_reason
+    return ChatCompletion.model_validate({
+        "id": getattr(first, "id", "") or "",
+        "object": "chat.completion",
+        "created": getattr(first, "created", 0) or int(time.time()),
+        "model": getattr(first, "model", "") or "",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "".join(parts)},
+            "finish_reason": finish_reason,
+        }],
+        "usage": usage,
+    })
+
+
+# ----------------------------- 공개 API -----------------------------
+# priority: INTERACTIVE(실시간 게임 진행) / BACKGROUND(요약·사용자 대기 작업) / BULK(일괄 생성)
+# hedge: 라우팅 대상이 둘 이상일 때, 첫 토큰이 늦으면 다른 대상에도 보내 먼저 온 쪽을 씀 (비동기만)
+# call_site: 사용량 장부(llm.ledger)에 남길 호출 위치 이름 (예: "game.scene")
+def chat_completion(*, messages, profile: Optional[AzureProfile] = None, deployment: Optional[str] = None,
+                    priority: str = INTERACTIVE, call_site: Optional[str] = None, **kwargs):
+    """동기 chat.completions.create (라우팅 + 공유 클라이언트 + 제한 + 재시도)."""
+    targets = _targets(profile, deployment)
+    priority = _check_priority(priority)
+    info = _CallInfo(call_site, priority)
+    try:
+        resp = _call(
+            targets,
+            lambda p: get_client(p).chat.completions.create(model=p.deployment, messages=messages, **kwargs),
+            priority,
+            info,
+        )
+    except BaseException as exc:
+        _account(info, exc=exc)
+        raise
+    _account(info, messages=messages, usage=resp.usage, text=resp.choices[0].message.content if resp.choices else None)
+    return resp
+
+
+async def achat_completion(*, messages, profile: Optional[AzureProfile] = None, deployment: Optional[str] = None,
+                           priority: str = INTERACTIVE, hedge: bool = False, call_site: Optional[str] = None,
+                           **kwargs):
+    """비동기 chat.completions.create (라우팅 + 공유 클라이언트 + 제한 + 재시도, 선택적으로 헤지)."""
+    targets = _targets(profile, deployment)
+    priority = _check_priority(priority)
+    info = _CallInfo(call_site, priority)
+    try:
+        if hedge and len(targets) > 1:
+            resp = await _assemble_completion(_hedged_stream(targets, messages, _stream_kwargs(kwargs), priority, info))
+        else:
+            resp = await _acall(
+                targets,
+                lambda p: get_async_client(p).chat.completions.create(model=p.deployment, messages=messages, **kwargs),
+                priority,
+                info,
+            )
+    except BaseException as exc:
+        _account(info, exc=exc)
+        raise
+    _account(info, messages=messages, usage=resp.usage, text=resp.choices[0].message.content if resp.choices else None)
+    return resp
+
+
+async def astream_chat_completion(
+    *, messages, profile: Optional[AzureProfile] = None, deployment: Optional[str] = None,
+    priority: str = INTERACTIVE, hedge: bool = False, call_site: Optional[str] = None, **kwargs
+) -> AsyncIterator[Any]:
+    """
+    스트리밍 chat.completions 청크를 yield.
+    슬롯은 스트림을 끝까지 읽을 때까지 유지하고, 재시도는 첫 청크를 받기 전까지만 한다.
+    """
+    targets = _targets(profile, deployment)
+    priority = _check_priority(priority)
+    kwargs = _stream_kwargs(kwargs)
+    info = _CallInfo(call_site, priority)
+    parts: list = []
+    usage = None
+    error: Optional[BaseException] = None
+    try:
+        if hedge and len(targets) > 1:
+            async for chunk in _hedged_stream(targets, messages, kwargs, priority, info):
+                usage = _collect(chunk, parts) or usage
+                yield chunk
+            return
+
+        failed = ()
+        for attempt in range(_max_retries() + 1):
+            target = _choose(targets, exclude=failed)
+            limiter = _limiter(target.key)
+            client = get_async_client(target.profile)
+            queued_at = time.perf_counter()
+            await limiter.acquire_async(priority)
+            started = time.perf_counter()
+            info.attempt(target.key, started - queued_at)
+            received = False
+            try:
+                stream = await client.chat.completions.create(
+                    model=target.profile.deployment, messages=messages, stream=True, **kwargs
+                )
+                async for chunk in stream:
+                    if not received and _has_token(chunk):
+                        _report(target.key, started, first_token=True)
+                        info.first_token()
+                        received = True
+                    usage = _collect(chunk, parts) or usage
+                    yield chunk
+            except Exception as exc:
+                _record(target.key, started, ok=False, priority=priority, queued_at=queued_at)
+                if not received:
+                    _report(target.key, started, exc)
+                if received or attempt >= _max_retries() or not _is_retryable(exc):
+                    raise
+                failed = failed + (target.key,)
+                delay = _retry_delay(targets, failed, attempt, exc)
+                logger.warning("LLM 스트림 재시도(%s/%s) %.2fs 후: %s", attempt + 1, _max_retries(), delay, exc)
+                _count_retry(target.key)
+            else:
+                _record(target.key, started, ok=True, priority=priority, queued_at=queued_at)
+                return
+            finally:
+                limiter.release(priority)
+            await asyncio.sleep(delay)
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        _account(info, messages=messages, usage=usage, text="".join(parts), exc=error)
+
+
+def image_generation(*, prompt: str, profile: Optional[AzureProfile] = None, deployment: Optional[str] = None,
+                     priority: str = INTERACTIVE, call_site: Optional[str] = None, **kwargs):
+    """동기 images.generate (기본은 DALL-E 프로필, 라우팅 없음)."""
+    targets = _targets(profile, deployment, default=dalle_profile)
+    priority = _check_priority(priority)
+    info = _CallInfo(call_site, priority)
+    try:
+        resp = _call(
+            targets,
+            lambda p: get_client(p).images.generate(model=p.deployment, prompt=prompt, **kwargs),
+            priority,
+            info,
+        )
+    except BaseException as exc:
+        _account(info, exc=exc)
+        raise
+    _account(info, images=len(resp.data or []))
+    return resp
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+llm/json_stream.py
+
+LLM 토큰 스트림을 받아가며 JSON을 점진적으로 파싱하는 파서.
+- 조각(chunk)을 feed() 로 넣을 때마다, 그 사이에 '완성된' 값들을 (path, value) 이벤트로 돌려줌
+- path 는 루트부터의 키/인덱스 튜플 (예: ("round", "title"), ("round", "choices", "tiger"))
+- ```json 펜스나 앞뒤 잡담은 무시하고, 첫 '{' 또는 '[' 부터 루트가 닫힐 때까지만 해석
+
+사용 예:
+    parser = IncrementalJSONParser()
+    async for delta in stream:
+        for path, value in parser.feed(delta):
+            if path == ("round", "title"):
+                ...
+    scene = parser.result
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Tuple
+
+Path = Tuple[Any, ...]
+Event = Tuple[Path, Any]
+
+_LITERAL_CHARS = set("-+0123456789.eEtruefalsn")
+
+
+class IncrementalJSONParser:
+    def __init__(self) -> None:
+        # frame: {"c": 컨테이너, "k": 현재 키(객체), "s": 기대 토큰, "slot": 부모에서의 위치}
+        self._stack: List[Dict[str, Any]] = []
+        self._root: Any = None
+        self._done = False
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._literal: List[str] = []
+
+    @property
+    def done(self) -> bool:
+        """루트 값이 완전히 닫혔는지 여부."""
+        return self._done
+
+    @property
+    def result(self) -> Any:
+        """완성된 루트 값 (아직 닫히지 않았으면 None)."""
+        return self._root if self._done else None
+
+    def feed(self, text: str) -> List[Event]:
+        """텍스트 조각을 처리하고, 이번 조각에서 완성된 값들의 이벤트 목록을 반환."""
+        events: List[Event] = []
+        for ch in text or "":
+            if self._done:
+                break
+            self._consume(ch, events)
+        return events
+
+    # ----------------------------- 내부 -----------------------------
+    def _path(self) -> Path:
+        return tuple(f["slot"] for f in self._stack[1:])
+
+    def _consume(self, ch: str, events: List[Event]) -> None:
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+                self._string.append(ch)
+            elif ch == "\\":
+                self._escape = True
+                self._string.append(ch)
+            elif ch == '"':
+                self._in_string = False
+                value = json.loads('"' + "".join(self._string) + '"')
+                self._string = []
+                self._on_string(value, events)
+            else:
+                self._string.append(ch)
+            return
+
+        if self._literal:
+            if ch in _LITERAL_CHARS:
+                self._literal.append(ch)
+                return
+            self._flush_literal(events)
+            if self._done:
+                return
+
+        # 루트 시작 전: 펜스/잡담 건너뛰기
+        if not self._stack:
+            if ch in "{[":
+                self._push(ch)
+            return
+
+        if ch in " \t\r\n":
+            return
+        if ch == '"':
+            self._in_string = True
+        elif ch in "{[":
+            self._push(ch)
+        elif ch in "}]":
+            frame = self._stack.pop()
+            self._complete(frame["c"], events)
+        elif ch == ":":
+            self._stack[-1]["s"] = "value"
+        elif ch == ",":
+            top = self._stack[-1]
+            top["s"] = "key" if isinstance(top["c"], dict) else "value"
+        elif ch in _LITERAL_CHARS:
+            self._literal.append(ch)
+
+    def _push(self, ch: str) -> None:
+        slot = None
+        if self._stack:
+            parent = self._stack[-1]
+            slot = parent["k"] if isinstance(parent["c"], dict) else len(parent["c"])
+        container: Any = {} if ch == "{" else []
+        self._stack.append({
+            "c": container,
+            "k": None,
+            "s": "key" if ch == "{" else "value",
+            "slot": slot,
+        })
+
+    def _on_string(self, value: str, events: List[Event]) -> None:
+        top = self._stack[-1]
+        if isinstance(top["c"], dict) and top["s"] == "key":
+            top["k"] = value
+            top["s"] = "colon"
+            return
+        self._complete(value, events)
+
+    def _flush_literal(self, events: List[Event]) -> None:
+        raw = "".join(self._literal)
+        self._literal = []
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw  # 모델이 잘못된 리터럴을 내도 스트림은 계속 진행
+        self._complete(value, events)
+
+    def _complete(self, value: Any, events: List[Event]) -> None:
+        if not self._stack:
+            self._root = value
+            self._done = True
+            events.append(((), value))
+            return
+        top = self._stack[-1]
+        if isinstance(top["c"], dict):
+            key = top["k"]
+            top["c"][key] = value
+        else:
+            key = len(top["c"])
+            top["c"].append(value)
+        top["s"] = "comma"
+        events.append((self._path() + (key,), value))
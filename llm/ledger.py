@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+llm/ledger.py
+
+LLM 호출별 토큰 사용량/지연 장부 (write-behind).
+- gateway 가 호출이 끝날 때마다 record() → 메모리 큐에 넣고 바로 반환 (요청 경로에서 DB 쓰기 없음)
+- 백그라운드 스레드가 LLM_LEDGER_BATCH_SIZE 건 또는 LLM_LEDGER_FLUSH_SECONDS 마다 bulk_create
+- 큐가 LLM_LEDGER_MAX_PENDING 건을 넘으면 새 기록은 버리고 dropped 만 올림
+- 방/사용자는 tags() 로 묶은 컨텍스트에서 가져옴 (contextvars → asyncio 태스크, sync_to_async 스레드에 상속)
+
+사용 예:
+    from llm import ledger
+
+    with ledger.tags(room_id=room_id, user_id=user.id):
+        await gateway.achat_completion(messages=[...], call_site="game.scene")
+"""
+from __future__ import annotations
+
+import atexit
+import contextvars
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_tags: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar("llm_ledger_tags", default={})
+
+_queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=getattr(settings, "LLM_LEDGER_MAX_PENDING", 10000))
+_writer_lock = threading.Lock()
+_writer: threading.Thread | None = None
+_stats_lock = threading.Lock()
+_stats = {"recorded": 0, "written": 0, "dropped": 0, "failed": 0}
+
+
+@contextmanager
+def tags(**values: Any):
+    """이 블록(과 여기서 만든 태스크) 안의 LLM 호출에 room_id/user_id 등을 붙임. None 값은 무시."""
+    merged = {**_tags.get(), **{k: str(v) for k, v in values.items() if v is not None}}
+    token = _tags.set(merged)
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+
+def current_tags() -> Dict[str, str]:
+    return dict(_tags.get())
+
+
+def _count(name: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += n
+
+
+def record(**fields: Any) -> None:
+    """호출 하나를 장부 큐에 넣음 (LLMUsage 필드명 그대로)."""
+    if not getattr(settings, "LLM_LEDGER_ENABLED", True):
+        return
+    tagged = current_tags()
+    entry = {
+        "created_at": timezone.now(),
+        "room_id": tagged.get("room_id"),
+        "user_id": tagged.get("user_id"),
+        **fields,
+    }
+    try:
+        _queue.put_nowait(entry)
+    except queue.Full:
+        _count("dropped")
+        return
+    _count("recorded")
+    _ensure_writer()
+
+
+def _ensure_writer() -> None:
+    global _writer
+    if _writer is not None and _writer.is_alive():
+        return
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_run, name="llm-ledger", daemon=True)
+            _writer.start()
+
+
+def _drain() -> List[Dict[str, Any]]:
+    batch = []
+    limit = getattr(settings, "LLM_LEDGER_BATCH_SIZE", 200)
+    while len(batch) < limit:
+        try:
+            batch.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _write(batch: List[Dict[str, Any]]) -> None:
+    if not batch:
+        return
+    from llm.models import LLMUsage
+
+    try:
+        LLMUsage.objects.bulk_create([LLMUsage(**entry) for entry in batch])
+        _count("written", len(batch))
+    except Exception as exc:
+        logger.warning("LLM 사용량 장부 기록 실패 (%s건 버림): %s", len(batch), exc)
+        _count("failed", len(batch))
+    finally:
+        close_old_connections()
+
+
+def _run() -> None:
+    """첫 기록이 들어온 뒤 LLM_LEDGER_FLUSH_SECONDS 동안(또는 배치가 찰 때까지) 모아서 한 번에 씀."""
+    while True:
+        batch = [_queue.get()]
+        limit = getattr(settings, "LLM_LEDGER_BATCH_SIZE", 200)
+        deadline = time.monotonic() + getattr(settings, "LLM_LEDGER_FLUSH_SECONDS", 2.0)
+        while len(batch) < limit:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        _write(batch)
+
+
+def flush() -> None:
+    """대기 중인 기록을 지금 스레드에서 모두 씀 (프로세스 종료, 관리 명령 끝 등)."""
+    while not _queue.empty():
+        _write(_drain())
+
+
+def stats() -> Dict[str, int]:
+    with _stats_lock:
+        snapshot = dict(_stats)
+    snapshot["pending"] = _queue.qsize()
+    return snapshot
+
+
+atexit.register(flush)
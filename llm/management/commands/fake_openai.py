@@ -0,0 +1,54 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from llm import fake_openai
+
+
+class Command(BaseCommand):
+    help = (
+        '오프라인 벤치마크/부하 테스트용 가짜 Azure OpenAI 서버를 띄웁니다. '
+        '앱은 AZURE_OPENAI_ENDPOINT / AZURE_OPENAI_DALLE_ENDPOINT 를 이 서버 주소로 두고 실행하세요.'
+    )
+
+    def add_arguments(self, parser) :
+        parser.add_argument('--host', default=fake_openai.DEFAULT_HOST)
+        parser.add_argument('--port', type=int, default=fake_openai.DEFAULT_PORT)
+        parser.add_argument('--mode', choices=['record', 'replay', 'synthetic'], default='replay')
+        parser.add_argument('--fixtures', default='llm_fixtures', help='fixture 를 저장/조회할 디렉터리')
+        parser.add_argument('--profile', choices=sorted(fake_openai.PROFILES), default='instant', help='지연/토큰 속도 프로필')
+        parser.add_argument('--upstream', default=getattr(settings, 'AZURE_OPENAI_ENDPOINT', None), help='record 모드에서 채팅 요청을 보낼 실제 endpoint')
+        parser.add_argument('--image-upstream', default=os.getenv('AZURE_OPENAI_DALLE_ENDPOINT'), help='record 모드에서 이미지 요청을 보낼 실제 endpoint')
+        parser.add_argument('--on-miss', choices=['synthetic', 'error'], default='synthetic', help='replay 모드에서 fixture 가 없을 때')
+        parser.add_argument('--synthetic-file', help='합성 응답으로 돌려줄 텍스트 파일')
+        parser.add_argument('--seed', type=int, default=0, help='지연/오류 재현용 시드')
+
+    def handle(self, *args, **options) :
+        synthetic_text = fake_openai.SYNTHETIC_TEXT
+        if options['synthetic_file'] :
+            with open(options['synthetic_file'], encoding='utf-8') as f :
+                synthetic_text = f.read()
+
+        try :
+            server = fake_openai.FakeOpenAIServer(
+                (options['host'], options['port']),
+                mode=options['mode'],
+                fixtures=options['fixtures'],
+                profile=options['profile'],
+                upstream=options['upstream'],
+                image_upstream=options['image_upstream'],
+                on_miss=options['on_miss'],
+                synthetic_text=synthetic_text,
+                seed=options['seed'],
+            )
+        except (ValueError, OSError) as e :
+            raise CommandError(str(e))
+
+        self.stdout.write(f"fake_openai: {server.mode} 모드, profile={server.profile_name}, {server.base_url}")
+        try :
+            server.serve_forever()
+        except KeyboardInterrupt :
+            pass
+        finally :
+            server.server_close()
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-17 17:53
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMUsage',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('call_site', models.CharField(max_length=64)),
+                ('deployment', models.CharField(blank=True, default='', max_length=100)),
+                ('priority', models.CharField(max_length=16)),
+                ('room_id', models.CharField(blank=True, db_index=True, max_length=64, null=True)),
+                ('user_id', models.CharField(blank=True, db_index=True, max_length=64, null=True)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('completion_tokens', models.PositiveIntegerField(default=0)),
+                ('usage_estimated', models.BooleanField(default=False)),
+                ('images', models.PositiveSmallIntegerField(default=0)),
+                ('attempts', models.PositiveSmallIntegerField(default=1)),
+                ('ok', models.BooleanField(default=True)),
+                ('error', models.CharField(blank=True, default='', max_length=100)),
+                ('wait_ms', models.PositiveIntegerField(default=0)),
+                ('latency_ms', models.PositiveIntegerField(default=0)),
+                ('ttft_ms', models.PositiveIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'llm_usage',
+                'indexes': [models.Index(fields=['call_site', 'created_at'], name='llm_usage_site_time')],
+            },
+        ),
+    ]
@@ -1,3 +1,38 @@
+import uuid
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+# LLM 호출 장부 (호출 하나당 한 행, llm.ledger 가 모아서 bulk_create)
+class LLMUsage(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    # 호출 위치 (예: game.scene, gm.resolve, storymode.narration)
+    call_site = models.CharField(max_length=64)
+    # 실제로 응답한 라우팅 대상 (gateway 의 대상 key)
+    deployment = models.CharField(max_length=100, blank=True, default='')
+    priority = models.CharField(max_length=16)
+    # 장부는 방/사용자가 삭제된 뒤에도 남아야 하므로 FK 대신 id 만 저장
+    room_id = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    user_id = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    # 응답에 usage 가 없어(스트림 등) 토큰 수를 추정한 경우
+    usage_estimated = models.BooleanField(default=False)
+    images = models.PositiveSmallIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=1)
+    ok = models.BooleanField(default=True)
+    error = models.CharField(max_length=100, blank=True, default='')
+    # 대기열 대기 / 전체(대기 포함) / 첫 토큰까지 (스트림만)
+    wait_ms = models.PositiveIntegerField(default=0)
+    latency_ms = models.PositiveIntegerField(default=0)
+    ttft_ms = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'llm_usage'
+        indexes = [
+            models.Index(fields=['call_site', 'created_at'], name='llm_usage_site_time'),
+        ]
+
+    def __str__(self):
+        return f"[{self.call_site}] {self.prompt_tokens}+{self.completion_tokens} tokens, {self.latency_ms}ms"
@@ -3,7 +3,7 @@
 llm/multi_mode/character_gen.py
 
 시나리오 설명/요약을 입력받아 캐릭터(1~N명)를 JSON 스펙에 맞게 생성합니다.
-- Azure OpenAI (chat.completions) 사용
+- Azure OpenAI (chat.completions) 사용 — llm.gateway 공유 클라이언트
 - JSON 강제(response_format) + 안전 파싱 보강
 - (선택) Django 모델(Character)에 저장하는 헬퍼 제공
 
@@ -31,8 +31,8 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from django.conf import settings
 
-# Azure OpenAI (openai>=1.x 계열)
-from openai import AzureOpenAI
+# Azure OpenAI 호출은 공유 게이트웨이를 통해 (커넥션 풀/동시성 제한/재시도)
+from llm import gateway, ledger
 
 # (선택) DB 저장을 위한 import — 없으면 무시 가능
 try:
@@ -112,10 +112,11 @@ class CharacterGenerator:
         if missing:
             raise RuntimeError(f"Azure OpenAI 설정 누락: {', '.join(missing)}")
 
-        self.client = AzureOpenAI(
+        self.profile = gateway.AzureProfile(
+            endpoint=self.endpoint,
             api_key=self.api_key,
-            azure_endpoint=self.endpoint,
             api_version=self.api_version,
+            deployment=self.deployment,
         )
 
     def generate_characters(
@@ -135,8 +136,8 @@ class CharacterGenerator:
             json_spec=CHARACTER_JSON_SPEC,
         )
 
-        resp = self.client.chat.completions.create(
-            model=self.deployment,
+        resp = gateway.chat_completion(
+            profile=self.profile,
             messages=[
                 {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": user_content},
@@ -145,6 +146,8 @@ class CharacterGenerator:
             top_p=top_p,
             max_tokens=max_tokens,
             response_format={"type": "json_object"},  # 지원 안되면 주석 처리하고 _extract_json_block 사용
+            priority=gateway.BACKGROUND,  # 실시간 턴 진행보다 뒤
+            call_site="character_gen",
         )
         text = resp.choices[0].message.content
         try:
@@ -235,7 +238,8 @@ class CharacterGenerateAPIView(APIView):  # type: ignore
 
         try:
             gen = CharacterGenerator()
-            characters = gen.generate_characters(scenario_text, count=count, language=language)
+            with ledger.tags(user_id=request.user.id):
+                characters = gen.generate_characters(scenario_text, count=count, language=language)
             result = {"message": "캐릭터 생성 성공", "characters": characters}
             if save and scenario_id:
                 ids = gen.persist_characters(scenario_id, characters)
@@ -6,6 +6,7 @@ llm/multi_mode/gm_engine.py
 - 각 플레이어에게 **서로 다른 선택지**를 제시 (propose_choices)
 - 플레이어 입력(선택)을 모아 **다음 턴 내러티브/상태**를 계산 (resolve_turn)
 - 결과(JSON)를 세션 상태에 병합 (apply_gm_result_to_state)
+- 동기 엔진(AIGameMaster)과 비동기 엔진(AsyncAIGameMaster)을 함께 제공
 - 세션 상태는 호출자가 관리(캐시/DB). 본 모듈은 상태 JSON을 입력/출력으로만 다룸.
 
 상태(JSON) 최소 스펙:
@@ -67,7 +68,10 @@ import re
 from typing import Any, Dict, List, Optional
 
 from django.conf import settings
-from openai import AzureOpenAI
+
+from llm import gateway
+from llm.json_stream import IncrementalJSONParser
+from llm.multi_mode.state_digest import digest_state
 
 logger = logging.getLogger(__name__)
 
@@ -311,32 +315,30 @@ RESOLVE_TEMPLATE_SHARI = """아래의 세션 상태와 플레이어 선택을 
 
 
 # ----------------------------- 엔진 -----------------------------
-class AIGameMaster:
-    def __init__(self):
-        self.client = AzureOpenAI(
-            api_key=getattr(settings, "AZURE_OPENAI_API_KEY", None),
-            azure_endpoint=getattr(settings, "AZURE_OPENAI_ENDPOINT", None),
-            api_version=getattr(settings, "AZURE_OPENAI_VERSION", None),
-        )
-        self.deployment = getattr(settings, "AZURE_OPENAI_DEPLOYMENT", None)
-        missing = [k for k, v in {
-            "AZURE_OPENAI_API_KEY": getattr(settings, "AZURE_OPENAI_API_KEY", None),
-            "AZURE_OPENAI_ENDPOINT": getattr(settings, "AZURE_OPENAI_ENDPOINT", None),
-            "AZURE_OPENAI_VERSION": getattr(settings, "AZURE_OPENAI_VERSION", None),
-            "AZURE_OPENAI_DEPLOYMENT": self.deployment,
-        }.items() if not v]
-        if missing:
-            raise RuntimeError(f"Azure OpenAI 설정 누락: {', '.join(missing)}")
+def _azure_settings() -> Dict[str, Optional[str]]:
+    """settings.py 의 Azure OpenAI 설정을 읽고 누락 항목이 있으면 RuntimeError."""
+    conf = {
+        "AZURE_OPENAI_API_KEY": getattr(settings, "AZURE_OPENAI_API_KEY", None),
+        "AZURE_OPENAI_ENDPOINT": getattr(settings, "AZURE_OPENAI_ENDPOINT", None),
+        "AZURE_OPENAI_VERSION": getattr(settings, "AZURE_OPENAI_VERSION", None),
+        "AZURE_OPENAI_DEPLOYMENT": getattr(settings, "AZURE_OPENAI_DEPLOYMENT", None),
+    }
+    missing = [k for k, v in conf.items() if not v]
+    if missing:
+        raise RuntimeError(f"Azure OpenAI 설정 누락: {', '.join(missing)}")
+    return conf
 
-    # 1) 선택지 제안
-    def propose_choices(
-        self,
-        state: Dict[str, Any],
-        language: str = "ko",
-        temperature: float = 0.6,
-        top_p: float = 0.9,
-        max_tokens: int = 1400,
-    ) -> Dict[str, Any]:
+
+class _GameMasterBase:
+    """
+    프롬프트 조립/응답 파싱 공통부.
+    - 동기(AIGameMaster)와 비동기(AsyncAIGameMaster) 엔진이 같은 프롬프트/보정 로직을 공유
+    - 실제 네트워크 호출(_complete)만 하위 클래스가 구현
+    - 상태는 받은 그대로 직렬화 (토큰 예산 다이제스트는 호출자가 한 번만: GameConsumer / API 뷰)
+    """
+    deployment: Optional[str] = None
+
+    def _build_propose_messages(self, state: Dict[str, Any], language: str, max_tokens: int) -> List[Dict[str, str]]:
         next_turn = int(state.get("turn", 0)) + 1
         state_json = json.dumps(state, ensure_ascii=False)
         cap_summary = _summarize_party_capabilities(state)
@@ -351,33 +353,16 @@ class AIGameMaster:
             "propose_choices: tokens[max]=%s, state_len=%s, cap_len=%s",
             max_tokens, len(state_json), len(cap_summary)
         )
-        resp = self.client.chat.completions.create(
-            model=self.deployment,
-            messages=[{"role": "system", "content": GM_SYSTEM},
-                      {"role": "user", "content": prompt}],
-            temperature=temperature,
-            top_p=top_p,
-            max_tokens=max_tokens,
-            response_format={"type": "json_object"},
-        )
-        txt = resp.choices[0].message.content
-        logger.debug("propose_choices: response_len=%s", len(txt or ""))
-        try:
-            return json.loads(_extract_json_block(txt))
-        except Exception as e:
-            logger.exception("선택지 JSON 파싱 실패: %s", e)
-            raise ValueError("선택지 JSON 파싱 실패(응답 형식 오류).")
+        return [{"role": "system", "content": GM_SYSTEM},
+                {"role": "user", "content": prompt}]
 
-    # 2) 턴 해결(선택 반영) — SHARI 고정 + 능력/아이템 반영
-    def resolve_turn(
+    def _build_resolve_messages(
         self,
         state: Dict[str, Any],
         choices: Dict[str, Any],
-        language: str = "ko",
-        temperature: float = 0.7,
-        top_p: float = 0.95,
-        max_tokens: int = 1500,
-    ) -> Dict[str, Any]:
+        language: str,
+        max_tokens: int,
+    ) -> List[Dict[str, str]]:
         next_turn = int(state.get("turn", 0)) + 1
         prev_turn = next_turn - 1
 
@@ -419,19 +404,21 @@ class AIGameMaster:
             "resolve_turn: tokens[max]=%s, state_len=%s, choices_len=%s, cap_len=%s, rolls_hint=%s",
             max_tokens, len(state_json), len(choices_json), len(cap_summary), bool(rolls_hint)
         )
+        return [{"role": "system", "content": GM_SYSTEM},
+                {"role": "user", "content": prompt}]
 
-        resp = self.client.chat.completions.create(
-            model=self.deployment,
-            messages=[{"role": "system", "content": GM_SYSTEM},
-                      {"role": "user", "content": prompt}],
-            temperature=temperature,
-            top_p=top_p,
-            max_tokens=max_tokens,
-            response_format={"type": "json_object"},
-        )
-        txt = resp.choices[0].message.content
-        logger.debug("resolve_turn: response_len=%s", len(txt or ""))
+    @staticmethod
+    def _parse_propose(txt: Optional[str]) -> Dict[str, Any]:
+        logger.debug("propose_choices: response_len=%s", len(txt or ""))
+        try:
+            return json.loads(_extract_json_block(txt))
+        except Exception as e:
+            logger.exception("선택지 JSON 파싱 실패: %s", e)
+            raise ValueError("선택지 JSON 파싱 실패(응답 형식 오류).")
 
+    @staticmethod
+    def _parse_resolve(state: Dict[str, Any], txt: Optional[str]) -> Dict[str, Any]:
+        logger.debug("resolve_turn: response_len=%s", len(txt or ""))
         try:
             result = json.loads(_extract_json_block(txt))
         except Exception as e:
@@ -439,8 +426,129 @@ class AIGameMaster:
             raise ValueError("해결 JSON 파싱 실패(응답 형식 오류).")
 
         # 결과 보정 (필수 키/개인 묘사/인벤토리·스킬 구조 등)
-        result = _normalize_result(state, result)
-        return result
+        return _normalize_result(state, result)
+
+
+class AIGameMaster(_GameMasterBase):
+    def __init__(self):
+        self.deployment = _azure_settings()["AZURE_OPENAI_DEPLOYMENT"]
+
+    def _complete(self, messages, temperature: float, top_p: float, max_tokens: int, call_site: str) -> Optional[str]:
+        # deployment 를 지정하지 않으면 AZURE_OPENAI_DEPLOYMENTS 의 대상들 중 상태가 좋은 곳으로 라우팅
+        resp = gateway.chat_completion(
+            messages=messages,
+            temperature=temperature,
+            top_p=top_p,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+            call_site=call_site,
+        )
+        return resp.choices[0].message.content
+
+    # 1) 선택지 제안
+    def propose_choices(
+        self,
+        state: Dict[str, Any],
+        language: str = "ko",
+        temperature: float = 0.6,
+        top_p: float = 0.9,
+        max_tokens: int = 1400,
+    ) -> Dict[str, Any]:
+        messages = self._build_propose_messages(state, language, max_tokens)
+        txt = self._complete(messages, temperature, top_p, max_tokens, "gm.propose")
+        return self._parse_propose(txt)
+
+    # 2) 턴 해결(선택 반영) — SHARI 고정 + 능력/아이템 반영
+    def resolve_turn(
+        self,
+        state: Dict[str, Any],
+        choices: Dict[str, Any],
+        language: str = "ko",
+        temperature: float = 0.7,
+        top_p: float = 0.95,
+        max_tokens: int = 1500,
+    ) -> Dict[str, Any]:
+        messages = self._build_resolve_messages(state, choices, language, max_tokens)
+        txt = self._complete(messages, temperature, top_p, max_tokens, "gm.resolve")
+        return self._parse_resolve(state, txt)
+
+
+class AsyncAIGameMaster(_GameMasterBase):
+    """
+    AIGameMaster 의 비동기 버전 (공유 AsyncAzureOpenAI 사용).
+    Channels Consumer 에서 sync_to_async 로 스레드를 붙잡지 않고 바로 await 할 수 있다.
+    """
+    def __init__(self):
+        self.deployment = _azure_settings()["AZURE_OPENAI_DEPLOYMENT"]
+
+    async def _complete(
+        self, messages, temperature: float, top_p: float, max_tokens: int, call_site: str, on_field=None,
+    ) -> Optional[str]:
+        # 판정은 사용자가 기다리는 경로이므로 첫 토큰이 늦으면 다른 배포로 헤지
+        if on_field is not None:
+            return await self._stream_fields(messages, temperature, top_p, max_tokens, call_site, on_field)
+        resp = await gateway.achat_completion(
+            messages=messages,
+            hedge=True,
+            temperature=temperature,
+            top_p=top_p,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+            call_site=call_site,
+        )
+        return resp.choices[0].message.content
+
+    async def _stream_fields(self, messages, temperature, top_p, max_tokens, call_site, on_field) -> str:
+        """토큰 스트림으로 받으면서 최상위 키(narration, personal, ...)가 닫히는 즉시 on_field(key, value) 호출"""
+        stream = gateway.astream_chat_completion(
+            messages=messages,
+            hedge=True,
+            temperature=temperature,
+            top_p=top_p,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+            call_site=call_site,
+        )
+        parser = IncrementalJSONParser()
+        chunks: List[str] = []
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            chunks.append(delta)
+            for path, value in parser.feed(delta):
+                if len(path) == 1:
+                    await on_field(path[0], value)
+        return "".join(chunks)
+
+    async def propose_choices(
+        self,
+        state: Dict[str, Any],
+        language: str = "ko",
+        temperature: float = 0.6,
+        top_p: float = 0.9,
+        max_tokens: int = 1400,
+    ) -> Dict[str, Any]:
+        messages = self._build_propose_messages(state, language, max_tokens)
+        txt = await self._complete(messages, temperature, top_p, max_tokens, "gm.propose")
+        return self._parse_propose(txt)
+
+    async def resolve_turn(
+        self,
+        state: Dict[str, Any],
+        choices: Dict[str, Any],
+        language: str = "ko",
+        temperature: float = 0.7,
+        top_p: float = 0.95,
+        max_tokens: int = 1500,
+        on_field=None,
+    ) -> Dict[str, Any]:
+        """on_field 를 주면 스트리밍으로 받으며 완성된 최상위 필드를 먼저 넘겨줌 (예: narration 선전송)"""
+        messages = self._build_resolve_messages(state, choices, language, max_tokens)
+        txt = await self._complete(messages, temperature, top_p, max_tokens, "gm.resolve", on_field=on_field)
+        return self._parse_resolve(state, txt)
 
 
 # ----------------------------- 결과 병합 -----------------------------
@@ -449,7 +557,7 @@ def apply_gm_result_to_state(state: dict, result: dict) -> dict:
     GM 결과(JSON)를 세션 상태(state)에 반영해서 '다음 턴의 상태'를 돌려줍니다.
     - world/party/log 기본 반영
     - shari.update의 inventory/skills/characterHurt/location 반영
-    - party[].sheet.hp / status는 예시로 처리(프로젝트 규약에 맞게 커스터마이즈 가능)
+    - party[].sheet.hp / status / stats 는 예시로 처리(프로젝트 규약에 맞게 커스터마이즈 가능)
     """
     import copy
     new_state = copy.deepcopy(state)
@@ -485,6 +593,14 @@ def apply_gm_result_to_state(state: dict, result: dict) -> dict:
             old = set(map(str, sheet.get("status", [])))
             new = set(map(str, ch.get("status", [])))
             sheet["status"] = list(old | new)
+        # 능력치 변화 (규칙 엔진의 statChanges 등: {능력치: 증감})
+        if isinstance(ch.get("stats"), dict):
+            stats = sheet.setdefault("stats", {})
+            for stat, delta in ch["stats"].items():
+                try:
+                    stats[stat] = int(stats.get(stat, 0)) + int(delta)
+                except Exception:
+                    pass
 
     # 3) SHARI 업데이트(인벤토리/쿨다운/부상/위치)
     upd = (result.get("shari") or {}).get("update") or {}
@@ -597,6 +713,16 @@ except Exception:
     APIView = object  # 타입만 맞추는 더미
 
 
+def _digest(state: Dict[str, Any]) -> Dict[str, Any]:
+    """API 로 받은 상태를 토큰 예산 안으로 줄임 (엔진은 받은 상태를 그대로 쓰므로 호출자가 한 번만 다이제스트)."""
+    digested, _ = digest_state(
+        state,
+        token_budget=getattr(settings, "GM_STATE_TOKEN_BUDGET", 1500),
+        keep_recent=getattr(settings, "GM_STATE_KEEP_RECENT_TURNS", 4),
+    )
+    return digested
+
+
 class ProposeAPIView(APIView):  # type: ignore
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
@@ -608,7 +734,7 @@ class ProposeAPIView(APIView):  # type: ignore
             return JsonResponse({"message": "state(JSON)가 필요합니다."}, status=400)
         try:
             gm = AIGameMaster()
-            out = gm.propose_choices(state, language=language)
+            out = gm.propose_choices(_digest(state), language=language)
             return JsonResponse({"message": "선택지 생성 성공", "data": out}, status=200)
         except Exception as e:
             return JsonResponse({"message": f"선택지 생성 실패: {e}"}, status=500)
@@ -636,7 +762,7 @@ class ResolveAPIView(APIView):  # type: ignore
 
         try:
             gm = AIGameMaster()
-            out = gm.resolve_turn(state, choices, language=language)
+            out = gm.resolve_turn(_digest(state), choices, language=language)
 
             # 여기서 바로 세션 상태에 반영하고 반환하고 싶다면 아래 주석 해제:
             # new_state = apply_gm_result_to_state(state, out)
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+llm/multi_mode/state_digest.py
+
+GM 프롬프트에 넣을 세션 상태를 토큰 예산 안으로 줄이는 다이제스트 단계.
+- 최근 keep_recent 턴의 log 는 그대로 유지
+- 그보다 오래된 턴은 한 줄씩 접어서 rolling summary(log_digest)에 누적
+- GM 템플릿이 읽지 않는 필드(session_id, 빈 memory/spells 등)는 제거
+- 다이제스트 전/후 프롬프트 크기(metrics)를 함께 반환
+
+log_digest 는 상태 안에 다음 형태로 들어가며, 호출자가 방 상태에 보관했다가
+다음 호출 때 다시 넘겨주면 이미 접힌 턴은 다시 처리하지 않는다.
+    {"summary": "...", "until_turn": 7}
+log[].turn 은 항목마다 계속 증가하는 번호여야 한다 (윈도우가 앞에서 잘려도 같은 항목은 같은 번호).
+"""
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from llm.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_BUDGET = 1500
+DEFAULT_KEEP_RECENT = 4
+# rolling summary 최대 길이(문자). 넘치면 오래된 문장부터 버림
+MAX_SUMMARY_CHARS = 1200
+# 접을 때 턴 하나당 남기는 최대 길이(문자)
+MAX_LINE_CHARS = 120
+
+# GM 템플릿이 참고하지 않는 최상위 필드
+_UNUSED_TOP_LEVEL = ("session_id",)
+# party[] 항목에서 비어 있으면 제거하는 필드
+_DROP_IF_EMPTY = ("memory", "spells", "status", "notes")
+
+
+def _narration_line(entry: Dict[str, Any]) -> str:
+    """log 항목 하나를 한 줄 요약으로 변환. 씬 JSON 원문이면 제목/묘사를 사용."""
+    text = entry.get("narration")
+    if text is None and entry.get("events"):
+        text = ", ".join(map(str, entry.get("events") or []))
+    text = str(text or "").strip()
+    if text.startswith("{") or "```" in text:
+        try:
+            block = re.search(r"\{.*\}", text, flags=re.S)
+            scene = json.loads(block.group(0)) if block else {}
+            rnd = scene.get("round", {}) if isinstance(scene, dict) else {}
+            text = " - ".join(filter(None, [rnd.get("title"), rnd.get("description")])) or text
+        except (ValueError, AttributeError):
+            pass
+    first = re.split(r"(?<=[.!?。])\s", text, maxsplit=1)[0]
+    if len(first) > MAX_LINE_CHARS:
+        first = first[:MAX_LINE_CHARS - 1] + "…"
+    return f"[T{entry.get('turn', '?')}] {first}" if first else ""
+
+
+def _trim_summary(summary: str, max_chars: int) -> str:
+    """rolling summary 가 max_chars 를 넘으면 앞(오래된) 줄부터 버림."""
+    if len(summary) <= max_chars:
+        return summary
+    lines = summary.split("\n")
+    while lines and len("\n".join(lines)) > max_chars:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def _slim(state: Dict[str, Any]) -> Dict[str, Any]:
+    """GM 템플릿이 쓰지 않는 필드를 제거한 사본."""
+    slim = copy.deepcopy(state)
+    for key in _UNUSED_TOP_LEVEL:
+        slim.pop(key, None)
+    for member in slim.get("party", []) or []:
+        if not isinstance(member, dict):
+            continue
+        for key in _DROP_IF_EMPTY:
+            if key in member and not member[key]:
+                member.pop(key)
+        sheet = member.get("sheet")
+        if isinstance(sheet, dict):
+            for key in _DROP_IF_EMPTY:
+                if key in sheet and not sheet[key]:
+                    sheet.pop(key)
+    return slim
+
+
+def _turn_of(entry: Dict[str, Any], fallback: int) -> int:
+    try:
+        return int(entry.get("turn", fallback))
+    except (TypeError, ValueError):
+        return fallback
+
+
+def digest_state(
+    state: Dict[str, Any],
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    keep_recent: int = DEFAULT_KEEP_RECENT,
+    log_digest: Optional[Dict[str, Any]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    상태를 토큰 예산(token_budget) 안으로 줄인 사본과 metrics 를 반환.
+    - log_digest 를 넘기지 않으면 state["log_digest"] 를 이어서 사용
+    - 반환된 상태의 "log_digest" 를 호출자가 보관하면 다음 호출에서 재사용됨
+    """
+    tokens_before = estimate_tokens(state)
+    digested = _slim(state)
+
+    prior = log_digest if isinstance(log_digest, dict) else digested.get("log_digest")
+    prior = prior if isinstance(prior, dict) else {}
+    summary = str(prior.get("summary") or "")
+    until_turn = int(prior.get("until_turn", -1))
+
+    log: List[Dict[str, Any]] = [e for e in digested.get("log", []) or [] if isinstance(e, dict)]
+    # 이미 summary 에 접혀 들어간 턴은 제외
+    log = [e for i, e in enumerate(log) if _turn_of(e, i) > until_turn]
+
+    def _fold(entries: List[Dict[str, Any]]) -> None:
+        nonlocal summary, until_turn
+        lines = [line for line in (_narration_line(e) for e in entries) if line]
+        if lines:
+            summary = _trim_summary("\n".join(filter(None, [summary] + lines)), MAX_SUMMARY_CHARS)
+        for e in entries:
+            until_turn = max(until_turn, _turn_of(e, until_turn + 1))
+
+    keep = max(1, int(keep_recent))
+    if len(log) > keep:
+        _fold(log[:-keep])
+        log = log[-keep:]
+
+    def _assemble() -> Dict[str, Any]:
+        digested["log"] = log
+        digested["log_digest"] = {"summary": summary, "until_turn": until_turn}
+        return digested
+
+    _assemble()
+    # 예산 초과 시: 최근 턴을 하나씩 더 접고 → summary 를 줄이고 → 남은 narration 을 자름
+    while estimate_tokens(digested) > token_budget and len(log) > 1:
+        _fold(log[:1])
+        log = log[1:]
+        _assemble()
+    while estimate_tokens(digested) > token_budget and summary:
+        summary = _trim_summary(summary, len(summary) // 2) if len(summary) > 40 else ""
+        _assemble()
+    if estimate_tokens(digested) > token_budget:
+        for e in log:
+            if isinstance(e.get("narration"), str) and len(e["narration"]) > MAX_LINE_CHARS * 2:
+                e["narration"] = e["narration"][:MAX_LINE_CHARS * 2] + "…"
+        _assemble()
+
+    tokens_after = estimate_tokens(digested)
+    metrics = {
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "log_entries_before": len(state.get("log", []) or []),
+        "log_entries_after": len(log),
+        "summarized_until_turn": until_turn,
+        "over_budget": tokens_after > token_budget,
+    }
+    logger.info(
+        "state digest: tokens %s -> %s (budget=%s), log %s -> %s",
+        tokens_before, tokens_after, token_budget,
+        metrics["log_entries_before"], metrics["log_entries_after"],
+    )
+    return digested, metrics
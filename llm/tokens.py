@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+llm/tokens.py
+
+프롬프트 토큰 수 추정 유틸.
+- tiktoken 이 설치되어 있으면 실제 인코더로 계산
+- 없으면 문자 종류별 근사치 사용 (ASCII 약 4자당 1토큰, 한글 등 비ASCII 1자당 1토큰)
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterable
+
+try:
+    import tiktoken
+    _ENCODER = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _ENCODER = None
+
+# chat 메시지 하나당 role/구분자 등으로 붙는 고정 오버헤드
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: Any) -> int:
+    """문자열(또는 JSON 직렬화 가능한 값)의 토큰 수를 추정."""
+    if text is None:
+        return 0
+    if not isinstance(text, str):
+        text = json.dumps(text, ensure_ascii=False)
+    if _ENCODER is not None:
+        return len(_ENCODER.encode(text))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def estimate_message_tokens(messages: Iterable[Dict[str, Any]]) -> int:
+    """chat.completions messages 목록 전체의 토큰 수를 추정."""
+    total = 0
+    for m in messages:
+        total += MESSAGE_OVERHEAD_TOKENS + estimate_tokens(m.get("content", ""))
+    return total
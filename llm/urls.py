@@ -1 +1,7 @@
-from django.urls import path
\ No newline at end of file
+from django.urls import path
+from llm.views import GatewayMetricsView, LLMUsageStatsView
+
+urlpatterns = [
+    path('gateway/metrics/', GatewayMetricsView.as_view(), name='llm-gateway-metrics'),
+    path('usage/stats/', LLMUsageStatsView.as_view(), name='llm-usage-stats'),
+]
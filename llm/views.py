@@ -1,3 +1,88 @@
-from django.shortcuts import render
+from datetime import timedelta
 
-# Create your views here.
+from django.db.models import Avg, Count, F, Max, Q, Sum
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from llm import gateway, ledger
+from llm.models import LLMUsage
+
+
+# LLM 게이트웨이 카운터 조회 (배포별 대기열 길이/처리 중/지연 시간)
+class GatewayMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'deployments': gateway.metrics(), 'ledger': ledger.stats()}, status=status.HTTP_200_OK)
+
+
+# LLM 사용량 집계 (호출 위치/방/사용자/배포/우선순위별 토큰 수·지연)
+# GET ?group_by=call_site&hours=24&room_id=&user_id=&call_site=&limit=50
+class LLMUsageStatsView(APIView):
+    permission_classes = [IsAdminUser]
+    GROUP_FIELDS = {
+        'call_site': 'call_site',
+        'room': 'room_id',
+        'user': 'user_id',
+        'deployment': 'deployment',
+        'priority': 'priority',
+    }
+
+    def get(self, request):
+        group_by = request.query_params.get('group_by', 'call_site')
+        field = self.GROUP_FIELDS.get(group_by)
+        if field is None:
+            return Response({'error': f"'group_by'는 {', '.join(self.GROUP_FIELDS)} 중 하나여야 합니다."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            hours = float(request.query_params.get('hours', 24))
+            limit = int(request.query_params.get('limit', 50))
+        except ValueError:
+            return Response({'error': "'hours'와 'limit'은 숫자여야 합니다."}, status=status.HTTP_400_BAD_REQUEST)
+
+        since = timezone.now() - timedelta(hours=hours)
+        usage = LLMUsage.objects.filter(created_at__gte=since)
+        for param in ('room_id', 'user_id', 'call_site'):
+            value = request.query_params.get(param)
+            if value:
+                usage = usage.filter(**{param: value})
+
+        rows = (
+            usage.values(field)
+            .annotate(
+                # prompt_tokens 등 같은 이름의 집계보다 먼저 계산 (F 가 필드를 가리키도록)
+                total_tokens=Sum(F('prompt_tokens') + F('completion_tokens')),
+                calls=Count('id'),
+                errors=Count('id', filter=Q(ok=False)),
+                prompt_tokens=Sum('prompt_tokens'),
+                completion_tokens=Sum('completion_tokens'),
+                images=Sum('images'),
+                estimated_calls=Count('id', filter=Q(usage_estimated=True)),
+                latency_avg_ms=Avg('latency_ms'),
+                latency_max_ms=Max('latency_ms'),
+                wait_avg_ms=Avg('wait_ms'),
+                ttft_avg_ms=Avg('ttft_ms'),
+            )
+            .order_by('-total_tokens')[:limit]
+        )
+        results = []
+        for row in rows:
+            row['key'] = row.pop(field)
+            for name in ('latency_avg_ms', 'wait_avg_ms', 'ttft_avg_ms'):
+                if row[name] is not None:
+                    row[name] = round(row[name], 1)
+            results.append(row)
+
+        return Response({
+            'group_by': group_by,
+            'since': since,
+            'totals': usage.aggregate(
+                calls=Count('id'),
+                prompt_tokens=Sum('prompt_tokens'),
+                completion_tokens=Sum('completion_tokens'),
+            ),
+            'results': results,
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from llm import gateway, ledger
+from storymode import narration_cache
+from storymode.models import Story
+from storymode.views import BaseStoryModeView, START_ACTION_TEXT, choice_action_text
+
+DEFAULT_MANIFEST = 'storymode_pregenerate_manifest.json'
+
+
+class Command(BaseCommand):
+    help = (
+        '스토리 그래프(start_moment 부터 모든 선택지)를 따라가며 내레이션을 미리 생성해 DB 에 저장합니다. '
+        '중단되면 manifest 를 기준으로 이어서 진행합니다.'
+    )
+
+    def add_arguments(self, parser) :
+        parser.add_argument('--story', action='append', default=[], help='대상 스토리 제목 (여러 번 지정 가능, 생략 시 공개된 전체 스토리)')
+        parser.add_argument('--variants', type=int, default=narration_cache.NARRATION_VARIANTS, help='간선 하나당 저장할 내레이션 수')
+        parser.add_argument('--concurrency', type=int, default=4, help='동시에 보낼 LLM 요청 수')
+        parser.add_argument('--manifest', default=DEFAULT_MANIFEST, help='진행 상황을 기록할 manifest 파일 경로')
+        parser.add_argument('--force', action='store_true', help='manifest 를 무시하고 부족한 간선을 모두 다시 확인')
+
+    def handle(self, *args, **options) :
+        if options['variants'] < 1 or options['concurrency'] < 1 :
+            raise CommandError('--variants 와 --concurrency 는 1 이상이어야 합니다.')
+
+        self.view = BaseStoryModeView()
+        self.manifest_path = options['manifest']
+        self.manifest = {} if options['force'] else self._load_manifest()
+        self.manifest_lock = threading.Lock()
+
+        stories = Story.objects.filter(is_display=True, is_deleted=False)
+        if options['story'] :
+            stories = stories.filter(title__in=options['story'])
+
+        jobs = []
+        for story in stories :
+            jobs.extend(self._collect_edges(story.title, options['variants']))
+
+        self.stdout.write(f'생성할 간선 {len(jobs)}개 (동시 요청 {options["concurrency"]}개)')
+        generated = failed = 0
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool :
+            futures = [pool.submit(self._generate_edge, job) for job in jobs]
+            for future in as_completed(futures) :
+                edge_key, ok, count = future.result()
+                generated += count
+                if ok :
+                    self.stdout.write(f'  ✔ {edge_key} (+{count})')
+                else :
+                    failed += 1
+                    self.stderr.write(f'  ✖ {edge_key} (+{count}, 실패)')
+
+        ledger.flush()
+        self.stdout.write(self.style.SUCCESS(f'완료: 내레이션 {generated}개 생성, 실패한 간선 {failed}개'))
+        if failed :
+            self.stdout.write('같은 명령을 다시 실행하면 실패한 간선부터 이어서 진행합니다.')
+
+    # start_moment 부터 BFS 로 (장면, 선택지) 간선을 모아 프롬프트까지 만들어 둠
+    def _collect_edges(self, story_title, variants) :
+        story_data, error_response = self.view._get_story_data(story_title)
+        if error_response :
+            self.stderr.write(f'스토리 조회 실패: {story_title}')
+            return []
+
+        story_id = story_data['id']
+        content = story_data['content']
+        all_moments = content['moments']
+        start_id = content.get('start_moment_id')
+        if not start_id or start_id not in all_moments :
+            self.stderr.write(f'시작 장면이 없는 스토리: {story_title}')
+            return []
+
+        edges = []
+        prompt, is_ending = self.view._build_moment_prompt(story_data['title'], all_moments, start_id, START_ACTION_TEXT)
+        edges.append((start_id, None, prompt, is_ending))
+
+        visited = {start_id}
+        queue = deque([start_id])
+        while queue :
+            moment_id = queue.popleft()
+            for i, choice_info in enumerate(all_moments[moment_id].get('choices', [])) :
+                next_id = choice_info.get('next_moment_id')
+                if next_id not in all_moments :
+                    continue
+                prompt, is_ending = self.view._build_moment_prompt(story_data['title'], all_moments, next_id, choice_action_text(i))
+                edges.append((moment_id, i, prompt, is_ending))
+                if next_id not in visited :
+                    visited.add(next_id)
+                    queue.append(next_id)
+
+        jobs = []
+        for moment_id, choice_index, prompt, is_ending in edges :
+            edge_key = narration_cache.narration_key(story_id, moment_id, choice_index, prompt)
+            if self.manifest.get(edge_key) == 'done' :
+                continue
+            missing = variants - narration_cache.count_stored(story_id, moment_id, choice_index, prompt)
+            if missing <= 0 :
+                self._mark(edge_key, 'done')
+                continue
+            jobs.append((edge_key, story_id, moment_id, choice_index, prompt, is_ending, missing))
+        return jobs
+
+    def _generate_edge(self, job) :
+        edge_key, story_id, moment_id, choice_index, prompt, is_ending, missing = job
+        count = 0
+        try :
+            for _ in range(missing) :
+                ai_response_content, error_response = self.view._call_openai_api(prompt, gateway.BULK, 'storymode.pregenerate')
+                if error_response or not narration_cache.is_cacheable(ai_response_content, is_ending) :
+                    self._mark(edge_key, 'failed')
+                    return edge_key, False, count
+                narration_cache.save_stored(story_id, moment_id, choice_index, prompt, ai_response_content)
+                count += 1
+            self._mark(edge_key, 'done')
+            return edge_key, True, count
+        finally :
+            close_old_connections()
+
+    def _load_manifest(self) :
+        if not os.path.exists(self.manifest_path) :
+            return {}
+        try :
+            with open(self.manifest_path, encoding='utf-8') as f :
+                return json.load(f)
+        except (OSError, ValueError) as e :
+            raise CommandError(f'manifest 를 읽을 수 없습니다: {self.manifest_path} ({e})')
+
+    # 간선 하나가 끝날 때마다 기록 (임시 파일에 쓴 뒤 교체해서 중간에 끊겨도 깨지지 않게)
+    def _mark(self, edge_key, state) :
+        with self.manifest_lock :
+            self.manifest[edge_key] = state
+            tmp_path = f'{self.manifest_path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f :
+                json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-17 17:39
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storymode', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorymodeNarration',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('choice_index', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('prompt_hash', models.CharField(max_length=16)),
+                ('scene_text', models.TextField()),
+                ('choices', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('moment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='narrations', to='storymode.storymodemoment')),
+                ('story', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='narrations', to='storymode.story')),
+            ],
+            options={
+                'db_table': 'storymode_narration',
+                'indexes': [models.Index(fields=['story', 'moment', 'choice_index', 'prompt_hash'], name='storymode_narration_lookup')],
+            },
+        ),
+    ]
@@ -100,4 +100,29 @@ class StorymodeSession(models.Model):
             visited_moment_ids.add(str(self.current_moment.id))
         
         visited_moments = len(visited_moment_ids)
-        return round((visited_moments / total_moments) * 100, 2) if total_moments > 0 else 0
\ No newline at end of file
+        return round((visited_moments / total_moments) * 100, 2) if total_moments > 0 else 0
+
+# 미리 생성해 둔 내레이션 (pregenerate_narrations 커맨드로 채움)
+# moment + choice_index 는 그래프의 간선 하나: 시작 장면은 choice_index=None
+class StorymodeNarration(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    story = models.ForeignKey(Story, on_delete=models.CASCADE, related_name='narrations')
+    moment = models.ForeignKey(StorymodeMoment, on_delete=models.CASCADE, related_name='narrations')
+    choice_index = models.PositiveSmallIntegerField(null=True, blank=True)
+    # 프롬프트가 바뀌면 예전 내레이션은 더 이상 조회되지 않음
+    prompt_hash = models.CharField(max_length=16)
+    scene_text = models.TextField()
+    choices = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'storymode_narration'
+        indexes = [
+            models.Index(fields=['story', 'moment', 'choice_index', 'prompt_hash'], name='storymode_narration_lookup'),
+        ]
+
+    def __str__(self):
+        return f"[{self.story.title}] {self.moment.title} ({'start' if self.choice_index is None else self.choice_index})"
+
+    def as_content(self):
+        return {'scene_text': self.scene_text, 'choices': self.choices}
@@ -0,0 +1,90 @@
+import hashlib
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+
+# 키 하나당 보관할 내레이션 변형 수 (이만큼 모이기 전까지는 새로 생성해서 채움)
+NARRATION_VARIANTS = getattr(settings, 'STORYMODE_NARRATION_VARIANTS', 3)
+# 캐시 유지 시간(초)
+NARRATION_CACHE_TTL = getattr(settings, 'STORYMODE_NARRATION_CACHE_TTL', 60 * 60 * 24 * 7)
+
+START_CHOICE = 'start'
+
+
+def prompt_hash(prompt) :
+    """프롬프트 템플릿/내용이 바뀌면 캐시가 자연스럽게 갈리도록 해시를 키에 포함"""
+    return hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:16]
+
+
+def narration_key(story_id, moment_id, choice_index, prompt) :
+    choice_part = START_CHOICE if choice_index is None else str(choice_index)
+    return f'storymode:narration:{story_id}:{moment_id}:{choice_part}:{prompt_hash(prompt)}'
+
+
+def is_cacheable(content, is_ending) :
+    """파싱에 실패했거나 선택지가 비어 있는 응답은 캐시하지 않음"""
+    if not content or not content.get('scene_text') :
+        return False
+    if str(content.get('scene_text')).startswith('(AI') :
+        return False
+    return is_ending or bool(content.get('choices'))
+
+
+def get_variant(key) :
+    """
+    변형 풀이 가득 찼으면 그중 하나를 무작위로 반환.
+    아직 덜 찼으면 None → 호출자가 새로 생성해서 add_variant() 로 채움
+    """
+    variants = cache.get(key) or []
+    if len(variants) >= NARRATION_VARIANTS :
+        return random.choice(variants)
+    return None
+
+
+def add_variant(key, content) :
+    variants = cache.get(key) or []
+    if len(variants) >= NARRATION_VARIANTS :
+        return
+    variants.append(content)
+    cache.set(key, variants, timeout=NARRATION_CACHE_TTL)
+
+
+def get_stored(story_id, moment_id, choice_index, prompt) :
+    """
+    pregenerate_narrations 로 미리 만들어 둔 내레이션 중 하나를 무작위로 반환 (없으면 None).
+    프롬프트 해시가 다르면(템플릿/스토리 내용 변경) 조회되지 않음
+    """
+    from storymode.models import StorymodeNarration
+
+    rows = list(StorymodeNarration.objects.filter(
+        story_id=story_id,
+        moment_id=moment_id,
+        choice_index=choice_index,
+        prompt_hash=prompt_hash(prompt),
+    ).values('scene_text', 'choices'))
+    return random.choice(rows) if rows else None
+
+
+def count_stored(story_id, moment_id, choice_index, prompt) :
+    from storymode.models import StorymodeNarration
+
+    return StorymodeNarration.objects.filter(
+        story_id=story_id,
+        moment_id=moment_id,
+        choice_index=choice_index,
+        prompt_hash=prompt_hash(prompt),
+    ).count()
+
+
+def save_stored(story_id, moment_id, choice_index, prompt, content) :
+    from storymode.models import StorymodeNarration
+
+    return StorymodeNarration.objects.create(
+        story_id=story_id,
+        moment_id=moment_id,
+        choice_index=choice_index,
+        prompt_hash=prompt_hash(prompt),
+        scene_text=content.get('scene_text') or '',
+        choices=content.get('choices') or [],
+    )
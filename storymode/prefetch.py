@@ -0,0 +1,148 @@
+"""
+스토리 모드 다음 장면 선행 생성(speculative prefetch)
+
+장면을 응답한 직후, 사용자가 글을 읽는 동안 다음 장면의 선택지(간선)마다
+내레이션을 백그라운드 스레드에서 미리 생성해 둠.
+- 사용자별 예산: 동시에 진행 중인 선행 생성은 PREFETCH_BUDGET 개까지
+- 사용자가 선택하면 고른 간선은 이어받고(진행 중이면 잠깐 기다림), 나머지는 취소
+- 적중률 등 카운터는 metrics() 로 조회
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from llm import gateway, ledger
+from storymode import narration_cache
+
+PREFETCH_ENABLED = getattr(settings, 'STORYMODE_PREFETCH_ENABLED', True)
+# 사용자 한 명이 동시에 걸어 둘 수 있는 선행 생성 수
+PREFETCH_BUDGET = getattr(settings, 'STORYMODE_PREFETCH_BUDGET', 3)
+# 프로세스 전체 선행 생성 스레드 수
+PREFETCH_WORKERS = getattr(settings, 'STORYMODE_PREFETCH_WORKERS', 4)
+# 선택 시점에 아직 생성 중인 간선을 기다리는 최대 시간(초). 넘기면 None → 호출자가 캐시/AI 경로로 진행
+PREFETCH_WAIT_TIMEOUT = getattr(settings, 'STORYMODE_PREFETCH_WAIT_TIMEOUT', 2)
+# 다른 워커 프로세스에서도 꺼내 쓸 수 있도록 결과를 캐시에 두는 시간(초)
+PREFETCH_RESULT_TTL = 60 * 10
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix='storymode-prefetch')
+_lock = threading.Lock()
+# user_id -> {narration_key: Future}
+_pending = {}
+_metrics = {
+    'scheduled': 0,       # 선행 생성 요청
+    'skipped_warm': 0,    # 이미 저장/캐시되어 있어 생략
+    'over_budget': 0,     # 사용자 예산 초과로 생략
+    'completed': 0,       # 생성 완료
+    'failed': 0,          # 생성 실패
+    'cancelled': 0,       # 선택되지 않아 취소
+    'hits': 0,            # 선택 시 미리 준비된 결과로 응답
+    'waited_hits': 0,     # hits 중 진행 중인 생성을 기다려서 받은 경우
+    'misses': 0,          # 선택 시 준비된 결과가 없어 새로 생성
+}
+
+
+def _count(name, n=1) :
+    with _lock :
+        _metrics[name] += n
+
+
+def metrics() :
+    with _lock :
+        snapshot = dict(_metrics)
+        snapshot['in_flight'] = sum(len(futures) for futures in _pending.values())
+    lookups = snapshot['hits'] + snapshot['misses']
+    snapshot['hit_rate'] = round(snapshot['hits'] / lookups, 3) if lookups else 0.0
+    return snapshot
+
+
+def _result_key(user_id, key) :
+    return f'storymode:prefetch:{user_id}:{key}'
+
+
+def _run(user_id, key, story_id, moment_id, choice_index, prompt, is_ending, generate) :
+    try :
+        if narration_cache.get_stored(story_id, moment_id, choice_index, prompt) or narration_cache.get_variant(key) :
+            _count('skipped_warm')
+            return None
+        with ledger.tags(user_id=user_id) :
+            content, error_response = generate(prompt, gateway.BACKGROUND, 'storymode.prefetch')
+        if error_response or not narration_cache.is_cacheable(content, is_ending) :
+            _count('failed')
+            return None
+        narration_cache.add_variant(key, content)
+        cache.set(_result_key(user_id, key), content, timeout=PREFETCH_RESULT_TTL)
+        _count('completed')
+        return content
+    except Exception as e :
+        print(f'🛑 오류: 스토리 선행 생성 실패 ({key}). 오류: {e}')
+        _count('failed')
+        return None
+    finally :
+        close_old_connections()
+
+
+def _forget(user_id, key, future) :
+    with _lock :
+        futures = _pending.get(user_id)
+        if futures and futures.get(key) is future :
+            del futures[key]
+            if not futures :
+                del _pending[user_id]
+
+
+def schedule(user_id, edges, generate) :
+    """
+    edges: [(story_id, moment_id, choice_index, prompt, is_ending), ...]
+    generate: prompt, priority, call_site 를 받아 (content, error_response) 를 돌려주는 함수 (BaseStoryModeView._call_openai_api)
+    """
+    if not PREFETCH_ENABLED or user_id is None :
+        return
+    for story_id, moment_id, choice_index, prompt, is_ending in edges :
+        key = narration_cache.narration_key(story_id, moment_id, choice_index, prompt)
+        with _lock :
+            futures = _pending.setdefault(user_id, {})
+            if key in futures :
+                continue
+            if len(futures) >= PREFETCH_BUDGET :
+                _metrics['over_budget'] += 1
+                continue
+            future = _executor.submit(_run, user_id, key, story_id, moment_id, choice_index, prompt, is_ending, generate)
+            futures[key] = future
+            _metrics['scheduled'] += 1
+        future.add_done_callback(lambda f, k=key : _forget(user_id, k, f))
+
+
+def take(user_id, key) :
+    """
+    사용자가 고른 간선의 선행 생성 결과를 꺼냄 (없으면 None).
+    고르지 않은 나머지 선행 생성은 아직 시작 전이면 취소.
+    """
+    if user_id is None :
+        return None
+    with _lock :
+        futures = _pending.pop(user_id, {})
+    chosen = futures.pop(key, None)
+    cancelled = sum(1 for future in futures.values() if future.cancel())
+    if cancelled :
+        _count('cancelled', cancelled)
+
+    content = None
+    if chosen is not None :
+        try :
+            content = chosen.result(timeout=PREFETCH_WAIT_TIMEOUT)
+            if content :
+                _count('waited_hits')
+        except FutureTimeoutError :
+            content = None
+    if not content :
+        content = cache.get(_result_key(user_id, key))
+    if content :
+        cache.delete(_result_key(user_id, key))
+    return content
+
+
+def record_lookup(hit) :
+    _count('hits' if hit else 'misses')
@@ -1,9 +1,10 @@
 from django.urls import path
-from storymode.views import StartGameView, MakeChoiceView, StoryListView, SaveProgressView
+from storymode.views import StartGameView, MakeChoiceView, StoryListView, SaveProgressView, PrefetchMetricsView
 
 urlpatterns = [
     path('story/start/', StartGameView.as_view(), name='story-start'),
     path('story/choice/', MakeChoiceView.as_view(), name='story-make-choice'),
     path('story/stories/', StoryListView.as_view(), name='story-list'),
     path('story/save/', SaveProgressView.as_view(), name='story-save'),
+    path('story/prefetch/metrics/', PrefetchMetricsView.as_view(), name='story-prefetch-metrics'),
 ]
\ No newline at end of file
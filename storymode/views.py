@@ -1,31 +1,19 @@
 import re
 import json
-from openai import AzureOpenAI
-from django.conf import settings
+from llm import gateway, ledger
+from storymode import narration_cache, prefetch
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from storymode.models import Story, StorymodeMoment, StorymodeChoice, StorymodeSession
 from storymode.serializers import StorySerializer
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.shortcuts import get_object_or_404
 
-AZURE_OPENAI_API_KEY = settings.AZURE_OPENAI_API_KEY
-AZURE_OPENAI_ENDPOINT = settings.AZURE_OPENAI_ENDPOINT
-AZURE_OPENAI_VERSION = settings.AZURE_OPENAI_VERSION
-AZURE_OPENAI_DEPLOYMENT = settings.AZURE_OPENAI_DEPLOYMENT
-
-# Azure OpenAI 클라이언트 초기화
-def get_azure_openai_client() :
-    try :
-        return AzureOpenAI(
-            api_key=AZURE_OPENAI_API_KEY,
-            azure_endpoint=AZURE_OPENAI_ENDPOINT,
-            api_version=AZURE_OPENAI_VERSION
-        )
-    except Exception as e :
-        print(f'Azure OpenAI 클라이언트 초기화 실패 {e}')
-        return None
+START_ACTION_TEXT = '이제 이야기가 시작되었어.'
+
+def choice_action_text(choice_index) :
+    return f"플레이어가 {choice_index + 1}번째 선택지를 골랐어."
 
 # AI 응답 파싱
 def parse_ai_response(llm_output):
@@ -198,29 +186,90 @@ class BaseStoryModeView(APIView) :
 
         return prompt
     
-    # OpenAI API 호출
-    def _call_openai_api(self, prompt) :
-        client = get_azure_openai_client()
-        if not client :
-            print(f'Azure OpenAI 클라이언트 초기화 실패')
-            return None, Response({
-                'message' : 'AI 서비스 연결 실패'
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
+    # 장면(moment) 하나에 대한 프롬프트 생성 (선택지 생성 가이드 포함)
+    def _build_moment_prompt(self, story_title, all_moments, moment_id, player_action_text) :
+        moment = all_moments.get(moment_id, {})
+        choices = moment.get('choices', [])
+        is_ending = not bool(choices)
+
+        choice_instructions = ''
+        if not is_ending :
+            choice_instructions += '다음 선택지들은 아래 목표들로 이어지도록 만들어줘:\n'
+
+            for i, choice_info in enumerate(choices):
+                target_moment_id = choice_info.get('next_moment_id')
+                target_moment_desc = all_moments.get(target_moment_id, {}).get('description', '')
+                action_type = choice_info.get('action_type', '보통')
+                choice_instructions += f'- 선택지 {i+1}: ({action_type} 결과) {target_moment_desc}\n'
+        else:
+            choice_instructions = "이야기의 끝입니다. 선택지가 필요 없습니다."
+
+        prompt = self._generate_story_prompt(
+            story_title=story_title,
+            player_action_text=player_action_text,
+            moment_description=moment.get('description', ''),
+            choice_instructions=choice_instructions,
+            is_ending=is_ending,
+            num_choices_available=len(choices)
+        )
+        return prompt, is_ending
+
+    # OpenAI API 호출 (공유 게이트웨이: 커넥션 풀/동시성 제한/재시도)
+    def _call_openai_api(self, prompt, priority=gateway.INTERACTIVE, call_site='storymode.narration') :
         try :
-            response = client.chat.completions.create(
-                model=AZURE_OPENAI_DEPLOYMENT,
+            response = gateway.chat_completion(
                 messages=[{"role": "user", "content": prompt}],
-                temperature=0.7
+                temperature=0.7,
+                priority=priority,
+                call_site=call_site
             )
             ai_response_content = parse_ai_response(response.choices[0].message.content)
             return ai_response_content, None
+        except RuntimeError as e :
+            print(f'Azure OpenAI 클라이언트 초기화 실패 {e}')
+            return None, Response({
+                'message' : 'AI 서비스 연결 실패'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         except Exception as e :
             print(f'🛑 오류: OpenAI API 호출 또는 응답 처리 실패. 오류: {e}')
             return None, Response({
                 'message' : 'AI 응답 생성 실패'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    # 내레이션 조회
+    # 1) 미리 생성해 둔 내레이션(DB) → 2) 이 사용자를 위해 선행 생성한 결과 → 3) 캐시된 변형이 충분하면 캐시
+    # → 4) AI 생성 후 캐시에 추가
+    def _get_narration(self, story_id, moment_id, choice_index, prompt, is_ending, user_id=None) :
+        key = narration_cache.narration_key(story_id, moment_id, choice_index, prompt)
+        content = narration_cache.get_stored(story_id, moment_id, choice_index, prompt)
+        if not content and user_id is not None :
+            # 적중률은 선행 생성 결과를 실제로 꺼내 쓴 경우만 (DB/변형 캐시에서 나온 응답은 제외)
+            content = prefetch.take(user_id, key)
+            prefetch.record_lookup(hit=bool(content))
+        content = content or narration_cache.get_variant(key)
+        if content :
+            return content, None
+
+        with ledger.tags(user_id=user_id) :
+            ai_response_content, error_response = self._call_openai_api(prompt)
+        if error_response :
+            return None, error_response
+
+        if narration_cache.is_cacheable(ai_response_content, is_ending) :
+            narration_cache.add_variant(key, ai_response_content)
+        return ai_response_content, None
+
+    # 사용자가 장면을 읽는 동안 다음 선택지들의 내레이션을 미리 생성
+    def _schedule_prefetch(self, user_id, story_id, story_title, all_moments, moment_id) :
+        edges = []
+        for i, choice_info in enumerate(all_moments.get(moment_id, {}).get('choices', [])) :
+            next_id = choice_info.get('next_moment_id')
+            if next_id not in all_moments :
+                continue
+            prompt, is_ending = self._build_moment_prompt(story_title, all_moments, next_id, choice_action_text(i))
+            edges.append((story_id, moment_id, i, prompt, is_ending))
+        prefetch.schedule(user_id, edges, self._call_openai_api)
+
 # 선택된 스토리 DB 조회 (첫 페이지)
 class StartGameView(BaseStoryModeView) :
     permission_classes = [IsAuthenticated]
@@ -257,38 +306,16 @@ class StartGameView(BaseStoryModeView) :
         current_moment_id = content.get('start_moment_id')
         current_moments = all_moments.get(current_moment_id)
         current_moment_title = current_moments.get('title', '')
-        current_moment_description = current_moments.get('description', '')
         current_moment_image = current_moments.get('image_path', '')
 
-        choices = current_moments.get('choices', [])
-        is_ending = not bool(choices)
-        num_choices_available = len(choices)
+        prompt, is_ending = self._build_moment_prompt(title, all_moments, current_moment_id, START_ACTION_TEXT)
 
-        choice_instructions = ''
-        if not is_ending :
-            choice_instructions += '다음 선택지들은 아래 목표들로 이어지도록 만들어줘:\n'
-        
-        for i, choice_info in enumerate(choices):
-            target_moment_id = choice_info.get('next_moment_id')
-            target_moment_desc = all_moments.get(target_moment_id, {}).get('description', '')
-            action_type = choice_info.get('action_type', '보통')
-            choice_instructions += f'- 선택지 {i+1}: ({action_type} 결과) {target_moment_desc}\n'
-
-        player_action_text = '이제 이야기가 시작되었어.' 
-        
-        prompt = self._generate_story_prompt(
-            story_title=title,
-            player_action_text=player_action_text,
-            moment_description=current_moment_description,
-            choice_instructions=choice_instructions,
-            is_ending=is_ending,
-            num_choices_available=num_choices_available
-        )
-
-        ai_response_content, error_response = self._call_openai_api(prompt)
+        ai_response_content, error_response = self._get_narration(id, current_moment_id, None, prompt, is_ending)
         if error_response :
             return error_response
 
+        self._schedule_prefetch(user.pk, id, title, all_moments, current_moment_id)
+
         initial_scene_data = {
             "scene": ai_response_content.get("scene_text"),
             "choices": ai_response_content.get("choices"),
@@ -349,40 +376,18 @@ class MakeChoiceView(BaseStoryModeView):
             }, status=status.HTTP_404_NOT_FOUND)
         
         next_moment_title = next_moments.get('title', '')
-        next_moment_description = next_moments.get('description', '')
         next_moment_image = next_moments.get('image_path', '')
 
-        choices = next_moments.get('choices', [])
-        is_ending = not bool(choices)
-        num_choices_available = len(choices)
-
-        choice_instructions = ''
-        if not is_ending :
-            choice_instructions += '다음 선택지들은 아래 목표들로 이어지도록 만들어줘:\n'
-
-            for i, choice_info in enumerate(choices):
-                target_moment_id = choice_info.get('next_moment_id')
-                target_moment_desc = all_moments.get(target_moment_id, {}).get('description', '')
-                action_type = choice_info.get('action_type', '보통')
-                choice_instructions += f'- 선택지 {i+1}: ({action_type} 결과) {target_moment_desc}\n'
-        else:
-            choice_instructions = "이야기의 끝입니다. 선택지가 필요 없습니다."
-
-        player_action_text = f"플레이어가 {choice_index + 1}번째 선택지를 골랐어."
-        
-        prompt = self._generate_story_prompt(
-            story_title=title,
-            player_action_text=player_action_text,
-            moment_description=next_moment_description,
-            choice_instructions=choice_instructions,
-            is_ending=is_ending,
-            num_choices_available=num_choices_available
-        )
+        prompt, is_ending = self._build_moment_prompt(title, all_moments, next_moment_id, choice_action_text(choice_index))
 
-        ai_response_content, error_response = self._call_openai_api(prompt)
+        user_id = request.user.pk if request.user.is_authenticated else None
+        ai_response_content, error_response = self._get_narration(id, current_moment_id, choice_index, prompt, is_ending, user_id)
         if error_response :
             return error_response
 
+        if user_id is not None :
+            self._schedule_prefetch(user_id, id, title, all_moments, next_moment_id)
+
         return Response({
             "scene": ai_response_content.get("scene_text"),
             "choices": ai_response_content.get("choices"),
@@ -393,6 +398,13 @@ class MakeChoiceView(BaseStoryModeView):
             "image_path" : next_moment_image
         }, status=status.HTTP_200_OK)
     
+# 선행 생성 카운터 조회 (적중률/취소/예산 초과)
+class PrefetchMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'prefetch': prefetch.metrics()}, status=status.HTTP_200_OK)
+
 class SaveProgressView(APIView):
     permission_classes = [IsAuthenticated] # 👈 로그인한 유저만 저장 가능!
 